@@ -0,0 +1,210 @@
+# api/analytics.py
+from flask import Blueprint, jsonify, request
+from datetime import datetime
+import logging
+import time
+from database.models import get_db_connection
+from database.entries import sire_stats_key
+from database.partitions import race_date_filter
+from services.inbreeding_service import get_inbreeding_report, inbreeding_cache_stats, INBREEDING_GENERATIONS
+from services.pedigree_service import pedigree_cache_stats
+from services.single_flight import single_flight_stats
+from utils.response_cache import response_cache_stats
+
+logger = logging.getLogger(__name__)
+analytics_bp = Blueprint('analytics', __name__)
+
+
+def _inbreeding_response(horse_ids, **extra):
+    start = time.time()
+    report = get_inbreeding_report(horse_ids)
+    return jsonify({
+        **extra,
+        'generations': INBREEDING_GENERATIONS,
+        'horses': report,
+        'total': len(report),
+        'elapsed_ms': round((time.time() - start) * 1000, 1)
+    })
+
+
+@analytics_bp.route('/analytics/horses/<horse_id>/inbreeding')
+def get_horse_inbreeding(horse_id):
+    try:
+        report = get_inbreeding_report([horse_id])
+        return jsonify(report[0])
+    except Exception as e:
+        logger.error(f"Error calculando consanguinidad de {horse_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/analytics/races/<race_id>/inbreeding')
+def get_race_inbreeding(race_id):
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+
+        cur = conn.cursor()
+        date_filter, date_params = race_date_filter(race_id)
+        cur.execute(f"""
+            SELECT horse_id FROM race_entries
+            WHERE race_id = %s AND {date_filter}
+            ORDER BY post_position NULLS LAST, horse_name
+        """, [race_id] + date_params)
+        horse_ids = [row[0] for row in cur.fetchall()]
+        cur.close()
+        conn.close()
+
+        if not horse_ids:
+            return jsonify({'error': f'Carrera {race_id} sin participantes'}), 404
+
+        return _inbreeding_response(horse_ids, race_id=race_id)
+
+    except Exception as e:
+        logger.error(f"Error calculando consanguinidad de la carrera {race_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/analytics/cards/<track_code>/<race_date>/inbreeding')
+def get_card_inbreeding(track_code, race_date):
+    """Todos los participantes de una jornada (track_code='all' para todos los hipódromos)"""
+    try:
+        try:
+            race_date_obj = datetime.strptime(race_date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Fecha inválida, formato esperado YYYY-MM-DD'}), 400
+
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT DISTINCT re.horse_id
+            FROM race_entries re
+            JOIN races r ON r.race_id = re.race_id AND r.race_date = re.race_date
+            WHERE r.race_date = %s
+            AND (%s = 'all' OR r.track_code = %s)
+            AND re.status = 'active'
+        """, (race_date_obj, track_code, track_code))
+        horse_ids = [row[0] for row in cur.fetchall()]
+        cur.close()
+        conn.close()
+
+        if not horse_ids:
+            return jsonify({'error': f'No hay participantes para {track_code} el {race_date}'}), 404
+
+        return _inbreeding_response(horse_ids, track_code=track_code, race_date=race_date)
+
+    except Exception as e:
+        logger.error(f"Error calculando consanguinidad de la jornada {track_code} {race_date}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/sires/<sire>/stats')
+def get_sire_stats(sire):
+    """Estadísticas de un padre (acepta horse_id o nombre): progenie, participantes y corredores de hoy"""
+    try:
+        sire_key = sire_stats_key(sire)
+        if not sire_key:
+            return jsonify({'error': 'Padre inválido'}), 400
+
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT progeny_count, damsire_progeny_count, updated_at
+            FROM sire_stats WHERE sire_key = %s
+        """, (sire_key,))
+        progeny = cur.fetchone()
+
+        cur.execute("""
+            SELECT surface, distance, starters
+            FROM sire_starter_stats
+            WHERE sire_key = %s AND starters > 0
+            ORDER BY starters DESC, surface, distance
+        """, (sire_key,))
+        starters = [
+            {'surface': row[0], 'distance': row[1], 'starters': row[2]}
+            for row in cur.fetchall()
+        ]
+
+        cur.execute("""
+            SELECT runners FROM sire_daily_runners
+            WHERE sire_key = %s AND race_date = CURRENT_DATE
+        """, (sire_key,))
+        today = cur.fetchone()
+        cur.close()
+        conn.close()
+
+        if not progeny and not starters:
+            return jsonify({'error': f'Sin estadísticas para {sire}'}), 404
+
+        starters_by_surface = {}
+        for row in starters:
+            starters_by_surface[row['surface']] = starters_by_surface.get(row['surface'], 0) + row['starters']
+
+        return jsonify({
+            'sire_key': sire_key,
+            'progeny_count': progeny[0] if progeny else 0,
+            'damsire_progeny_count': progeny[1] if progeny else 0,
+            'starters_total': sum(row['starters'] for row in starters),
+            'starters_by_surface': starters_by_surface,
+            'starters_by_surface_distance': starters,
+            'runners_today': today[0] if today else 0,
+            'updated_at': progeny[2].isoformat() if progeny and progeny[2] else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error obteniendo estadísticas del padre {sire}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/sires/runners')
+def get_sire_runners():
+    """Padres con más corredores en una fecha (?date=YYYY-MM-DD, por defecto hoy)"""
+    try:
+        race_date = request.args.get('date')
+        try:
+            race_date_obj = datetime.strptime(race_date, '%Y-%m-%d').date() if race_date else datetime.now().date()
+        except ValueError:
+            return jsonify({'error': 'Fecha inválida, formato esperado YYYY-MM-DD'}), 400
+        limit = min(request.args.get('limit', 50, type=int) or 50, 500)
+
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT d.sire_key, d.runners,
+                   COALESCE((SELECT s.progeny_count FROM sire_stats s WHERE s.sire_key = d.sire_key), 0)
+            FROM sire_daily_runners d
+            WHERE d.race_date = %s AND d.runners > 0
+            ORDER BY d.runners DESC, d.sire_key
+            LIMIT %s
+        """, (race_date_obj, limit))
+        sires = [
+            {'sire_key': row[0], 'runners': row[1], 'progeny_count': row[2]}
+            for row in cur.fetchall()
+        ]
+        cur.close()
+        conn.close()
+
+        return jsonify({'race_date': race_date_obj.isoformat(), 'sires': sires, 'total': len(sires)})
+
+    except Exception as e:
+        logger.error(f"Error obteniendo corredores por padre: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/analytics/cache-stats')
+def get_analytics_cache_stats():
+    return jsonify({
+        'inbreeding': inbreeding_cache_stats(),
+        'pedigree_trees': pedigree_cache_stats(),
+        'responses': response_cache_stats(),
+        'single_flight': single_flight_stats(),
+    })
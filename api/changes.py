@@ -0,0 +1,40 @@
+# api/changes.py
+from flask import Blueprint, Response, jsonify, stream_with_context
+import json
+import queue
+import logging
+from services.change_listener import CHANGE_LISTENER_ENABLED, subscribe, unsubscribe
+
+logger = logging.getLogger(__name__)
+changes_bp = Blueprint('changes', __name__)
+
+# Segundos sin eventos antes de mandar un comentario para mantener viva la conexión
+KEEPALIVE_SECONDS = 15
+
+
+@changes_bp.route('/changes/stream')
+def stream_changes():
+    """Feed de cambios (Server-Sent Events): un evento por carrera, perfil o pedigree guardado"""
+    if not CHANGE_LISTENER_ENABLED:
+        return jsonify({'error': 'El listener de cambios está deshabilitado'}), 503
+
+    events = subscribe()
+
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = events.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event.get('kind')}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            unsubscribe(events)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,55 @@
+# api/exports.py
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from datetime import datetime
+import logging
+from services.export_service import (
+    EXPORT_FORMATS, HORSE_EXPORT_COLUMNS, ENTRY_EXPORT_COLUMNS,
+    horses_export_query, entries_export_query, export_lines
+)
+
+logger = logging.getLogger(__name__)
+exports_bp = Blueprint('exports', __name__)
+
+
+def _export_response(name, columns, query, params):
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Formato inválido, opciones: {", ".join(EXPORT_FORMATS)}'}), 400
+
+    lines = export_lines(export_format, columns, query, params)
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(lines),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+@exports_bp.route('/export/horses')
+def export_horses():
+    """Todos los caballos como NDJSON (por defecto) o CSV (?format=csv), sin cargarlos en memoria"""
+    try:
+        query, params = horses_export_query()
+        return _export_response('horses', HORSE_EXPORT_COLUMNS, query, params)
+    except Exception as e:
+        logger.error(f"Error exportando caballos: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@exports_bp.route('/export/entries')
+def export_entries():
+    """Participaciones con su carrera. Filtros: ?date_from=, ?date_to= (YYYY-MM-DD), ?track_code="""
+    try:
+        dates = {}
+        for param in ('date_from', 'date_to'):
+            value = request.args.get(param)
+            try:
+                dates[param] = datetime.strptime(value, '%Y-%m-%d').date() if value else None
+            except ValueError:
+                return jsonify({'error': f'{param} inválido, formato esperado YYYY-MM-DD'}), 400
+
+        query, params = entries_export_query(track_code=request.args.get('track_code'), **dates)
+        return _export_response('entries', ENTRY_EXPORT_COLUMNS, query, params)
+    except Exception as e:
+        logger.error(f"Error exportando participaciones: {e}")
+        return jsonify({'error': str(e)}), 500
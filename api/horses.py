@@ -3,48 +3,189 @@ from flask import Blueprint, jsonify, request
 import logging
 from database.models import get_db_connection
 from services.scraping_service import scrape_horse_profile, update_horse_data
+from services.pedigree_service import get_pedigree_tree, DEFAULT_PEDIGREE_DEPTH, MAX_PEDIGREE_DEPTH
+from services.stats_service import get_system_stats
+from services.horse_search_service import (
+    search_horses, autocomplete_horses, SEARCH_COLUMNS, SEARCH_MIN_LENGTH, SEARCH_DEFAULT_LIMIT,
+    SEARCH_MAX_LIMIT, AUTOCOMPLETE_DEFAULT_LIMIT, AUTOCOMPLETE_MAX_LIMIT
+)
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
+from utils.http_cache import data_versions_query, compute_validators, is_not_modified, set_validators, not_modified_response
 
 logger = logging.getLogger(__name__)
 horses_bp = Blueprint('horses', __name__)
 
+# Columnas que se pueden pedir con ?fields= (horse_id y horse_name siempre van: forman el cursor)
+HORSE_LIST_FIELDS = [
+    'horse_id', 'horse_name', 'horse_name_ipa', 'owner', 'owner_ipa',
+    'trainer', 'trainer_ipa', 'breeder', 'breeder_ipa', 'country',
+    'country_of_birth', 'age', 'status', 'sex', 'color', 'url', 'profile_url',
+    'last_race_date', 'created_at', 'updated_at'
+]
+HORSE_LIST_DEFAULT_LIMIT = 100
+HORSE_LIST_MAX_LIMIT = 500
+HORSES_VALIDATOR_QUERY = data_versions_query('horses')
+
+def _flag(name):
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
 @horses_bp.route('/horses')
 def get_horses():
+    """
+    Listado paginado por cursor, ordenado por (horse_name, horse_id).
+    Parámetros: limit, cursor, fields=a,b,c, status, country_of_birth, stale=1, missing_ipa=1.
+    La respuesta incluye next_cursor (None en la última página).
+    """
     try:
+        try:
+            limit = parse_limit(request.args.get('limit'), HORSE_LIST_DEFAULT_LIMIT, HORSE_LIST_MAX_LIMIT)
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor, 2, str) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        requested = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        unknown = [f for f in requested if f not in HORSE_LIST_FIELDS]
+        if unknown:
+            return jsonify({'error': f'Campos desconocidos: {", ".join(unknown)}'}), 400
+        fields = ['horse_id', 'horse_name'] + [f for f in (requested or HORSE_LIST_FIELDS) if f not in ('horse_id', 'horse_name')]
+        
+        conditions = []
+        params = []
+        if request.args.get('status'):
+            conditions.append("status = %s")
+            params.append(request.args['status'])
+        if request.args.get('country_of_birth'):
+            conditions.append("country_of_birth = %s")
+            params.append(request.args['country_of_birth'])
+        if _flag('stale'):
+            conditions.append("(updated_at IS NULL OR updated_at < NOW() - INTERVAL '20 days')")
+        if _flag('missing_ipa'):
+            conditions.append("(horse_name_ipa IS NULL OR horse_name_ipa = '')")
+        if after:
+            conditions.append("(horse_name, horse_id) > (%s, %s)")
+            params.extend(after)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
         
         cur = conn.cursor()
-        cur.execute("""
-            SELECT horse_id, horse_name, horse_name_ipa, owner, owner_ipa, 
-                   trainer, trainer_ipa, breeder, breeder_ipa, country, 
-                   country_of_birth, age, status, sex, color, url, profile_url,
-                   last_race_date, created_at, updated_at
-            FROM horses ORDER BY horse_name
-        """)
+        # Validador global (no por página): cualquier alta o cambio de caballo invalida todas las páginas
+        etag, last_modified = compute_validators(cur, HORSES_VALIDATOR_QUERY)
+        if is_not_modified(etag, last_modified):
+            cur.close()
+            conn.close()
+            return not_modified_response(etag, last_modified)
         
+        # Se pide una fila de más para saber si hay otra página
+        cur.execute(f"""
+            SELECT {', '.join(fields)}
+            FROM horses {where}
+            ORDER BY horse_name, horse_id
+            LIMIT %s
+        """, params + [limit + 1])
+        rows = cur.fetchall()
+        cur.close()
+        conn.close()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         horses = []
-        for row in cur.fetchall():
-            horse = {
-                'horse_id': row[0], 'horse_name': row[1], 'horse_name_ipa': row[2],
-                'owner': row[3], 'owner_ipa': row[4], 'trainer': row[5], 'trainer_ipa': row[6],
-                'breeder': row[7], 'breeder_ipa': row[8], 'country': row[9], 'country_of_birth': row[10],
-                'age': row[11], 'status': row[12], 'sex': row[13], 'color': row[14],
-                'url': row[15], 'profile_url': row[16],
-                'last_race_date': row[17].isoformat() if row[17] else None,
-                'created_at': row[18].isoformat() if row[18] else None,
-                'updated_at': row[19].isoformat() if row[19] else None
-            }
+        for row in rows:
+            horse = {}
+            for field, value in zip(fields, row):
+                horse[field] = value.isoformat() if hasattr(value, 'isoformat') else value
             horses.append(horse)
         
-        cur.close()
-        conn.close()
-        return jsonify({'horses': horses, 'total': len(horses)})
+        next_cursor = encode_cursor([rows[-1][1], rows[-1][0]]) if has_more else None
+        response = jsonify({'horses': horses, 'count': len(horses), 'next_cursor': next_cursor})
+        return set_validators(response, etag, last_modified)
         
     except Exception as e:
         logger.error(f"Error obteniendo caballos: {e}")
         return jsonify({'error': str(e)}), 500
 
+@horses_bp.route('/horses/stats')
+def get_horses_stats():
+    """Conteos globales del dashboard, mantenidos con triggers (vista system_stats)"""
+    try:
+        stats = get_system_stats()
+        if stats is None:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo estadísticas: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@horses_bp.route('/horses/search')
+def search_horses_endpoint():
+    """
+    Búsqueda libre (subcadena o nombre parecido) con índices de trigramas.
+    Parámetros: q (mínimo 2 caracteres), by=name|trainer|owner|all (por defecto all), limit.
+    """
+    try:
+        query = ' '.join(request.args.get('q', '').split())
+        if len(query) < SEARCH_MIN_LENGTH:
+            return jsonify({'error': f'q debe tener al menos {SEARCH_MIN_LENGTH} caracteres'}), 400
+        
+        by = request.args.get('by', 'all')
+        if by != 'all' and by not in SEARCH_COLUMNS:
+            return jsonify({'error': f'by debe ser uno de: all, {", ".join(SEARCH_COLUMNS)}'}), 400
+        
+        try:
+            limit = parse_limit(request.args.get('limit'), SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        horses = search_horses(query, None if by == 'all' else [by], limit)
+        return jsonify({'query': query, 'by': by, 'horses': horses, 'count': len(horses)})
+        
+    except Exception as e:
+        logger.error(f"Error buscando caballos: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@horses_bp.route('/horses/autocomplete')
+def autocomplete_horses_endpoint():
+    """Nombres que empiezan con ?prefix= (sin distinguir mayúsculas ni acentos), desde memoria"""
+    try:
+        prefix = request.args.get('prefix', '')
+        if not prefix.strip():
+            return jsonify({'suggestions': []})
+        
+        try:
+            limit = parse_limit(request.args.get('limit'), AUTOCOMPLETE_DEFAULT_LIMIT, AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'suggestions': autocomplete_horses(prefix, limit)})
+        
+    except Exception as e:
+        logger.error(f"Error en autocompletado de caballos: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@horses_bp.route('/horses/<horse_id>/pedigree')
+def get_horse_pedigree(horse_id):
+    """Árbol de pedigree del caballo hasta ?depth=N generaciones (servido desde caché)"""
+    try:
+        depth_param = request.args.get('depth', str(DEFAULT_PEDIGREE_DEPTH))
+        depth = int(depth_param) if depth_param.isdigit() else None
+        if depth is None or depth < 1 or depth > MAX_PEDIGREE_DEPTH:
+            return jsonify({'error': f'depth debe ser un entero entre 1 y {MAX_PEDIGREE_DEPTH}'}), 400
+        
+        tree = get_pedigree_tree(horse_id, depth)
+        if tree is None:
+            return jsonify({'error': f'Caballo {horse_id} no encontrado'}), 404
+        
+        return jsonify({'horse_id': horse_id, 'depth': depth, 'pedigree': tree})
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo pedigree de {horse_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @horses_bp.route('/scrape-horse/<horse_id>', methods=['POST'])
 def scrape_single_horse(horse_id):
     try:
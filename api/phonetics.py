@@ -0,0 +1,48 @@
+# api/phonetics.py
+from flask import Blueprint, jsonify, request
+import time
+import logging
+from services.phonetic_search_service import (
+    PHONETIC_SOURCES, PHONETIC_DEFAULT_LIMIT, PHONETIC_MAX_LIMIT, sounds_like
+)
+from utils.pagination import parse_limit
+
+logger = logging.getLogger(__name__)
+phonetics_bp = Blueprint('phonetics', __name__)
+
+
+@phonetics_bp.route('/sounds-like')
+def sounds_like_endpoint():
+    """
+    Nombres que suenan como ?q= (texto, se transcribe a IPA) o ?ipa= (transcripción).
+    Parámetros: kind=horse|trainer|jockey|owner|breeder|track (por defecto horse), limit.
+    """
+    try:
+        text = request.args.get('q', '').strip()
+        ipa = request.args.get('ipa', '').strip()
+        if not text and not ipa:
+            return jsonify({'error': 'Falta q (texto) o ipa (transcripción)'}), 400
+
+        kind = request.args.get('kind', 'horse')
+        if kind not in PHONETIC_SOURCES:
+            return jsonify({'error': f'kind debe ser uno de: {", ".join(PHONETIC_SOURCES)}'}), 400
+
+        try:
+            limit = parse_limit(request.args.get('limit'), PHONETIC_DEFAULT_LIMIT, PHONETIC_MAX_LIMIT)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        start = time.perf_counter()
+        query_ipa, results = sounds_like(kind, text=text or None, ipa=ipa or None, limit=limit)
+        return jsonify({
+            'query': text or None,
+            'query_ipa': query_ipa,
+            'kind': kind,
+            'results': results,
+            'count': len(results),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        })
+
+    except Exception as e:
+        logger.error(f"Error en búsqueda fonética: {e}")
+        return jsonify({'error': str(e)}), 500
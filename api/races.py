@@ -1,12 +1,22 @@
 # api/races.py
 from flask import Blueprint, jsonify
+from datetime import datetime
 import logging
 from utils.database import get_db_connection
+from database.status_events import fetch_status_histories
+from database.partitions import race_date_filter
+from services.card_service import CARD_VALIDATOR_QUERY, load_race_card
+from utils.http_cache import data_versions_query, compute_validators, is_not_modified, set_validators, not_modified_response
+from utils.response_cache import cached_response, cache_tags, horse_tags
 
 logger = logging.getLogger(__name__)
 races_bp = Blueprint('races', __name__)
 
+RACES_VALIDATOR_QUERY = data_versions_query('races')
+ENTRIES_VALIDATOR_QUERY = data_versions_query('race_entries')
+
 @races_bp.route('/races')
+@cached_response
 def get_races():
     try:
         conn = get_db_connection()
@@ -14,6 +24,12 @@ def get_races():
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
         
         cur = conn.cursor()
+        etag, last_modified = compute_validators(cur, RACES_VALIDATOR_QUERY)
+        if is_not_modified(etag, last_modified):
+            cur.close()
+            conn.close()
+            return not_modified_response(etag, last_modified)
+        
         cur.execute("""
             SELECT race_id, race_name, race_number, race_type, 
                    distance, surface, conditions_clean, age_restriction, 
@@ -46,13 +62,15 @@ def get_races():
         
         cur.close()
         conn.close()
-        return jsonify({'races': races, 'total': len(races)})
+        cache_tags('races:latest')
+        return set_validators(jsonify({'races': races, 'total': len(races)}), etag, last_modified)
         
     except Exception as e:
         logger.error(f"Error obteniendo carreras: {e}")
         return jsonify({'error': str(e)}), 500
 
 @races_bp.route('/races/<race_id>/entries')
+@cached_response
 def get_race_entries(race_id):
     try:
         conn = get_db_connection()
@@ -60,14 +78,28 @@ def get_race_entries(race_id):
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
         
         cur = conn.cursor()
-        cur.execute("""
+        # La fecha del race_id limita la consulta a la partición de su mes
+        date_filter, date_params = race_date_filter(race_id)
+        # Cada cambio de status también actualiza la fila, así que cubre el historial
+        etag, last_modified = compute_validators(cur, ENTRIES_VALIDATOR_QUERY)
+        if is_not_modified(etag, last_modified):
+            cur.close()
+            conn.close()
+            return not_modified_response(etag, last_modified)
+        
+        cur.execute(f"""
             SELECT horse_name, horse_id, sire, trainer, jockey, 
-                   status, status_history, status_changed_at, post_position
-            FROM race_entries WHERE race_id = %s ORDER BY post_position NULLS LAST, horse_name
-        """, (race_id,))
+                   status, status_changed_at, post_position
+            FROM race_entries WHERE race_id = %s AND {date_filter}
+            ORDER BY post_position NULLS LAST, horse_name
+        """, [race_id] + date_params)
+        rows = cur.fetchall()
+        
+        # El historial se arma desde entry_status_events con el formato de texto anterior
+        status_histories = fetch_status_histories(cur, race_id)
         
         entries = []
-        for row in cur.fetchall():
+        for row in rows:
             entry = {
                 'horse_name': row[0], 
                 'horse_id': row[1],
@@ -75,16 +107,60 @@ def get_race_entries(race_id):
                 'trainer': row[3], 
                 'jockey': row[4],
                 'status': row[5],
-                'status_history': row[6],
-                'status_changed_at': row[7].isoformat() if row[7] else None,
-                'post_position': row[8]
+                'status_history': status_histories.get(row[1]),
+                'status_changed_at': row[6].isoformat() if row[6] else None,
+                'post_position': row[7]
             }
             entries.append(entry)
         
         cur.close()
         conn.close()
-        return jsonify({'entries': entries, 'total': len(entries)})
+        cache_tags(f'race:{race_id}')
+        return set_validators(jsonify({'entries': entries, 'total': len(entries)}), etag, last_modified)
         
     except Exception as e:
         logger.error(f"Error obteniendo participantes: {e}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@races_bp.route('/cards/<track_code>/<race_date>')
+@cached_response
+def get_card(track_code, race_date):
+    """
+    Jornada completa (carreras con participantes y perfil del caballo) en un solo pedido.
+    track_code='all' para todos los hipódromos; race_date='latest' para la última fecha.
+    """
+    try:
+        if race_date == 'latest':
+            race_date_obj = None
+        else:
+            try:
+                race_date_obj = datetime.strptime(race_date, '%Y-%m-%d').date()
+            except ValueError:
+                return jsonify({'error': 'Fecha inválida, formato esperado YYYY-MM-DD o latest'}), 400
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        
+        cur = conn.cursor()
+        etag, last_modified = compute_validators(cur, CARD_VALIDATOR_QUERY)
+        if is_not_modified(etag, last_modified):
+            cur.close()
+            conn.close()
+            return not_modified_response(etag, last_modified)
+        
+        card = load_race_card(cur, track_code, race_date_obj)
+        cur.close()
+        conn.close()
+        
+        # El programa incluye el perfil de cada caballo: también se invalida si cambia uno
+        cache_tags(f"date:{card['race_date'] or race_date}", *horse_tags(
+            entry['horse_id'] for race in card['races'] for entry in race['entries']
+        ))
+        if race_date_obj is None:
+            cache_tags('races:latest')
+        return set_validators(jsonify(card), etag, last_modified)
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo programa {track_code} {race_date}: {e}")
+        return jsonify({'error': str(e)}), 500
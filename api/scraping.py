@@ -8,14 +8,42 @@ import os
 logger = logging.getLogger(__name__)
 scraping_bp = Blueprint('scraping', __name__)
 
+def _commit_profiles_and_close(conn, writer, errors):
+    """
+    Escribe el último lote de perfiles, confirma y cierra la conexión. Los
+    perfiles que no se pudieron guardar se agregan a errors. Devuelve cuántos
+    perfiles quedaron sin guardar, o None si falló el commit (se pierde todo).
+    """
+    try:
+        writer.flush()
+        conn.commit()
+        errors.extend(f"Error guardando {horse_id}: {error}" for horse_id, error in writer.failed_horses)
+        return len(writer.failed_horses)
+    except Exception as e:
+        logger.error(f"Error guardando los perfiles scrapeados: {e}")
+        conn.rollback()
+        writer.discard()
+        errors.append(f"Error guardando los perfiles: {str(e)}")
+        return None
+    finally:
+        conn.close()
+
 @scraping_bp.route('/scrape', methods=['GET', 'POST'])
 def scrape_route():
     """Endpoint completo para scrapear carreras desde HorseRacingNation y guardar en BD"""
     if request.method == 'POST':
         data = request.get_json()
         url = data.get('url') if data else None
+        compact = bool(data.get('compact')) if data else False
+        force = bool(data.get('force')) if data else False
     else:
         url = request.args.get('url')
+        compact = False
+        force = False
+    # ?compact=1 (o "compact": true en el body): sin las claves duplicadas heredadas
+    compact = compact or request.args.get('compact') == '1'
+    # ?force=1 (o "force": true): scrapear aunque la URL se haya scrapeado hace poco
+    force = force or request.args.get('force') == '1'
     if not url:
         return jsonify({"error": "URL no proporcionada"}), 400
     
@@ -26,20 +54,30 @@ def scrape_route():
         sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
         
         from utils.race_parser import parse_race_url_data
-        from database.models import create_database_tables, save_race_data_to_db
-        from services.race_scraping_service import scrape_races_from_url
+        from database.models import save_race_data_to_db
+        from services.race_scraping_service import scrape_races_from_url, compact_race_data
         
         # Usar la función completa que incluye completado automático de perfiles
-        result = scrape_races_from_url(url)
+        result = scrape_races_from_url(url, force=force)
         
         if result.get('success'):
+            races = result.get('races', [])
+            if compact:
+                races = [compact_race_data(race) for race in races]
+            if result.get('from_cache'):
+                message = (f"Tarjeta scrapeada hace {result.get('age_seconds')}s: {result.get('total_races', 0)} carreras "
+                           f"desde la base de datos (force=1 para volver a scrapear)")
+            else:
+                message = f"Scraping completado: {result.get('total_races', 0)} carreras procesadas. Los perfiles de caballos se completaron automáticamente."
             return jsonify({
                 "success": True,
-                "races": result.get('races', []),
+                "races": races,
                 "page_title": result.get('page_title', 'N/A'),
                 "url": url,
                 "total_races": result.get('total_races', 0),
-                "message": f"Scraping completado: {result.get('total_races', 0)} carreras procesadas. Los perfiles de caballos se completaron automáticamente."
+                "from_cache": result.get('from_cache', False),
+                "scraped_at": result.get('scraped_at'),
+                "message": message
             })
         else:
             return jsonify({
@@ -56,7 +94,10 @@ def scrape_horses_for_race(race_id):
     """Endpoint para scrapear caballos de una carrera específica"""
     try:
         from utils.database import get_db_connection
-        from services.scraping_service import scrape_horse_profile, update_horse_data
+        from services.scraping_service import scrape_horse_profile
+        from database.bulk_writers import HorseProfileBulkWriter
+        from services.stats_service import schedule_stats_refresh
+        from database.partitions import race_date_filter
         
         logger.info(f"Iniciando scraping de caballos para carrera: {race_id}")
         
@@ -66,31 +107,32 @@ def scrape_horses_for_race(race_id):
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
         
         cur = conn.cursor()
-        cur.execute("""
+        date_filter, date_params = race_date_filter(race_id, 're.race_date')
+        cur.execute(f"""
             SELECT re.horse_id, re.horse_name 
             FROM race_entries re
             LEFT JOIN horses h ON re.horse_id = h.horse_id
-            WHERE re.race_id = %s 
+            WHERE re.race_id = %s AND {date_filter}
             AND re.horse_id IS NOT NULL 
             AND re.horse_id != 'N/A'
             AND (
                 h.updated_at IS NULL 
                 OR h.updated_at < NOW() - INTERVAL '20 days'
             )
-        """, (race_id,))
+        """, [race_id] + date_params)
         
         horses = cur.fetchall()
         
         # También contar cuántos caballos ya están actualizados
-        cur.execute("""
+        cur.execute(f"""
             SELECT COUNT(*) FROM race_entries re
             LEFT JOIN horses h ON re.horse_id = h.horse_id
-            WHERE re.race_id = %s 
+            WHERE re.race_id = %s AND {date_filter}
             AND re.horse_id IS NOT NULL 
             AND re.horse_id != 'N/A'
             AND h.updated_at IS NOT NULL 
             AND h.updated_at >= NOW() - INTERVAL '20 days'
-        """, (race_id,))
+        """, [race_id] + date_params)
         
         skipped_result = cur.fetchone()
         skipped_count = skipped_result[0] if skipped_result else 0
@@ -110,6 +152,7 @@ def scrape_horses_for_race(race_id):
                 return jsonify({'error': f'No se encontraron caballos para la carrera {race_id}'}), 404
         
         scraped_count = 0
+        writer = HorseProfileBulkWriter(cur)
         errors = []
         
         for horse_id, horse_name in horses:
@@ -119,8 +162,8 @@ def scrape_horses_for_race(race_id):
                 horse_data = scrape_horse_profile(horse_id, horse_name)
                 
                 if horse_data:
-                    # Usar el horse_id para guardar en BD
-                    update_horse_data(cur, horse_id, horse_data)
+                    # Usar el horse_id para guardar en BD (se escribe por lotes)
+                    writer.add(horse_id, horse_data)
                     scraped_count += 1
                     logger.info(f"✅ Caballo {horse_name} scrapeado exitosamente")
                 else:
@@ -132,9 +175,11 @@ def scrape_horses_for_race(race_id):
                 errors.append(error_msg)
                 logger.error(error_msg)
         
-        conn.commit()
-        cur.close()
-        conn.close()
+        failed = _commit_profiles_and_close(conn, writer, errors)
+        if failed is None:
+            return jsonify({'error': 'Error guardando los perfiles scrapeados', 'errors': errors}), 500
+        scraped_count -= failed
+        schedule_stats_refresh()
         
         return jsonify({
             'success': True,
@@ -155,7 +200,9 @@ def scrape_all_horses():
     """Endpoint para scrapear TODOS los caballos de todas las carreras"""
     try:
         from utils.database import get_db_connection
-        from services.scraping_service import scrape_horse_profile, update_horse_data
+        from services.scraping_service import scrape_horse_profile
+        from database.bulk_writers import HorseProfileBulkWriter
+        from services.stats_service import schedule_stats_refresh
         
         logger.info("Iniciando scraping masivo de todos los caballos")
         
@@ -198,6 +245,7 @@ def scrape_all_horses():
             return jsonify({'error': 'No se encontraron caballos para scrapear'}), 404
         
         scraped_count = 0
+        writer = HorseProfileBulkWriter(cur)
         errors = []
         
         for horse_id, horse_name in horses:
@@ -207,7 +255,7 @@ def scrape_all_horses():
                 horse_data = scrape_horse_profile(horse_id, horse_name)
                 
                 if horse_data:
-                    update_horse_data(cur, horse_id, horse_data)
+                    writer.add(horse_id, horse_data)
                     scraped_count += 1
                     logger.info(f"✅ Caballo {horse_name} scrapeado exitosamente")
                 else:
@@ -219,9 +267,11 @@ def scrape_all_horses():
                 errors.append(error_msg)
                 logger.error(error_msg)
         
-        conn.commit()
-        cur.close()
-        conn.close()
+        failed = _commit_profiles_and_close(conn, writer, errors)
+        if failed is None:
+            return jsonify({'error': 'Error guardando los perfiles scrapeados', 'errors': errors}), 500
+        scraped_count -= failed
+        schedule_stats_refresh()
         
         return jsonify({
             'success': True,
@@ -305,7 +355,9 @@ def check_and_update_horses():
     """Endpoint para revisar y actualizar caballos que no se han actualizado en los últimos 20 días"""
     try:
         from utils.database import get_db_connection
-        from services.scraping_service import scrape_horse_profile, update_horse_data
+        from services.scraping_service import scrape_horse_profile
+        from database.bulk_writers import HorseProfileBulkWriter
+        from services.stats_service import schedule_stats_refresh
         
         logger.info("Revisando caballos que necesitan actualización")
         
@@ -350,6 +402,7 @@ def check_and_update_horses():
             })
         
         scraped_count = 0
+        writer = HorseProfileBulkWriter(cur)
         errors = []
         
         logger.info(f"Encontrados {len(horses_to_update)} caballos que necesitan actualización")
@@ -361,7 +414,7 @@ def check_and_update_horses():
                 horse_data = scrape_horse_profile(horse_id, horse_name)
                 
                 if horse_data:
-                    update_horse_data(cur, horse_id, horse_data)
+                    writer.add(horse_id, horse_data)
                     scraped_count += 1
                     logger.info(f"✅ Caballo {horse_name} actualizado exitosamente")
                 else:
@@ -373,9 +426,11 @@ def check_and_update_horses():
                 errors.append(error_msg)
                 logger.error(error_msg)
         
-        conn.commit()
-        cur.close()
-        conn.close()
+        failed = _commit_profiles_and_close(conn, writer, errors)
+        if failed is None:
+            return jsonify({'error': 'Error guardando los perfiles scrapeados', 'errors': errors}), 500
+        scraped_count -= failed
+        schedule_stats_refresh()
         
         return jsonify({
             'success': True,
@@ -396,6 +451,7 @@ def scrape_null_horses():
     try:
         from utils.database import get_db_connection
         from services.scraping_service import scrape_horse_profile, update_horse_data
+        from services.stats_service import schedule_stats_refresh
         
         logger.info("Iniciando scraping de caballos NULL")
         
@@ -473,6 +529,7 @@ def scrape_null_horses():
                 conn.commit()
                 cur.close()
                 conn.close()
+                schedule_stats_refresh()
             except Exception as commit_error:
                 logger.error(f"Error en commit final: {commit_error}")
         
@@ -486,4 +543,36 @@ def scrape_null_horses():
         
     except Exception as e:
         logger.error(f"Error en scrape_null_horses: {str(e)}")
-        return jsonify({'error': f'Error interno: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+
+@scraping_bp.route('/races/<race_id>/check-scratches', methods=['POST'])
+def check_race_scratches_route(race_id):
+    """Revisa los retiros de la tarjeta de una carrera (solo las tablas de participantes)"""
+    try:
+        from services.scratch_service import check_race_scratches
+        
+        result = check_race_scratches(race_id)
+        if result.get('not_found'):
+            return jsonify({'success': False, 'error': result['error']}), 404
+        if not result.get('success'):
+            return jsonify({'success': False, 'error': result.get('error', 'Error desconocido')}), 500
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Error en check_race_scratches: {str(e)}")
+        return jsonify({'success': False, 'error': f'Error interno: {str(e)}'}), 500
+
+@scraping_bp.route('/check-all-scratches', methods=['POST'])
+def check_all_scratches_route():
+    """Revisa los retiros de todas las tarjetas de la última fecha cargada"""
+    try:
+        from services.scratch_service import check_all_scratches
+        
+        result = check_all_scratches()
+        if not result.get('success'):
+            return jsonify({'success': False, 'error': result.get('error', 'Error desconocido')}), 500
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Error en check_all_scratches: {str(e)}")
+        return jsonify({'success': False, 'error': f'Error interno: {str(e)}'}), 500
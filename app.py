@@ -7,6 +7,15 @@ import logging
 from api.horses import horses_bp
 from api.races import races_bp
 from api.scraping import scraping_bp
+from api.analytics import analytics_bp
+from api.exports import exports_bp
+from api.changes import changes_bp
+from api.phonetics import phonetics_bp
+from database.migrate import bootstrap_schema
+from services.change_listener import start_change_listener
+from services.scratch_scheduler import start_scratch_scheduler
+from utils.json_provider import init_json_provider
+from utils.compression import init_compression
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,10 +24,24 @@ logger = logging.getLogger(__name__)
 # Crear aplicación Flask
 app = Flask(__name__)
 
+# Serialización JSON rápida (orjson si está instalado) y compresión gzip/brotli
+init_json_provider(app)
+init_compression(app)
+
 # Registrar blueprints
 app.register_blueprint(horses_bp, url_prefix='/api')
 app.register_blueprint(races_bp, url_prefix='/api')
 app.register_blueprint(scraping_bp, url_prefix='/api')
+app.register_blueprint(analytics_bp, url_prefix='/api')
+app.register_blueprint(exports_bp, url_prefix='/api')
+app.register_blueprint(changes_bp, url_prefix='/api')
+app.register_blueprint(phonetics_bp, url_prefix='/api')
+
+# Invalidación de cachés y feed de cambios entre procesos (LISTEN/NOTIFY)
+start_change_listener()
+
+# Sondeo de retiros del día según la hora de largada (SCRATCH_POLLING_ENABLED=1)
+start_scratch_scheduler()
 
 # Rutas principales para servir páginas
 @app.route('/')
@@ -58,4 +81,7 @@ def serve_horses_js(filename):
     return send_from_directory('bases/horses/js', filename)
 
 if __name__ == '__main__':
+    # Aplicar migraciones pendientes al arrancar (no al importar ni en cada scraping);
+    # con un servidor WSGI se ejecuta python -m database.migrate en el despliegue
+    bootstrap_schema()
     app.run(host='0.0.0.0', port=5004, debug=True)
\ No newline at end of file
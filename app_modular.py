@@ -23,6 +23,7 @@ app = Flask(__name__,
 # Importar servicios
 from services.race_scraping_service import scrape_races_from_url
 from database.models import get_db_connection
+from database.migrate import bootstrap_schema
 
 @app.route('/')
 def index():
@@ -187,6 +188,8 @@ def health_check():
 
 if __name__ == '__main__':
     logger.info("Iniciando aplicación Flask modular...")
+    # Aplicar migraciones pendientes al arrancar (no al importar ni en cada scraping)
+    bootstrap_schema()
     logger.info("Servidor disponible en: http://127.0.0.1:5005")
     
     # Ejecutar en modo debug para desarrollo
@@ -20,7 +20,7 @@ async function searchRaces() {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ url: urlToScrape })
+            body: JSON.stringify({ url: urlToScrape, compact: true })
         });
         
         if (!response.ok) {
@@ -212,24 +212,20 @@ async function cargarCarrerasGuardadas() {
     const totalSpan = document.getElementById('totalCarreras');
     
     try {
-        const response = await fetch('/api/races');
+        // Una sola petición: carreras de la última jornada con sus participantes
+        carrerasMostradas = true;
+        const response = await fetch('/api/cards/all/latest');
         const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
         
-        totalSpan.textContent = data.total;
-        
-        let totalCaballos = 0;  // Contador para todos los caballos
+        totalSpan.textContent = data.total_races;
         
         if (data.races && data.races.length > 0) {
             let html = '';
             
             for (const race of data.races) {
-                // Obtener participantes de cada carrera
-                const entriesResponse = await fetch(`/api/races/${race.race_id}/entries`);
-                const entriesData = await entriesResponse.json();
-                
-                // Contar caballos de esta carrera
-                const caballosEnCarrera = entriesData.entries ? entriesData.entries.length : 0;
-                totalCaballos += caballosEnCarrera;
                 
                 html += `<div class="race">`;
                 html += `<h2>Carrera #${race.race_number}</h2>`;
@@ -243,12 +239,12 @@ async function cargarCarrerasGuardadas() {
                 html += `<button onclick="scrapearCaballosCarrera('${race.race_id}')" class="action-btn">🐎 Scrapear Caballos de esta Carrera</button>`;
                 html += `</div>`;
                 
-                if (entriesData.entries && entriesData.entries.length > 0) {
+                if (race.entries.length > 0) {
                     html += `<table class="participants-table">`;
                     html += `<thead><tr><th>Caballo</th><th>Entrenador</th><th>Jinete</th><th>Estado</th><th>Historial</th></tr></thead>`;
                     html += `<tbody>`;
                     
-                    entriesData.entries.forEach(entry => {
+                    race.entries.forEach(entry => {
                         const status = entry.status || 'active';
                         const statusText = status === 'scratched' ? '❌ Retirado' : status === 'withdrawn' ? '⚠️ Retirado' : '✅ Activo';
                         const rowClass = status === 'scratched' || status === 'withdrawn' ? 'style="opacity: 0.6; background: #ffebee;"' : '';
@@ -297,7 +293,7 @@ async function cargarCarrerasGuardadas() {
             listaDiv.innerHTML = html;
             
             // Actualizar contador de caballos
-            document.getElementById('totalCaballos').textContent = totalCaballos;
+            document.getElementById('totalCaballos').textContent = data.total_entries;
         } else {
             listaDiv.innerHTML = '<p class="info-message">No hay carreras guardadas.</p>';
             // Si no hay carreras, poner contador de caballos en 0
@@ -683,9 +679,28 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    suscribirCambios();
+    
     console.log('🏇 Sistema de carreras cargado correctamente');
 });
 
+// Feed de cambios del servidor: si otro proceso guarda una carrera, refrescar la lista mostrada
+let carrerasMostradas = false;
+let refrescoPendiente = null;
+
+function suscribirCambios() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/api/changes/stream');
+    source.addEventListener('race', () => {
+        if (!carrerasMostradas || refrescoPendiente) return;
+        // Agrupar los avisos de un scraping de varias carreras en un solo refresco
+        refrescoPendiente = setTimeout(() => {
+            refrescoPendiente = null;
+            cargarCarrerasGuardadas();
+        }, 1000);
+    });
+}
+
 // Función para copiar texto al portapapeles
 function copyToClipboard(text) {
     if (text === 'N/A') {
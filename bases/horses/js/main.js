@@ -1,8 +1,136 @@
 // JavaScript para scraping de caballos
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Página de scraping de caballos cargada');
+    loadHorseList(true);
 });
 
+// Listado de caballos en BD: se piden páginas bajo demanda con el cursor de la API
+const HORSE_LIST_PAGE_SIZE = 50;
+const HORSE_LIST_FIELDS = 'horse_id,horse_name,horse_name_ipa,country_of_birth,status,updated_at';
+let horseListCursor = null;
+
+async function loadHorseList(reset) {
+    const body = document.getElementById('horseListBody');
+    const loadMoreBtn = document.getElementById('loadMoreHorses');
+    
+    if (reset) {
+        horseListCursor = null;
+        body.innerHTML = '';
+    }
+    
+    const params = new URLSearchParams({ limit: HORSE_LIST_PAGE_SIZE, fields: HORSE_LIST_FIELDS });
+    const country = document.getElementById('filterCountry').value.trim();
+    if (country) params.set('country_of_birth', country);
+    if (document.getElementById('filterStale').checked) params.set('stale', '1');
+    if (document.getElementById('filterMissingIpa').checked) params.set('missing_ipa', '1');
+    if (horseListCursor) params.set('cursor', horseListCursor);
+    
+    loadMoreBtn.disabled = true;
+    try {
+        const response = await fetch(`/api/horses?${params}`);
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || `HTTP ${response.status}`);
+        }
+        
+        for (const horse of result.horses) {
+            appendHorseRow(body, horse);
+        }
+        
+        horseListCursor = result.next_cursor;
+        loadMoreBtn.style.display = horseListCursor ? 'inline-block' : 'none';
+    } catch (error) {
+        console.error('Error cargando caballos:', error);
+        body.insertAdjacentHTML('beforeend', `<tr><td colspan="5" class="error">❌ Error: ${error.message}</td></tr>`);
+    } finally {
+        loadMoreBtn.disabled = false;
+    }
+}
+
+function appendHorseRow(body, horse) {
+    const row = document.createElement('tr');
+    row.innerHTML = `
+        <td>${horse.horse_name || '-'}</td>
+        <td>${horse.horse_name_ipa || ''}</td>
+        <td>${horse.country_of_birth || '-'}</td>
+        <td>${horse.status || '-'}</td>
+        <td>${horse.updated_at ? new Date(horse.updated_at).toLocaleDateString('es-ES') : (horse.trainer || 'Nunca')}</td>
+    `;
+    // Clic en una fila: cargar el horse_id en el formulario de scraping
+    row.addEventListener('click', () => {
+        document.getElementById('horseId').value = horse.horse_id;
+    });
+    body.appendChild(row);
+}
+
+// Autocompletado: sugerencias por prefijo mientras se escribe (índice en memoria del servidor)
+let horseSuggestTimer = null;
+
+function suggestHorses() {
+    clearTimeout(horseSuggestTimer);
+    horseSuggestTimer = setTimeout(async () => {
+        const prefix = document.getElementById('horseSearch').value.trim();
+        const datalist = document.getElementById('horseSuggestions');
+        if (prefix.length < 2) {
+            datalist.innerHTML = '';
+            return;
+        }
+        try {
+            const response = await fetch(`/api/horses/autocomplete?${new URLSearchParams({ prefix, limit: 10 })}`);
+            const result = await response.json();
+            if (!response.ok) return;
+            datalist.innerHTML = '';
+            for (const suggestion of result.suggestions) {
+                const option = document.createElement('option');
+                option.value = suggestion.horse_name;
+                datalist.appendChild(option);
+            }
+        } catch (error) {
+            console.error('Error en autocompletado:', error);
+        }
+    }, 150);
+}
+
+// Búsqueda libre: reemplaza el listado paginado con los resultados
+async function searchHorses() {
+    const q = document.getElementById('horseSearch').value.trim();
+    if (!q) {
+        loadHorseList(true);
+        return;
+    }
+    
+    const body = document.getElementById('horseListBody');
+    const loadMoreBtn = document.getElementById('loadMoreHorses');
+    const by = document.getElementById('horseSearchBy').value;
+    body.innerHTML = '';
+    loadMoreBtn.style.display = 'none';
+    horseListCursor = null;
+    
+    try {
+        // "Suena como" compara la pronunciación (IPA) en lugar del texto
+        const url = by === 'sounds'
+            ? `/api/sounds-like?${new URLSearchParams({ q, kind: 'horse', limit: 20 })}`
+            : `/api/horses/search?${new URLSearchParams({ q, by, limit: 50 })}`;
+        const response = await fetch(url);
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || `HTTP ${response.status}`);
+        }
+        const horses = by === 'sounds'
+            ? result.results.map(r => ({ horse_id: r.id, horse_name: r.name, horse_name_ipa: r.ipa, trainer: `${Math.round(r.score * 100)}% similar` }))
+            : result.horses;
+        if (horses.length === 0) {
+            body.innerHTML = '<tr><td colspan="5">Sin resultados</td></tr>';
+        }
+        for (const horse of horses) {
+            appendHorseRow(body, horse);
+        }
+    } catch (error) {
+        console.error('Error buscando caballos:', error);
+        body.innerHTML = `<tr><td colspan="5" class="error">❌ Error: ${error.message}</td></tr>`;
+    }
+}
+
 // Función para manejar teclas de acceso rápido
 function handleKeyPress(event) {
     // Enter en el campo de horse_id
@@ -0,0 +1,53 @@
+# database/after_commit.py - Acciones que esperan al commit de la transacción
+#
+# Las cachés en memoria (respuestas de la API, árboles de pedigree) no se
+# pueden invalidar mientras la transacción que cambió los datos sigue abierta:
+# un pedido que llega entre la invalidación y el commit lee las filas viejas y
+# las vuelve a guardar en caché. Las funciones de escritura registran aquí la
+# invalidación y la conexión la ejecuta recién después de un commit exitoso
+# (un rollback o cerrar sin commit las descarta).
+#
+# get_db_connection() crea las conexiones con AfterCommitConnection.
+
+import logging
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+
+class AfterCommitConnection(psycopg2.extensions.connection):
+    """Conexión de psycopg2 que ejecuta callbacks después de cada commit"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._after_commit = []
+
+    def commit(self):
+        super().commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback, args in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                # Los datos ya están guardados: un error aquí no debe parecer un fallo del commit
+                logger.error(f"Error en acción posterior al commit {callback.__name__}: {e}")
+
+    def rollback(self):
+        self._after_commit = []
+        super().rollback()
+
+    def close(self):
+        self._after_commit = []
+        super().close()
+
+
+def after_commit(cursor, callback, *args):
+    """
+    Ejecuta callback(*args) después del commit de la transacción del cursor.
+    En autocommit, o si la conexión no es AfterCommitConnection, se ejecuta ya.
+    """
+    conn = cursor.connection
+    if conn.autocommit or not isinstance(conn, AfterCommitConnection):
+        callback(*args)
+        return
+    conn._after_commit.append((callback, args))
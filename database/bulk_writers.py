@@ -0,0 +1,316 @@
+# database/bulk_writers.py - Escritura por lotes para refrescos masivos
+#
+# En lugar de hacer SELECT + comparación en Python + UPDATE por cada caballo,
+# los perfiles se acumulan en memoria y se envían en lotes. La detección de
+# cambios la hace PostgreSQL con IS DISTINCT FROM en una sola sentencia por lote.
+
+import logging
+from psycopg2.extras import execute_values
+from database.pedigree_graph import sync_pedigree_edges
+from services.pedigree_service import invalidate_pedigree_trees_after_commit
+from utils.response_cache import invalidate_response_cache, horse_tags
+from database.notifications import notify_horses_changed, HORSE_CHANGED, PEDIGREE_CHANGED
+from database.after_commit import after_commit
+
+logger = logging.getLogger(__name__)
+
+# Columnas del perfil que se pueden actualizar y su tipo en la tabla horses
+HORSE_PROFILE_FIELDS = [
+    ('age', 'integer'),
+    ('sex', 'text'),
+    ('color', 'text'),
+    ('owner', 'text'),
+    ('breeder', 'text'),
+    ('country_of_birth', 'text'),
+    ('status', 'text'),
+    ('horse_name_ipa', 'text'),
+    ('owner_ipa', 'text'),
+    ('trainer_ipa', 'text'),
+    ('breeder_ipa', 'text'),
+    ('trainer', 'text'),
+    ('profile_url', 'text'),
+]
+
+
+def _build_horse_update_query():
+    """Construye el UPDATE ... FROM (VALUES ...) con detección de cambios en la BD"""
+    field_names = [name for name, _ in HORSE_PROFILE_FIELDS]
+
+    # Solo se sobrescriben los campos que venían en el scraping (present_fields),
+    # igual que update_horse_data, que ignora las claves ausentes
+    new_values = {
+        name: f"CASE WHEN '{name}' = ANY(v.present_fields) THEN v.{name} ELSE h.{name} END"
+        for name in field_names
+    }
+    set_clause = ',\n            '.join(f"{name} = {new_values[name]}" for name in field_names)
+    current_row = ', '.join(f"h.{name}" for name in field_names)
+    new_row = ',\n                '.join(new_values[name] for name in field_names)
+
+    return f"""
+        WITH v (horse_id, present_fields, {', '.join(field_names)}) AS (
+            VALUES %s
+        ),
+        updated AS (
+            UPDATE horses AS h SET
+            {set_clause},
+            updated_at = CURRENT_TIMESTAMP
+            FROM v
+            WHERE h.horse_id = v.horse_id
+            AND ({current_row}) IS DISTINCT FROM (
+                {new_row}
+            )
+            RETURNING h.horse_id
+        )
+        SELECT v.horse_id,
+               EXISTS (SELECT 1 FROM updated u WHERE u.horse_id = v.horse_id),
+               EXISTS (SELECT 1 FROM horses e WHERE e.horse_id = v.horse_id)
+        FROM v
+    """
+
+
+HORSE_UPDATE_QUERY = _build_horse_update_query()
+HORSE_UPDATE_TEMPLATE = '(%s, %s::text[], ' + ', '.join(
+    f"%s::{sql_type}" for _, sql_type in HORSE_PROFILE_FIELDS
+) + ')'
+
+# Columnas de ancestros de la tabla pedigree (mismo orden que scrape_horse_profile)
+PEDIGREE_FIELDS = [
+    'sire_id', 'dam_id',
+    'paternal_grandsire_id', 'paternal_granddam_id',
+    'maternal_grandsire_id', 'maternal_granddam_id',
+    'paternal_gg_sire_id', 'paternal_gg_dam_id',
+    'paternal_gd_sire_id', 'paternal_gd_dam_id',
+    'maternal_gg_sire_id', 'maternal_gg_dam_id',
+    'maternal_gd_sire_id', 'maternal_gd_dam_id',
+]
+
+
+def _build_pedigree_upsert_query():
+    """Construye el UPDATE + INSERT de pedigrees que solo toca filas con cambios"""
+    # Solo se sobrescriben los ancestros que venían en el scraping (present_fields):
+    # uno ausente conserva el valor guardado y uno presente en None lo borra,
+    # igual que HorseProfileBulkWriter con los campos del perfil
+    new_values = {
+        field: f"CASE WHEN '{field}' = ANY(v.present_fields) THEN v.{field} ELSE p.{field} END"
+        for field in PEDIGREE_FIELDS
+    }
+    set_clause = ',\n            '.join(f"{field} = {new_values[field]}" for field in PEDIGREE_FIELDS)
+    current_row = ', '.join(f"p.{field}" for field in PEDIGREE_FIELDS)
+    new_row = ',\n                '.join(new_values[field] for field in PEDIGREE_FIELDS)
+
+    # ON CONFLICT DO UPDATE solo ve EXCLUDED (sin present_fields), así que las
+    # filas existentes se actualizan con UPDATE ... FROM y las nuevas se insertan
+    return f"""
+        WITH v (horse_id, present_fields, {', '.join(PEDIGREE_FIELDS)}) AS (
+            VALUES %s
+        ),
+        updated AS (
+            UPDATE pedigree AS p SET
+            {set_clause},
+            updated_at = CURRENT_TIMESTAMP
+            FROM v
+            WHERE p.horse_id = v.horse_id
+            AND ({current_row}) IS DISTINCT FROM (
+                {new_row}
+            )
+            RETURNING p.horse_id
+        ),
+        inserted AS (
+            INSERT INTO pedigree (horse_id, {', '.join(PEDIGREE_FIELDS)})
+            SELECT v.horse_id, {', '.join(f"v.{field}" for field in PEDIGREE_FIELDS)}
+            FROM v
+            WHERE NOT EXISTS (SELECT 1 FROM pedigree e WHERE e.horse_id = v.horse_id)
+            ON CONFLICT (horse_id) DO NOTHING
+            RETURNING horse_id
+        )
+        SELECT horse_id, FALSE AS inserted FROM updated
+        UNION ALL
+        SELECT horse_id, TRUE AS inserted FROM inserted
+    """
+
+
+PEDIGREE_UPSERT_QUERY = _build_pedigree_upsert_query()
+PEDIGREE_UPSERT_TEMPLATE = '(%s, %s::text[], ' + ', '.join(['%s::text'] * len(PEDIGREE_FIELDS)) + ')'
+# Versión de una fila (save_pedigree_data guarda un caballo a la vez)
+PEDIGREE_UPSERT_ONE = PEDIGREE_UPSERT_QUERY.replace('VALUES %s', f"VALUES {PEDIGREE_UPSERT_TEMPLATE}")
+
+
+class PedigreeBulkWriter:
+    """
+    Acumula pedigrees y los guarda con un único INSERT ... ON CONFLICT por lote.
+    Las filas sin cambios no se reescriben y conservan su updated_at.
+    """
+
+    def __init__(self, cursor, batch_size=1000):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.pending = {}
+        self.total_written = 0
+        self.total_inserted = 0
+        self.total_updated = 0
+
+    def add(self, horse_id, pedigree_data):
+        """Agrega el pedigree de un caballo al lote"""
+        self.pending[horse_id] = pedigree_data
+        if self.batch_size and len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def discard(self):
+        """Descarta el lote pendiente (por ejemplo, después de un rollback)"""
+        self.pending = {}
+
+    def flush(self):
+        """Escribe el lote pendiente y devuelve los horse_id insertados o modificados"""
+        if not self.pending:
+            return []
+
+        rows = [
+            (horse_id, [field for field in PEDIGREE_FIELDS if field in pedigree_data])
+            + tuple(pedigree_data.get(field) for field in PEDIGREE_FIELDS)
+            for horse_id, pedigree_data in self.pending.items()
+        ]
+        if len(rows) == 1:
+            self.cursor.execute(PEDIGREE_UPSERT_ONE, rows[0])
+            results = self.cursor.fetchall()
+        else:
+            results = execute_values(
+                self.cursor, PEDIGREE_UPSERT_QUERY, rows,
+                template=PEDIGREE_UPSERT_TEMPLATE, page_size=len(rows), fetch=True
+            )
+
+        inserted = sum(1 for _, was_inserted in results if was_inserted)
+        updated = len(results) - inserted
+        self.total_written += len(rows)
+        self.total_inserted += inserted
+        self.total_updated += updated
+        logger.info(
+            f"✅ Lote de {len(rows)} pedigrees guardado: {inserted} nuevos, {updated} con cambios, "
+            f"{len(rows) - len(results)} sin cambios"
+        )
+
+        # Mantener aristas y clausura de ancestros solo para los pedigrees que cambiaron
+        changed = [horse_id for horse_id, _ in results]
+        sync_pedigree_edges(self.cursor, {horse_id: self.pending[horse_id] for horse_id in changed})
+        # Con las aristas nuevas ya visibles en la transacción; las cachés se vacían tras el commit
+        invalidate_pedigree_trees_after_commit(self.cursor, changed)
+        notify_horses_changed(self.cursor, PEDIGREE_CHANGED, changed)
+
+        self.discard()
+        return changed
+
+
+class HorseProfileBulkWriter:
+    """
+    Acumula perfiles de caballos scrapeados y los guarda por lotes.
+    updated_at solo se modifica en las filas donde algún campo cambió realmente.
+    El commit queda a cargo de quien abrió la conexión, igual que en update_horse_data.
+    Con batch_size=None no se escribe automáticamente: el llamador decide cuándo hacer flush().
+
+    Cada lote se escribe dentro de un SAVEPOINT. Si falla (un valor que no entra
+    en su columna, por ejemplo), se vuelve al savepoint y se reintenta caballo por
+    caballo: solo se pierden los perfiles con error (quedan en failed_horses) y la
+    transacción sigue usable para el resto.
+    """
+
+    def __init__(self, cursor, batch_size=500):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.pending = {}
+        self.pedigree_writer = PedigreeBulkWriter(cursor, batch_size=None)
+        self.total_written = 0
+        self.total_changed = 0
+        self.missing_horses = []
+        # (horse_id, error) de los perfiles que no se pudieron guardar
+        self.failed_horses = []
+
+    def add(self, horse_id, horse_data):
+        """Agrega un perfil al lote; si se alcanza batch_size se escribe inmediatamente"""
+        # Si el mismo caballo llega dos veces en el lote, gana el último perfil
+        self.pending[horse_id] = horse_data
+
+        if self.batch_size and len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def discard(self):
+        """Descarta el lote pendiente (por ejemplo, después de un rollback)"""
+        self.pending = {}
+        self.pedigree_writer.discard()
+
+    def flush(self):
+        """Escribe el lote pendiente y devuelve los horse_id que tuvieron cambios"""
+        if not self.pending:
+            return []
+
+        pending = self.pending
+        self.discard()
+        try:
+            changed = self._write_in_savepoint(pending)
+        except Exception as e:
+            logger.warning(f"⚠️ Falló el lote de {len(pending)} perfiles ({e}), se guardan uno por uno")
+            changed = []
+            for horse_id, horse_data in pending.items():
+                try:
+                    changed.extend(self._write_in_savepoint({horse_id: horse_data}))
+                except Exception as row_error:
+                    # Primera línea del error de PostgreSQL (sin el fragmento de la sentencia)
+                    message = str(row_error).strip().split('\n')[0]
+                    logger.error(f"❌ No se pudo guardar el perfil de {horse_id}: {message}")
+                    self.failed_horses.append((horse_id, message))
+        return changed
+
+    def _write_in_savepoint(self, pending):
+        """Escribe los perfiles indicados; si fallan, la transacción vuelve a como estaba antes"""
+        use_savepoint = not self.cursor.connection.autocommit
+        if use_savepoint:
+            self.cursor.execute("SAVEPOINT horse_profile_batch")
+        try:
+            changed = self._write(pending)
+        except Exception:
+            self.pedigree_writer.discard()
+            if use_savepoint:
+                self.cursor.execute("ROLLBACK TO SAVEPOINT horse_profile_batch")
+            raise
+        if use_savepoint:
+            self.cursor.execute("RELEASE SAVEPOINT horse_profile_batch")
+        return changed
+
+    def _write(self, pending):
+        rows = []
+        for horse_id, horse_data in pending.items():
+            present_fields = [name for name, _ in HORSE_PROFILE_FIELDS if name in horse_data]
+            rows.append(
+                (horse_id, present_fields) + tuple(horse_data.get(name) for name, _ in HORSE_PROFILE_FIELDS)
+            )
+            if horse_data.get('pedigree'):
+                self.pedigree_writer.add(horse_id, horse_data['pedigree'])
+
+        results = execute_values(
+            self.cursor, HORSE_UPDATE_QUERY, rows,
+            template=HORSE_UPDATE_TEMPLATE, page_size=len(rows), fetch=True
+        )
+
+        changed = [horse_id for horse_id, was_updated, _ in results if was_updated]
+        missing = [horse_id for horse_id, _, exists in results if not exists]
+
+        # Guardar pedigrees del lote en una sola sentencia
+        self.pedigree_writer.flush()
+
+        if missing:
+            # Igual que en update_horse_data: no debería ocurrir si el caballo se creó al guardar la carrera
+            logger.warning(f"⚠️ {len(missing)} caballos no encontrados en BD - esto no debería ocurrir: {missing}")
+            self.missing_horses.extend(missing)
+
+        # El nombre/IPA de un caballo aparece en los árboles de pedigree de su descendencia
+        # y su perfil en los programas cacheados: se invalidan cuando quien llama hace commit
+        invalidate_pedigree_trees_after_commit(self.cursor, changed)
+        if changed:
+            after_commit(self.cursor, invalidate_response_cache, horse_tags(changed))
+        notify_horses_changed(self.cursor, HORSE_CHANGED, changed)
+
+        self.total_written += len(rows)
+        self.total_changed += len(changed)
+        logger.info(
+            f"✅ Lote de {len(rows)} perfiles guardado: {len(changed)} con cambios, "
+            f"{len(rows) - len(changed) - len(missing)} sin cambios (updated_at no modificado)"
+        )
+        return changed
@@ -1,11 +1,47 @@
 import logging
+import re
 import urllib.parse
 from utils.ipa_generator import generate_english_ipa
 from utils.horse_ipa_generator import generate_horse_ipa
 from datetime import datetime
+from database.prepared import register_statement, execute_prepared
 
 logger = logging.getLogger(__name__)
 
+# Búsquedas e inserts que se ejecutan por cada participante al guardar una carrera:
+# se preparan una vez por conexión (ver database/prepared.py)
+SELECT_HORSE = register_statement('entries_select_horse', "SELECT horse_name FROM horses WHERE horse_id = %s")
+INSERT_HORSE = register_statement('entries_insert_horse', """
+    INSERT INTO horses (horse_id, horse_name, trainer, trainer_ipa, status, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (horse_id) DO NOTHING
+""")
+INSERT_SIRE = register_statement('entries_insert_sire', """
+    INSERT INTO horses (horse_id, horse_name, status, created_at)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (horse_id) DO NOTHING
+""")
+SELECT_TRAINER = register_statement('entries_select_trainer', "SELECT trainer_name FROM trainers WHERE trainer_name = %s")
+INSERT_TRAINER = register_statement('entries_insert_trainer', """
+    INSERT INTO trainers (trainer_name, trainer_name_ipa) VALUES (%s, %s)
+    ON CONFLICT (trainer_name) DO NOTHING
+""")
+SELECT_JOCKEY = register_statement('entries_select_jockey', "SELECT jockey_name FROM jockeys WHERE jockey_name = %s")
+INSERT_JOCKEY = register_statement('entries_insert_jockey', """
+    INSERT INTO jockeys (jockey_name, jockey_name_ipa) VALUES (%s, %s)
+    ON CONFLICT (jockey_name) DO NOTHING
+""")
+SELECT_OWNER = register_statement('entries_select_owner', "SELECT owner_name FROM owners WHERE owner_name = %s")
+INSERT_OWNER = register_statement('entries_insert_owner', """
+    INSERT INTO owners (owner_name, owner_name_ipa) VALUES (%s, %s)
+    ON CONFLICT (owner_name) DO NOTHING
+""")
+SELECT_BREEDER = register_statement('entries_select_breeder', "SELECT breeder_name FROM breeders WHERE breeder_name = %s")
+INSERT_BREEDER = register_statement('entries_insert_breeder', """
+    INSERT INTO breeders (breeder_name, breeder_name_ipa) VALUES (%s, %s)
+    ON CONFLICT (breeder_name) DO NOTHING
+""")
+
 def translate_ipa_to_spanish(ipa_text):
     """Traduce texto IPA a pronunciación en español"""
     if not ipa_text:
@@ -46,6 +82,23 @@ def translate_ipa_to_spanish(ipa_text):
     
     return spanish_pronunciation
 
+def sire_key_from_name(sire_name):
+    """
+    Clave de un padre a partir de su nombre ("Into Mischief" → "Into_Mischief").
+    Misma regla que la función SQL sire_key_from_name de las estadísticas de padres.
+    """
+    if not sire_name or sire_name.strip() == '' or sire_name.strip().lower() in ['unknown', 'n/a', 'none']:
+        return None
+    return sire_name.strip().replace(' ', '_').replace("'", "").replace('.', '').replace(',', '')
+
+def sire_stats_key(sire):
+    """
+    Clave de las estadísticas de padres a partir del nombre o del horse_id
+    ("Into_Mischief_1" → "Into_Mischief"). Misma regla que la función SQL sire_stats_key.
+    """
+    key = sire_key_from_name(sire)
+    return re.sub(r'_[0-9]+$', '', key) if key else None
+
 def find_or_create_sire_horse_id(cursor, sire_name):
     """
     Busca o crea un horse_id para un sire (padre) en la tabla horses.
@@ -57,11 +110,11 @@ def find_or_create_sire_horse_id(cursor, sire_name):
     sire_name_clean = sire_name.strip()
     
     # Generar un horse_id basado en el nombre del sire
-    sire_id = sire_name_clean.replace(' ', '_').replace("'", "").replace('.', '').replace(',', '')
+    sire_id = sire_key_from_name(sire_name_clean)
     
     try:
         # Verificar si ya existe
-        cursor.execute("SELECT horse_id FROM horses WHERE horse_id = %s", (sire_id,))
+        execute_prepared(cursor, SELECT_HORSE, (sire_id,))
         result = cursor.fetchone()
         
         if result:
@@ -69,12 +122,7 @@ def find_or_create_sire_horse_id(cursor, sire_name):
         
         # Si no existe, crearlo
         current_time = datetime.now()
-        insert_sire_query = """
-        INSERT INTO horses (horse_id, horse_name, status, created_at)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (horse_id) DO NOTHING
-        """
-        cursor.execute(insert_sire_query, (sire_id, sire_name_clean, 'sire', current_time))
+        execute_prepared(cursor, INSERT_SIRE, (sire_id, sire_name_clean, 'sire', current_time))
         
         logger.info(f"Sire creado: {sire_name_clean} -> {sire_id}")
         return sire_id
@@ -95,7 +143,7 @@ def find_or_create_trainer(cursor, trainer_name):
     
     try:
         # Verificar si ya existe usando trainer_name como PRIMARY KEY
-        cursor.execute("SELECT trainer_name FROM trainers WHERE trainer_name = %s", (trainer_name_clean,))
+        execute_prepared(cursor, SELECT_TRAINER, (trainer_name_clean,))
         result = cursor.fetchone()
         
         if result:
@@ -104,12 +152,7 @@ def find_or_create_trainer(cursor, trainer_name):
         # Si no existe, crearlo
         trainer_ipa = generate_english_ipa(trainer_name_clean) if trainer_name_clean else None
         
-        insert_trainer_query = """
-        INSERT INTO trainers (trainer_name, trainer_name_ipa)
-        VALUES (%s, %s)
-        ON CONFLICT (trainer_name) DO NOTHING
-        """
-        cursor.execute(insert_trainer_query, (trainer_name_clean, trainer_ipa))
+        execute_prepared(cursor, INSERT_TRAINER, (trainer_name_clean, trainer_ipa))
         
         logger.info(f"Trainer creado: {trainer_name_clean} (IPA: {trainer_ipa})")
         return trainer_name_clean
@@ -130,7 +173,7 @@ def find_or_create_jockey(cursor, jockey_name):
     
     try:
         # Verificar si ya existe usando jockey_name como PRIMARY KEY
-        cursor.execute("SELECT jockey_name FROM jockeys WHERE jockey_name = %s", (jockey_name_clean,))
+        execute_prepared(cursor, SELECT_JOCKEY, (jockey_name_clean,))
         result = cursor.fetchone()
         
         if result:
@@ -139,12 +182,7 @@ def find_or_create_jockey(cursor, jockey_name):
         # Si no existe, crearlo con IPA básico
         jockey_ipa = generate_english_ipa(jockey_name_clean) if jockey_name_clean else None
         
-        insert_jockey_query = """
-        INSERT INTO jockeys (jockey_name, jockey_name_ipa)
-        VALUES (%s, %s)
-        ON CONFLICT (jockey_name) DO NOTHING
-        """
-        cursor.execute(insert_jockey_query, (jockey_name_clean, jockey_ipa))
+        execute_prepared(cursor, INSERT_JOCKEY, (jockey_name_clean, jockey_ipa))
         
         logger.info(f"Jockey creado: {jockey_name_clean} (IPA: {jockey_ipa})")
         return jockey_name_clean
@@ -166,7 +204,7 @@ def find_or_create_owner(cursor, owner_name):
     
     try:
         # Verificar si ya existe usando owner_name como PRIMARY KEY
-        cursor.execute("SELECT owner_name FROM owners WHERE owner_name = %s", (owner_name_clean,))
+        execute_prepared(cursor, SELECT_OWNER, (owner_name_clean,))
         result = cursor.fetchone()
         
         if result:
@@ -175,12 +213,7 @@ def find_or_create_owner(cursor, owner_name):
         # Si no existe, crearlo con IPA básico
         owner_ipa = generate_english_ipa(owner_name_clean) if owner_name_clean else None
         
-        insert_owner_query = """
-        INSERT INTO owners (owner_name, owner_name_ipa)
-        VALUES (%s, %s)
-        ON CONFLICT (owner_name) DO NOTHING
-        """
-        cursor.execute(insert_owner_query, (owner_name_clean, owner_ipa))
+        execute_prepared(cursor, INSERT_OWNER, (owner_name_clean, owner_ipa))
         
         logger.info(f"Owner creado: {owner_name_clean} (IPA: {owner_ipa})")
         return owner_name_clean
@@ -202,7 +235,7 @@ def find_or_create_breeder(cursor, breeder_name):
     
     try:
         # Verificar si ya existe usando breeder_name como PRIMARY KEY
-        cursor.execute("SELECT breeder_name FROM breeders WHERE breeder_name = %s", (breeder_name_clean,))
+        execute_prepared(cursor, SELECT_BREEDER, (breeder_name_clean,))
         result = cursor.fetchone()
         
         if result:
@@ -211,12 +244,7 @@ def find_or_create_breeder(cursor, breeder_name):
         # Si no existe, crearlo con IPA básico
         breeder_ipa = generate_english_ipa(breeder_name_clean) if breeder_name_clean else None
         
-        insert_breeder_query = """
-        INSERT INTO breeders (breeder_name, breeder_name_ipa)
-        VALUES (%s, %s)
-        ON CONFLICT (breeder_name) DO NOTHING
-        """
-        cursor.execute(insert_breeder_query, (breeder_name_clean, breeder_ipa))
+        execute_prepared(cursor, INSERT_BREEDER, (breeder_name_clean, breeder_ipa))
         
         logger.info(f"Breeder creado: {breeder_name_clean} (IPA: {breeder_ipa})")
         return breeder_name_clean
@@ -241,7 +269,7 @@ def find_or_create_horse_with_id(cursor, horse_id, horse_name, sire_name=None, t
     
     try:
         # Verificar si ya existe
-        cursor.execute("SELECT horse_name FROM horses WHERE horse_id = %s", (horse_id_clean,))
+        execute_prepared(cursor, SELECT_HORSE, (horse_id_clean,))
         result = cursor.fetchone()
         
         if result:
@@ -251,12 +279,7 @@ def find_or_create_horse_with_id(cursor, horse_id, horse_name, sire_name=None, t
         trainer_ipa = generate_english_ipa(trainer_name) if trainer_name else None
         current_time = datetime.now()
         
-        insert_horse_query = """
-        INSERT INTO horses (horse_id, horse_name, trainer, trainer_ipa, status, created_at)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (horse_id) DO NOTHING
-        """
-        cursor.execute(insert_horse_query, (
+        execute_prepared(cursor, INSERT_HORSE, (
             horse_id_clean, 
             horse_name_clean, 
             trainer_name, 
@@ -287,7 +310,7 @@ def find_or_create_horse(cursor, horse_name, sire_name=None, trainer_name=None):
         horse_id = horse_name_clean.replace(' ', '_').replace("'", "").replace('.', '').replace(',', '')
         
         # Verificar si ya existe
-        cursor.execute("SELECT horse_name FROM horses WHERE horse_id = %s", (horse_id,))
+        execute_prepared(cursor, SELECT_HORSE, (horse_id,))
         result = cursor.fetchone()
         
         if result:
@@ -297,12 +320,7 @@ def find_or_create_horse(cursor, horse_name, sire_name=None, trainer_name=None):
         trainer_ipa = generate_english_ipa(trainer_name) if trainer_name else None
         current_time = datetime.now()
         
-        insert_horse_query = """
-        INSERT INTO horses (horse_id, horse_name, trainer, trainer_ipa, status, created_at)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (horse_id) DO NOTHING
-        """
-        cursor.execute(insert_horse_query, (
+        execute_prepared(cursor, INSERT_HORSE, (
             horse_id, 
             horse_name_clean, 
             trainer_name, 
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+Cada archivo database/migrations/NNNN_nombre.sql se aplica una sola vez y queda
+registrado en la tabla schema_version. Se ejecuta al desplegar/arrancar la
+aplicación, nunca en el camino de scraping.
+
+Uso:
+    python -m database.migrate            # aplicar migraciones pendientes
+    python -m database.migrate --status   # mostrar versión actual y pendientes
+
+Un archivo que empiece con la línea "-- migrate:no-transaction" se ejecuta
+sentencia por sentencia en modo autocommit (necesario para CREATE INDEX
+CONCURRENTLY). En esos archivos cada sentencia debe terminar con ";" al final
+de la línea y no se admiten cuerpos de funciones.
+
+Si una de esas sentencias falla, las anteriores ya quedaron aplicadas y la
+migración no se registra: el siguiente arranque la vuelve a ejecutar completa.
+Por eso cada sentencia debe ser idempotente (IF NOT EXISTS / IF EXISTS); se
+verifica antes de ejecutar nada. Los índices que un CREATE INDEX CONCURRENTLY
+interrumpido dejó inválidos se borran y se vuelven a crear.
+
+Las aplicaciones no migran al importarse: app.py y app_modular.py llaman a
+bootstrap_schema() al arrancar con python app.py. Con un servidor WSGI, ejecutar
+python -m database.migrate en el despliegue.
+"""
+
+import os
+import re
+import sys
+import argparse
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database.models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{4})_(\w+)\.sql$')
+NO_TRANSACTION_MARKER = '-- migrate:no-transaction'
+
+# Nombre del índice en CREATE [UNIQUE] INDEX CONCURRENTLY [IF NOT EXISTS] nombre
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?("?[\w.]+"?)',
+    re.IGNORECASE
+)
+
+# Toda sentencia de una migración no transaccional debe poder repetirse
+IDEMPOTENT_STATEMENT_PATTERN = re.compile(r'\bIF\s+(?:NOT\s+)?EXISTS\b', re.IGNORECASE)
+
+# Clave del advisory lock que evita que dos procesos migren a la vez
+MIGRATION_LOCK_KEY = 7301022801
+
+# Caché en proceso: una vez verificado el esquema no se vuelve a consultar
+_schema_ready = False
+
+
+def load_migrations():
+    """Devuelve la lista ordenada de migraciones (version, nombre, ruta)"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+
+def latest_version():
+    """Versión más reciente disponible en el directorio de migraciones"""
+    migrations = load_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+def get_current_version(cur):
+    """Versión aplicada en la base de datos (0 si schema_version no existe)"""
+    # Se busca en el esquema actual para poder migrar esquemas de prueba (benchmarks)
+    cur.execute("SELECT to_regclass(quote_ident(current_schema()) || '.schema_version')")
+    if cur.fetchone()[0] is None:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
+
+
+def split_statements(sql):
+    """Divide un archivo no transaccional en sentencias (una por cada ';' al final de línea)"""
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        if line.strip().startswith('--') and not current:
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statements.append('\n'.join(current).strip())
+            current = []
+    if '\n'.join(current).strip():
+        statements.append('\n'.join(current).strip())
+    return statements
+
+
+def drop_invalid_index(cur, statement):
+    """
+    Si la sentencia es un CREATE INDEX CONCURRENTLY y un intento anterior falló a
+    mitad de camino, el índice quedó creado pero INVALID (pg_index.indisvalid =
+    false): IF NOT EXISTS lo daría por bueno y nunca se construiría. Se borra para
+    que la sentencia lo vuelva a crear.
+    """
+    match = CONCURRENT_INDEX_PATTERN.search(statement)
+    if not match:
+        return False
+    index_name = match.group(1)
+    cur.execute("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i
+        WHERE i.indexrelid = to_regclass(%s)
+    """, (index_name,))
+    row = cur.fetchone()
+    if not row or not row[0]:
+        return False
+    logger.warning(f"Índice {index_name} inválido (CREATE INDEX CONCURRENTLY interrumpido): se vuelve a crear")
+    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+    return True
+
+
+def apply_migration(conn, version, name, path):
+    """Aplica una migración y la registra en schema_version"""
+    with open(path, encoding='utf-8') as f:
+        sql = f.read()
+
+    cur = conn.cursor()
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        statements = split_statements(sql)
+        # Sin transacción no hay rollback: reintentar tiene que ser seguro
+        for statement in statements:
+            if not IDEMPOTENT_STATEMENT_PATTERN.search(statement):
+                raise ValueError(
+                    f"Migración {version:04d}_{name}: sentencia no idempotente en un archivo "
+                    f"no transaccional (falta IF [NOT] EXISTS): {statement.splitlines()[-1]}"
+                )
+        conn.autocommit = True
+        try:
+            for number, statement in enumerate(statements, 1):
+                drop_invalid_index(cur, statement)
+                try:
+                    cur.execute(statement)
+                except Exception:
+                    logger.error(
+                        f"Migración {version:04d}_{name}: falló la sentencia {number}/{len(statements)}; "
+                        f"las anteriores quedaron aplicadas y se repetirán en el próximo intento"
+                    )
+                    raise
+            cur.execute(
+                "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+        finally:
+            conn.autocommit = False
+    else:
+        try:
+            cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    cur.close()
+    # RAISE WARNING de la migración (p. ej. filas que no se pudieron copiar);
+    # los NOTICE (DROP ... IF EXISTS, etc.) quedan en nivel debug
+    for notice in conn.notices:
+        level = logging.WARNING if notice.startswith('WARNING') else logging.DEBUG
+        logger.log(level, f"Migración {version:04d}_{name}: {notice.strip()}")
+    del conn.notices[:]
+    logger.info(f"✅ Migración {version:04d}_{name} aplicada")
+
+
+def apply_migrations(conn=None):
+    """Aplica todas las migraciones pendientes. Devuelve la lista de versiones aplicadas."""
+    own_connection = conn is None
+    if own_connection:
+        conn = get_db_connection()
+        if not conn:
+            logger.error("No se pudo conectar a la base de datos para aplicar migraciones")
+            return None
+
+    applied = []
+    try:
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        try:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            current_version = get_current_version(cur)
+            conn.autocommit = False
+
+            for version, name, path in load_migrations():
+                if version > current_version:
+                    logger.info(f"Aplicando migración {version:04d}_{name}...")
+                    apply_migration(conn, version, name, path)
+                    applied.append(version)
+        finally:
+            conn.rollback()
+            conn.autocommit = True
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+            conn.autocommit = False
+            cur.close()
+
+        if applied:
+            logger.info(f"Esquema actualizado a la versión {applied[-1]}")
+        else:
+            logger.info(f"Esquema al día (versión {current_version})")
+        return applied
+
+    except Exception as e:
+        logger.error(f"Error aplicando migraciones: {e}")
+        return None
+    finally:
+        if own_connection:
+            conn.close()
+
+
+def ensure_schema_ready():
+    """
+    Verificación rápida de que el esquema está migrado.
+    Solo consulta la BD la primera vez; luego responde desde memoria.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return True
+
+    conn = get_db_connection()
+    if not conn:
+        logger.error("No se pudo conectar a la base de datos para verificar el esquema")
+        return False
+
+    try:
+        cur = conn.cursor()
+        current_version = get_current_version(cur)
+        cur.close()
+    except Exception as e:
+        logger.error(f"Error verificando la versión del esquema: {e}")
+        return False
+    finally:
+        conn.close()
+
+    expected_version = latest_version()
+    if current_version < expected_version:
+        logger.error(
+            f"El esquema está en la versión {current_version} y se esperaba la {expected_version}. "
+            f"Ejecuta: python -m database.migrate"
+        )
+        return False
+
+    _schema_ready = True
+    return True
+
+
+def bootstrap_schema():
+    """Aplica las migraciones pendientes al arrancar y marca el esquema como listo"""
+    global _schema_ready
+    if os.getenv("DB_AUTO_MIGRATE", "1") == "0":
+        logger.info("DB_AUTO_MIGRATE=0: no se aplican migraciones al arrancar")
+        return ensure_schema_ready()
+
+    applied = apply_migrations()
+    if applied is None:
+        return False
+    _schema_ready = True
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aplicar migraciones del esquema de la base de datos')
+    parser.add_argument('--status', action='store_true', help='Mostrar la versión actual sin aplicar cambios')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.status:
+        conn = get_db_connection()
+        if not conn:
+            sys.exit(1)
+        cur = conn.cursor()
+        current_version = get_current_version(cur)
+        conn.close()
+        pending = [f"{v:04d}_{n}" for v, n, _ in load_migrations() if v > current_version]
+        print(f"Versión actual: {current_version}")
+        print(f"Pendientes: {', '.join(pending) if pending else 'ninguna'}")
+        return
+
+    if apply_migrations() is None:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
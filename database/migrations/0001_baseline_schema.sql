@@ -0,0 +1,134 @@
+-- 0001_baseline_schema.sql - Esquema base unificado
+--
+-- Reemplaza a las sentencias CREATE TABLE de database/models.py y a
+-- migrate_horses.sql. Todas las tablas usan horse_id como clave, que es lo
+-- que realmente consultan los servicios y las APIs.
+-- Se usa IF NOT EXISTS para poder aplicarla sobre bases ya existentes.
+
+CREATE TABLE IF NOT EXISTS races (
+    race_id VARCHAR(100) PRIMARY KEY,
+    race_name VARCHAR(255),
+    race_date DATE,
+    track_name VARCHAR(100),
+    track_ipa VARCHAR(255),
+    track_code VARCHAR(10),
+    race_number INTEGER,
+    race_type VARCHAR(100),
+    distance VARCHAR(50),
+    surface VARCHAR(50),
+    conditions_clean TEXT,
+    age_restriction VARCHAR(50),
+    specific_race_url TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS horses (
+    horse_id VARCHAR(255) PRIMARY KEY,
+    horse_name VARCHAR(255) NOT NULL,
+    horse_name_ipa VARCHAR(255),
+    owner VARCHAR(255),
+    owner_ipa VARCHAR(255),
+    trainer VARCHAR(255),
+    trainer_ipa VARCHAR(255),
+    breeder VARCHAR(255),
+    breeder_ipa VARCHAR(255),
+    country VARCHAR(100),
+    country_of_birth VARCHAR(100),
+    age INTEGER,
+    status VARCHAR(100),
+    sex VARCHAR(10),
+    color VARCHAR(100),
+    url TEXT,
+    profile_url TEXT,
+    last_race_date DATE,
+    last_scraped_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- NULL = perfil nunca scrapeado (lo usan las consultas de caballos pendientes)
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_horses_name ON horses(horse_name);
+CREATE INDEX IF NOT EXISTS idx_horses_trainer ON horses(trainer);
+CREATE INDEX IF NOT EXISTS idx_horses_owner ON horses(owner);
+CREATE INDEX IF NOT EXISTS idx_horses_sex ON horses(sex);
+CREATE INDEX IF NOT EXISTS idx_horses_country ON horses(country_of_birth);
+
+-- trainers, jockeys, owners y breeders usan el nombre como clave (ON CONFLICT en database/entries.py)
+CREATE TABLE IF NOT EXISTS trainers (
+    trainer_name VARCHAR(255) PRIMARY KEY,
+    trainer_name_ipa VARCHAR(255),
+    profile_url TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS jockeys (
+    jockey_name VARCHAR(255) PRIMARY KEY,
+    jockey_name_ipa VARCHAR(255),
+    profile_url TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS owners (
+    owner_name VARCHAR(255) PRIMARY KEY,
+    owner_name_ipa VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS breeders (
+    breeder_name VARCHAR(255) PRIMARY KEY,
+    breeder_name_ipa VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tracks (
+    track_code VARCHAR(10) PRIMARY KEY,
+    track_name VARCHAR(100),
+    track_name_ipa VARCHAR(255),
+    country VARCHAR(100),
+    active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS race_entries (
+    race_id VARCHAR(100) REFERENCES races(race_id) ON DELETE CASCADE,
+    horse_id VARCHAR(255),
+    horse_name VARCHAR(255),
+    trainer VARCHAR(255),
+    jockey VARCHAR(255),
+    status VARCHAR(20) DEFAULT 'active',
+    status_history TEXT,
+    status_changed_at TIMESTAMP,
+    post_position INTEGER,
+    sire VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP,
+    PRIMARY KEY(race_id, horse_id)
+);
+
+-- Sin FK hacia horses: los ancestros pueden llegar antes que la ficha del caballo
+-- (ver /api/pedigree/check-missing-horses)
+CREATE TABLE IF NOT EXISTS pedigree (
+    horse_id VARCHAR(255) PRIMARY KEY,
+    sire_id VARCHAR(255),
+    dam_id VARCHAR(255),
+    paternal_grandsire_id VARCHAR(255),
+    paternal_granddam_id VARCHAR(255),
+    maternal_grandsire_id VARCHAR(255),
+    maternal_granddam_id VARCHAR(255),
+    paternal_gg_sire_id VARCHAR(255),
+    paternal_gg_dam_id VARCHAR(255),
+    paternal_gd_sire_id VARCHAR(255),
+    paternal_gd_dam_id VARCHAR(255),
+    maternal_gg_sire_id VARCHAR(255),
+    maternal_gg_dam_id VARCHAR(255),
+    maternal_gd_sire_id VARCHAR(255),
+    maternal_gd_dam_id VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP
+);
@@ -0,0 +1,19 @@
+-- migrate:no-transaction
+-- 0002_hot_query_indexes.sql - Índices para las consultas más frecuentes
+--
+-- Se crean con CONCURRENTLY para no bloquear escrituras en bases grandes.
+-- Medir con: python scripts/benchmark_queries.py
+
+-- api/races.get_races: WHERE race_date = (SELECT MAX(race_date) ...) ORDER BY race_number
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_races_date_number ON races (race_date, race_number);
+
+-- JOIN race_entries ↔ horses en los scrapings masivos y búsquedas por caballo
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_race_entries_horse_id ON race_entries (horse_id);
+
+-- Selección de caballos pendientes: updated_at IS NULL OR updated_at < NOW() - INTERVAL '20 days'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_updated_at ON horses (updated_at);
+
+-- Progenie por padre, madre y abuelo materno
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pedigree_sire_id ON pedigree (sire_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pedigree_dam_id ON pedigree (dam_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pedigree_maternal_grandsire_id ON pedigree (maternal_grandsire_id);
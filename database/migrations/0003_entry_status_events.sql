@@ -0,0 +1,43 @@
+-- 0003_entry_status_events.sql - Historial de status como eventos append-only
+--
+-- Reemplaza la columna race_entries.status_history (TEXT que se reescribía
+-- completa en cada cambio) por una fila por observación de cambio de status.
+-- from_status NULL indica la primera vez que se vio al caballo en la carrera.
+
+CREATE TABLE IF NOT EXISTS entry_status_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    race_id VARCHAR(100) NOT NULL,
+    horse_id VARCHAR(255) NOT NULL,
+    track_code VARCHAR(10),
+    from_status VARCHAR(20),
+    to_status VARCHAR(20) NOT NULL,
+    observed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Historial de una carrera (api/races.get_race_entries)
+CREATE INDEX IF NOT EXISTS idx_entry_status_events_race
+    ON entry_status_events (race_id, horse_id, observed_at);
+
+-- "Todos los retiros en el hipódromo X hoy"
+CREATE INDEX IF NOT EXISTS idx_entry_status_events_track_status
+    ON entry_status_events (track_code, to_status, observed_at);
+
+-- Migrar el historial existente. Formatos de línea que generaba save_race_data_to_db:
+--   "2025-06-01 12:00:00: inicial → active"
+--   "2025-06-01 12:00:00: active → scratched (inicial)"
+--   "2025-06-01 12:30:00: active → scratched"
+INSERT INTO entry_status_events (race_id, horse_id, track_code, from_status, to_status, observed_at)
+SELECT re.race_id, re.horse_id, r.track_code,
+       CASE WHEN m[2] = 'inicial' OR m[4] IS NOT NULL THEN NULL ELSE m[2] END,
+       m[3],
+       m[1]::timestamp
+FROM race_entries re
+LEFT JOIN races r ON r.race_id = re.race_id
+CROSS JOIN LATERAL regexp_split_to_table(re.status_history, E'\n') AS line
+CROSS JOIN LATERAL regexp_match(
+    line, '^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}): (\S+) → (\S+)( \(inicial\))?$'
+) AS m
+WHERE re.status_history IS NOT NULL
+AND m IS NOT NULL;
+
+ALTER TABLE race_entries DROP COLUMN IF EXISTS status_history;
@@ -0,0 +1,68 @@
+-- 0004_pedigree_edges.sql - Pedigree normalizado en aristas y clausura de ancestros
+--
+-- pedigree_edges guarda una arista por progenitor (child_id, role, parent_id),
+-- derivada de las 14 columnas posicionales de pedigree. pedigree_closure guarda
+-- todos los pares ancestro/descendiente con la profundidad mínima, de modo que
+-- "ancestros de X" y "descendientes de X" a cualquier profundidad son lookups
+-- por índice. Ambas se mantienen desde database/pedigree_graph.py al guardar.
+
+CREATE TABLE IF NOT EXISTS pedigree_edges (
+    child_id VARCHAR(255) NOT NULL,
+    role VARCHAR(4) NOT NULL CHECK (role IN ('sire', 'dam')),
+    parent_id VARCHAR(255) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (child_id, role)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pedigree_edges_parent ON pedigree_edges (parent_id);
+
+CREATE TABLE IF NOT EXISTS pedigree_closure (
+    descendant_id VARCHAR(255) NOT NULL,
+    ancestor_id VARCHAR(255) NOT NULL,
+    depth SMALLINT NOT NULL,
+    PRIMARY KEY (descendant_id, ancestor_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pedigree_closure_ancestor ON pedigree_closure (ancestor_id, depth);
+
+-- Aristas a partir de las columnas posicionales. Si dos pedigrees discrepan sobre
+-- el mismo progenitor gana el pedigree actualizado más recientemente.
+INSERT INTO pedigree_edges (child_id, role, parent_id)
+SELECT DISTINCT ON (child_id, role) child_id, role, parent_id
+FROM (
+    SELECT updated_at, horse_id AS child_id, 'sire' AS role, sire_id AS parent_id FROM pedigree
+    UNION ALL SELECT updated_at, horse_id, 'dam', dam_id FROM pedigree
+    UNION ALL SELECT updated_at, sire_id, 'sire', paternal_grandsire_id FROM pedigree
+    UNION ALL SELECT updated_at, sire_id, 'dam', paternal_granddam_id FROM pedigree
+    UNION ALL SELECT updated_at, dam_id, 'sire', maternal_grandsire_id FROM pedigree
+    UNION ALL SELECT updated_at, dam_id, 'dam', maternal_granddam_id FROM pedigree
+    UNION ALL SELECT updated_at, paternal_grandsire_id, 'sire', paternal_gg_sire_id FROM pedigree
+    UNION ALL SELECT updated_at, paternal_grandsire_id, 'dam', paternal_gg_dam_id FROM pedigree
+    UNION ALL SELECT updated_at, paternal_granddam_id, 'sire', paternal_gd_sire_id FROM pedigree
+    UNION ALL SELECT updated_at, paternal_granddam_id, 'dam', paternal_gd_dam_id FROM pedigree
+    UNION ALL SELECT updated_at, maternal_grandsire_id, 'sire', maternal_gg_sire_id FROM pedigree
+    UNION ALL SELECT updated_at, maternal_grandsire_id, 'dam', maternal_gg_dam_id FROM pedigree
+    UNION ALL SELECT updated_at, maternal_granddam_id, 'sire', maternal_gd_sire_id FROM pedigree
+    UNION ALL SELECT updated_at, maternal_granddam_id, 'dam', maternal_gd_dam_id FROM pedigree
+) AS positional
+WHERE child_id IS NOT NULL
+AND parent_id IS NOT NULL
+AND child_id <> parent_id
+ORDER BY child_id, role, updated_at DESC NULLS LAST
+ON CONFLICT (child_id, role) DO NOTHING;
+
+-- Clausura completa (profundidad máxima 20 como protección ante ciclos por datos erróneos)
+INSERT INTO pedigree_closure (descendant_id, ancestor_id, depth)
+WITH RECURSIVE walk (descendant_id, ancestor_id, depth) AS (
+    SELECT child_id, parent_id, 1 FROM pedigree_edges
+    UNION
+    SELECT w.descendant_id, e.parent_id, w.depth + 1
+    FROM walk w
+    JOIN pedigree_edges e ON e.child_id = w.ancestor_id
+    WHERE w.depth < 20
+)
+SELECT descendant_id, ancestor_id, MIN(depth)
+FROM walk
+WHERE descendant_id <> ancestor_id
+GROUP BY descendant_id, ancestor_id
+ON CONFLICT (descendant_id, ancestor_id) DO NOTHING;
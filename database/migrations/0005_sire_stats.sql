@@ -0,0 +1,220 @@
+-- 0005_sire_stats.sql - Estadísticas de padres y abuelos maternos
+--
+-- Se mantienen de forma incremental con triggers sobre pedigree, race_entries
+-- y races: cada fila insertada, modificada o borrada suma o resta 1 en las
+-- tablas de agregados, sin recalcular con escaneos completos.
+--
+--   sire_stats           progenie conocida (pedigree.sire_id) y progenie como abuelo materno
+--   sire_starter_stats   participantes activos por superficie y distancia (race_entries.sire)
+--   sire_daily_runners   participantes activos por día (corredores de hoy)
+--
+-- race_entries solo trae el nombre del padre; la clave se deriva del nombre
+-- igual que find_or_create_sire_horse_id ("Into Mischief" → "Into_Mischief").
+
+CREATE OR REPLACE FUNCTION sire_key_from_name(sire_name TEXT) RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN sire_name IS NULL OR btrim(sire_name) = '' OR lower(btrim(sire_name)) IN ('unknown', 'n/a', 'none') THEN NULL
+        ELSE replace(replace(replace(replace(btrim(sire_name), ' ', '_'), '''', ''), '.', ''), ',', '')
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS sire_stats (
+    sire_key VARCHAR(255) PRIMARY KEY,
+    progeny_count INTEGER NOT NULL DEFAULT 0,
+    damsire_progeny_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sire_starter_stats (
+    sire_key VARCHAR(255) NOT NULL,
+    surface VARCHAR(50) NOT NULL,
+    distance VARCHAR(50) NOT NULL,
+    starters INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (sire_key, surface, distance)
+);
+
+CREATE TABLE IF NOT EXISTS sire_daily_runners (
+    sire_key VARCHAR(255) NOT NULL,
+    race_date DATE NOT NULL,
+    runners INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sire_key, race_date)
+);
+
+-- "Padres con corredores hoy"
+CREATE INDEX IF NOT EXISTS idx_sire_daily_runners_date ON sire_daily_runners (race_date, runners DESC);
+
+-- Progenie (pedigree) ------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION sire_stats_add(p_sire_key TEXT, p_progeny INTEGER, p_damsire_progeny INTEGER)
+RETURNS void AS $$
+BEGIN
+    IF p_sire_key IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO sire_stats (sire_key, progeny_count, damsire_progeny_count)
+    VALUES (p_sire_key, p_progeny, p_damsire_progeny)
+    ON CONFLICT (sire_key) DO UPDATE SET
+        progeny_count = sire_stats.progeny_count + EXCLUDED.progeny_count,
+        damsire_progeny_count = sire_stats.damsire_progeny_count + EXCLUDED.damsire_progeny_count,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION pedigree_sire_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM sire_stats_add(OLD.sire_id, -1, 0);
+        PERFORM sire_stats_add(OLD.maternal_grandsire_id, 0, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM sire_stats_add(NEW.sire_id, 1, 0);
+        PERFORM sire_stats_add(NEW.maternal_grandsire_id, 0, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_pedigree_sire_stats ON pedigree;
+CREATE TRIGGER trg_pedigree_sire_stats
+    AFTER INSERT OR DELETE ON pedigree
+    FOR EACH ROW EXECUTE FUNCTION pedigree_sire_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_pedigree_sire_stats_update ON pedigree;
+CREATE TRIGGER trg_pedigree_sire_stats_update
+    AFTER UPDATE OF sire_id, maternal_grandsire_id ON pedigree
+    FOR EACH ROW
+    WHEN (OLD.sire_id IS DISTINCT FROM NEW.sire_id
+          OR OLD.maternal_grandsire_id IS DISTINCT FROM NEW.maternal_grandsire_id)
+    EXECUTE FUNCTION pedigree_sire_stats_trigger();
+
+-- Participantes (race_entries + races) --------------------------------------
+
+CREATE OR REPLACE FUNCTION sire_entry_stats_apply(
+    p_sire_key TEXT, p_race_date DATE, p_surface TEXT, p_distance TEXT, p_delta INTEGER
+) RETURNS void AS $$
+BEGIN
+    IF p_sire_key IS NULL OR p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO sire_starter_stats (sire_key, surface, distance, starters)
+    VALUES (p_sire_key,
+            COALESCE(NULLIF(btrim(p_surface), ''), 'Unknown'),
+            COALESCE(NULLIF(btrim(p_distance), ''), 'Unknown'),
+            p_delta)
+    ON CONFLICT (sire_key, surface, distance) DO UPDATE SET
+        starters = sire_starter_stats.starters + EXCLUDED.starters,
+        updated_at = CURRENT_TIMESTAMP;
+
+    IF p_race_date IS NOT NULL THEN
+        INSERT INTO sire_daily_runners (sire_key, race_date, runners)
+        VALUES (p_sire_key, p_race_date, p_delta)
+        ON CONFLICT (sire_key, race_date) DO UPDATE SET
+            runners = sire_daily_runners.runners + EXCLUDED.runners;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION race_entries_sire_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    race RECORD;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'active' THEN
+        SELECT race_date, surface, distance INTO race FROM races WHERE race_id = OLD.race_id;
+        -- Si la carrera ya no existe, el trigger de races descontó sus participantes
+        IF FOUND THEN
+            PERFORM sire_entry_stats_apply(sire_key_from_name(OLD.sire), race.race_date, race.surface, race.distance, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'active' THEN
+        SELECT race_date, surface, distance INTO race FROM races WHERE race_id = NEW.race_id;
+        IF FOUND THEN
+            PERFORM sire_entry_stats_apply(sire_key_from_name(NEW.sire), race.race_date, race.surface, race.distance, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_race_entries_sire_stats ON race_entries;
+CREATE TRIGGER trg_race_entries_sire_stats
+    AFTER INSERT OR DELETE ON race_entries
+    FOR EACH ROW EXECUTE FUNCTION race_entries_sire_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_race_entries_sire_stats_update ON race_entries;
+CREATE TRIGGER trg_race_entries_sire_stats_update
+    AFTER UPDATE OF sire, status, race_id ON race_entries
+    FOR EACH ROW
+    WHEN (OLD.sire IS DISTINCT FROM NEW.sire
+          OR OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.race_id IS DISTINCT FROM NEW.race_id)
+    EXECUTE FUNCTION race_entries_sire_stats_trigger();
+
+-- Cambios de fecha/superficie/distancia de una carrera mueven a sus participantes
+CREATE OR REPLACE FUNCTION races_sire_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    entry RECORD;
+BEGIN
+    FOR entry IN
+        SELECT sire_key_from_name(sire) AS sire_key, COUNT(*)::integer AS runners
+        FROM race_entries
+        WHERE race_id = OLD.race_id AND status = 'active'
+        GROUP BY 1
+    LOOP
+        PERFORM sire_entry_stats_apply(entry.sire_key, OLD.race_date, OLD.surface, OLD.distance, -entry.runners);
+        IF TG_OP = 'UPDATE' THEN
+            PERFORM sire_entry_stats_apply(entry.sire_key, NEW.race_date, NEW.surface, NEW.distance, entry.runners);
+        END IF;
+    END LOOP;
+    -- En BEFORE DELETE hay que devolver OLD para que el borrado continúe
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_races_sire_stats_update ON races;
+CREATE TRIGGER trg_races_sire_stats_update
+    AFTER UPDATE OF race_date, surface, distance ON races
+    FOR EACH ROW
+    WHEN (OLD.race_date IS DISTINCT FROM NEW.race_date
+          OR OLD.surface IS DISTINCT FROM NEW.surface
+          OR OLD.distance IS DISTINCT FROM NEW.distance)
+    EXECUTE FUNCTION races_sire_stats_trigger();
+
+-- BEFORE DELETE: la carrera todavía existe y sus participantes también
+DROP TRIGGER IF EXISTS trg_races_sire_stats_delete ON races;
+CREATE TRIGGER trg_races_sire_stats_delete
+    BEFORE DELETE ON races
+    FOR EACH ROW EXECUTE FUNCTION races_sire_stats_trigger();
+
+-- Carga inicial desde los datos existentes ---------------------------------
+
+TRUNCATE sire_stats, sire_starter_stats, sire_daily_runners;
+
+INSERT INTO sire_stats (sire_key, progeny_count, damsire_progeny_count)
+SELECT sire_key, SUM(progeny), SUM(damsire_progeny)
+FROM (
+    SELECT sire_id AS sire_key, 1 AS progeny, 0 AS damsire_progeny FROM pedigree WHERE sire_id IS NOT NULL
+    UNION ALL
+    SELECT maternal_grandsire_id, 0, 1 FROM pedigree WHERE maternal_grandsire_id IS NOT NULL
+) AS progeny
+GROUP BY sire_key;
+
+INSERT INTO sire_starter_stats (sire_key, surface, distance, starters)
+SELECT sire_key_from_name(re.sire),
+       COALESCE(NULLIF(btrim(r.surface), ''), 'Unknown'),
+       COALESCE(NULLIF(btrim(r.distance), ''), 'Unknown'),
+       COUNT(*)
+FROM race_entries re
+JOIN races r ON r.race_id = re.race_id
+WHERE re.status = 'active' AND sire_key_from_name(re.sire) IS NOT NULL
+GROUP BY 1, 2, 3;
+
+INSERT INTO sire_daily_runners (sire_key, race_date, runners)
+SELECT sire_key_from_name(re.sire), r.race_date, COUNT(*)
+FROM race_entries re
+JOIN races r ON r.race_id = re.race_id
+WHERE re.status = 'active' AND sire_key_from_name(re.sire) IS NOT NULL AND r.race_date IS NOT NULL
+GROUP BY 1, 2;
@@ -0,0 +1,24 @@
+-- 0006_system_stats.sql - Resumen materializado para el dashboard
+--
+-- Una sola fila con los conteos globales. /api/horses/stats la lee en tiempo
+-- constante; services/stats_service.py la refresca con REFRESH ... CONCURRENTLY
+-- después de los scrapings y de las actualizaciones masivas.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS system_stats AS
+SELECT
+    1 AS id,
+    (SELECT COUNT(*) FROM horses) AS total_horses,
+    (SELECT COUNT(*) FROM horses WHERE updated_at IS NOT NULL) AS horses_with_profile,
+    (SELECT COUNT(*) FROM horses
+        WHERE updated_at IS NULL OR updated_at < NOW() - INTERVAL '20 days') AS horses_stale,
+    (SELECT COUNT(*) FROM pedigree) AS horses_with_pedigree,
+    (SELECT COUNT(*) FROM races) AS total_races,
+    (SELECT MAX(race_date) FROM races) AS last_race_date,
+    (SELECT COUNT(*) FROM race_entries) AS total_entries,
+    (SELECT COUNT(*) FROM race_entries WHERE status = 'active') AS active_entries,
+    (SELECT COUNT(*) FROM race_entries WHERE status = 'scratched') AS scratched_entries,
+    (SELECT COUNT(*) FROM tracks WHERE active = true) AS total_tracks,
+    NOW() AS refreshed_at;
+
+-- Necesario para REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_system_stats_id ON system_stats (id);
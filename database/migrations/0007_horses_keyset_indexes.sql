@@ -0,0 +1,24 @@
+-- migrate:no-transaction
+-- 0007_horses_keyset_indexes.sql - Índices para el listado paginado de /api/horses
+--
+-- El listado se ordena por (horse_name, horse_id) y pide la página siguiente con
+-- WHERE (horse_name, horse_id) > (cursor), así que cada filtro necesita un índice
+-- que termine en esa clave para leer solo las filas de la página.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_name_id ON horses (horse_name, horse_id);
+
+-- ?status= y ?country_of_birth=
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_status_name_id ON horses (status, horse_name, horse_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_country_name_id ON horses (country_of_birth, horse_name, horse_id);
+
+-- ?missing_ipa=1
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_missing_ipa_name_id ON horses (horse_name, horse_id)
+    WHERE horse_name_ipa IS NULL OR horse_name_ipa = '';
+
+-- ?stale=1 recorre idx_horses_name_id filtrando por updated_at (el corte depende
+-- de NOW(), no puede ser un índice parcial); idx_horses_updated_at (0002) cubre
+-- el caso en que los pendientes son pocos.
+
+-- idx_horses_name y idx_horses_country quedan cubiertos por los índices compuestos
+DROP INDEX CONCURRENTLY IF EXISTS idx_horses_name;
+DROP INDEX CONCURRENTLY IF EXISTS idx_horses_country;
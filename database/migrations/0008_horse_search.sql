@@ -0,0 +1,11 @@
+-- migrate:no-transaction
+-- 0008_horse_search.sql - Índices de trigramas para /api/horses/search
+--
+-- pg_trgm (incluida en contrib de PostgreSQL) permite resolver ILIKE '%texto%'
+-- y la similitud (operador %) con índices GIN en lugar de recorrer la tabla.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_name_trgm ON horses USING GIN (horse_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_trainer_trgm ON horses USING GIN (trainer gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_horses_owner_trgm ON horses USING GIN (owner gin_trgm_ops);
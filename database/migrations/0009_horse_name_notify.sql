@@ -0,0 +1,29 @@
+-- 0009_horse_name_notify.sql - Avisos de altas, bajas y cambios de nombre de caballos
+--
+-- El índice de prefijos en memoria del autocompletado
+-- (services/horse_search_service.py) se mantiene con estos avisos, vengan del
+-- proceso que vengan. El canal debe coincidir con database/notifications.py.
+
+CREATE OR REPLACE FUNCTION notify_horse_name_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('caballos_changes', json_build_object(
+        'kind', 'horse_name',
+        'horse_id', COALESCE(NEW.horse_id, OLD.horse_id),
+        'old_name', CASE WHEN TG_OP = 'INSERT' THEN NULL ELSE OLD.horse_name END,
+        'new_name', CASE WHEN TG_OP = 'DELETE' THEN NULL ELSE NEW.horse_name END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_horses_name_notify ON horses;
+CREATE TRIGGER trg_horses_name_notify
+    AFTER INSERT OR DELETE ON horses
+    FOR EACH ROW EXECUTE FUNCTION notify_horse_name_change();
+
+DROP TRIGGER IF EXISTS trg_horses_name_update_notify ON horses;
+CREATE TRIGGER trg_horses_name_update_notify
+    AFTER UPDATE OF horse_name ON horses
+    FOR EACH ROW
+    WHEN (OLD.horse_name IS DISTINCT FROM NEW.horse_name)
+    EXECUTE FUNCTION notify_horse_name_change();
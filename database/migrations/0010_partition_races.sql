@@ -0,0 +1,252 @@
+-- 0010_partition_races.sql - races y race_entries particionadas por mes de race_date
+--
+-- Las dos tablas crecen todos los días y las lecturas de carreras siempre van
+-- por fecha. Con particionado declarativo por rango (un mes por partición) las
+-- consultas con race_date solo tocan las particiones de esos meses y los meses
+-- viejos se pueden archivar y soltar sin DELETE masivos
+-- (scripts/manage_partitions.py).
+--
+-- Cambios de esquema:
+--   * races: race_date pasa a ser NOT NULL y la clave es (race_id, race_date)
+--     (en una tabla particionada la clave debe incluir la columna de partición)
+--   * race_entries: nueva columna race_date (copia de la de su carrera) y clave
+--     (race_id, horse_id, race_date); la FK apunta a (race_id, race_date)
+--
+-- Requiere PostgreSQL 13+ (triggers BEFORE por fila en tablas particionadas).
+-- No hay partición DEFAULT: ensure_race_partitions() crea el mes antes de
+-- insertar (database/partitions.py lo hace al guardar cada carrera).
+
+DROP MATERIALIZED VIEW IF EXISTS system_stats;
+
+ALTER TABLE race_entries RENAME TO race_entries_unpartitioned;
+ALTER TABLE race_entries_unpartitioned RENAME CONSTRAINT race_entries_pkey TO race_entries_unpartitioned_pkey;
+ALTER TABLE races RENAME TO races_unpartitioned;
+ALTER TABLE races_unpartitioned RENAME CONSTRAINT races_pkey TO races_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_races_date_number;
+DROP INDEX IF EXISTS idx_race_entries_horse_id;
+
+-- Misma lógica que utils/race_parser.race_date_from_race_id: TRACK_YYYYMMDD_R1_TYPE
+CREATE OR REPLACE FUNCTION race_date_from_race_id(p_race_id TEXT) RETURNS DATE AS $$
+BEGIN
+    RETURN to_date(substring(p_race_id FROM '^[^_]+_([0-9]{8})_'), 'YYYYMMDD');
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE TABLE races (
+    race_id VARCHAR(100) NOT NULL,
+    race_name VARCHAR(255),
+    race_date DATE NOT NULL,
+    track_name VARCHAR(100),
+    track_ipa VARCHAR(255),
+    track_code VARCHAR(10),
+    race_number INTEGER,
+    race_type VARCHAR(100),
+    distance VARCHAR(50),
+    surface VARCHAR(50),
+    conditions_clean TEXT,
+    age_restriction VARCHAR(50),
+    specific_race_url TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (race_id, race_date)
+) PARTITION BY RANGE (race_date);
+
+CREATE TABLE race_entries (
+    race_id VARCHAR(100) NOT NULL,
+    race_date DATE NOT NULL,
+    horse_id VARCHAR(255) NOT NULL,
+    horse_name VARCHAR(255),
+    trainer VARCHAR(255),
+    jockey VARCHAR(255),
+    status VARCHAR(20) DEFAULT 'active',
+    status_changed_at TIMESTAMP,
+    post_position INTEGER,
+    sire VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (race_id, horse_id, race_date),
+    FOREIGN KEY (race_id, race_date) REFERENCES races (race_id, race_date) ON DELETE CASCADE
+) PARTITION BY RANGE (race_date);
+
+-- Crea las particiones mensuales de ambas tablas entre p_from y p_to (inclusive).
+-- Devuelve cuántos meses se crearon.
+CREATE OR REPLACE FUNCTION ensure_race_partitions(p_from DATE, p_to DATE) RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', p_from)::date;
+    month_end DATE;
+    suffix TEXT;
+    created INTEGER := 0;
+BEGIN
+    -- Dos procesos guardando el mismo mes nuevo: el segundo espera y ve la tabla creada
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_race_partitions'));
+    WHILE month_start <= p_to LOOP
+        month_end := (month_start + INTERVAL '1 month')::date;
+        suffix := to_char(month_start, 'YYYY_MM');
+        IF to_regclass('races_' || suffix) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF races FOR VALUES FROM (%L) TO (%L)',
+                           'races_' || suffix, month_start, month_end);
+            created := created + 1;
+        END IF;
+        IF to_regclass('race_entries_' || suffix) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF race_entries FOR VALUES FROM (%L) TO (%L)',
+                           'race_entries_' || suffix, month_start, month_end);
+        END IF;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Copia de datos ------------------------------------------------------------
+-- Carreras sin fecha: se toma la del race_id y, si no tiene, la de creación
+
+CREATE TEMP TABLE race_dates_migration ON COMMIT DROP AS
+SELECT race_id,
+       COALESCE(race_date, race_date_from_race_id(race_id), created_at::date, CURRENT_DATE) AS race_date
+FROM races_unpartitioned;
+
+SELECT ensure_race_partitions(
+    COALESCE(MIN(race_date), CURRENT_DATE),
+    GREATEST(COALESCE(MAX(race_date), CURRENT_DATE), CURRENT_DATE + 62)
+)
+FROM race_dates_migration;
+
+INSERT INTO races (race_id, race_name, race_date, track_name, track_ipa, track_code, race_number,
+                   race_type, distance, surface, conditions_clean, age_restriction, specific_race_url,
+                   created_at, updated_at)
+SELECT r.race_id, r.race_name, d.race_date, r.track_name, r.track_ipa, r.track_code, r.race_number,
+       r.race_type, r.distance, r.surface, r.conditions_clean, r.age_restriction, r.specific_race_url,
+       r.created_at, r.updated_at
+FROM races_unpartitioned r
+JOIN race_dates_migration d ON d.race_id = r.race_id;
+
+-- Participantes que no se pueden copiar: sin horse_id (es parte de la clave
+-- primaria nueva) o sin carrera (race_id nulo o de una carrera que ya no
+-- existe). No se copian; el aviso queda en el log de la migración.
+DO $$
+DECLARE
+    without_horse INTEGER;
+    without_race INTEGER;
+BEGIN
+    SELECT COUNT(*) FILTER (WHERE re.horse_id IS NULL),
+           COUNT(*) FILTER (WHERE re.horse_id IS NOT NULL AND d.race_id IS NULL)
+    INTO without_horse, without_race
+    FROM race_entries_unpartitioned re
+    LEFT JOIN race_dates_migration d ON d.race_id = re.race_id;
+    IF without_horse + without_race > 0 THEN
+        RAISE WARNING '0010: % participantes sin horse_id y % sin carrera no se copian a race_entries',
+                      without_horse, without_race;
+    END IF;
+END;
+$$;
+
+INSERT INTO race_entries (race_id, race_date, horse_id, horse_name, trainer, jockey, status,
+                          status_changed_at, post_position, sire, created_at, updated_at)
+SELECT re.race_id, d.race_date, re.horse_id, re.horse_name, re.trainer, re.jockey, re.status,
+       re.status_changed_at, re.post_position, re.sire, re.created_at, re.updated_at
+FROM race_entries_unpartitioned re
+JOIN race_dates_migration d ON d.race_id = re.race_id
+WHERE re.horse_id IS NOT NULL;
+
+DROP TABLE race_entries_unpartitioned;
+DROP TABLE races_unpartitioned;
+
+-- Índices en la tabla padre: se crean en cada partición, también en las futuras
+CREATE INDEX idx_races_date_number ON races (race_date, race_number);
+CREATE INDEX idx_race_entries_horse_id ON race_entries (horse_id);
+
+-- Triggers de estadísticas de padres (0005) --------------------------------
+-- Se recrean después de la copia para no volver a sumar los participantes, y
+-- las búsquedas entre tablas incluyen race_date para tocar una sola partición.
+
+CREATE OR REPLACE FUNCTION race_entries_sire_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    race RECORD;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'active' THEN
+        SELECT race_date, surface, distance INTO race FROM races
+        WHERE race_id = OLD.race_id AND race_date = OLD.race_date;
+        -- Si la carrera ya no existe, el trigger de races descontó sus participantes
+        IF FOUND THEN
+            PERFORM sire_entry_stats_apply(sire_key_from_name(OLD.sire), race.race_date, race.surface, race.distance, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'active' THEN
+        SELECT race_date, surface, distance INTO race FROM races
+        WHERE race_id = NEW.race_id AND race_date = NEW.race_date;
+        IF FOUND THEN
+            PERFORM sire_entry_stats_apply(sire_key_from_name(NEW.sire), race.race_date, race.surface, race.distance, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_race_entries_sire_stats
+    AFTER INSERT OR DELETE ON race_entries
+    FOR EACH ROW EXECUTE FUNCTION race_entries_sire_stats_trigger();
+
+CREATE TRIGGER trg_race_entries_sire_stats_update
+    AFTER UPDATE OF sire, status, race_id ON race_entries
+    FOR EACH ROW
+    WHEN (OLD.sire IS DISTINCT FROM NEW.sire
+          OR OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.race_id IS DISTINCT FROM NEW.race_id)
+    EXECUTE FUNCTION race_entries_sire_stats_trigger();
+
+CREATE OR REPLACE FUNCTION races_sire_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    entry RECORD;
+BEGIN
+    FOR entry IN
+        SELECT sire_key_from_name(sire) AS sire_key, COUNT(*)::integer AS runners
+        FROM race_entries
+        WHERE race_id = OLD.race_id AND race_date = OLD.race_date AND status = 'active'
+        GROUP BY 1
+    LOOP
+        PERFORM sire_entry_stats_apply(entry.sire_key, OLD.race_date, OLD.surface, OLD.distance, -entry.runners);
+        IF TG_OP = 'UPDATE' THEN
+            PERFORM sire_entry_stats_apply(entry.sire_key, NEW.race_date, NEW.surface, NEW.distance, entry.runners);
+        END IF;
+    END LOOP;
+    -- En BEFORE DELETE hay que devolver OLD para que el borrado continúe
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_races_sire_stats_update
+    AFTER UPDATE OF race_date, surface, distance ON races
+    FOR EACH ROW
+    WHEN (OLD.race_date IS DISTINCT FROM NEW.race_date
+          OR OLD.surface IS DISTINCT FROM NEW.surface
+          OR OLD.distance IS DISTINCT FROM NEW.distance)
+    EXECUTE FUNCTION races_sire_stats_trigger();
+
+CREATE TRIGGER trg_races_sire_stats_delete
+    BEFORE DELETE ON races
+    FOR EACH ROW EXECUTE FUNCTION races_sire_stats_trigger();
+
+-- Resumen del dashboard (0006), que dependía de las tablas anteriores -------
+
+CREATE MATERIALIZED VIEW system_stats AS
+SELECT
+    1 AS id,
+    (SELECT COUNT(*) FROM horses) AS total_horses,
+    (SELECT COUNT(*) FROM horses WHERE updated_at IS NOT NULL) AS horses_with_profile,
+    (SELECT COUNT(*) FROM horses
+        WHERE updated_at IS NULL OR updated_at < NOW() - INTERVAL '20 days') AS horses_stale,
+    (SELECT COUNT(*) FROM pedigree) AS horses_with_pedigree,
+    (SELECT COUNT(*) FROM races) AS total_races,
+    (SELECT MAX(race_date) FROM races) AS last_race_date,
+    (SELECT COUNT(*) FROM race_entries) AS total_entries,
+    (SELECT COUNT(*) FROM race_entries WHERE status = 'active') AS active_entries,
+    (SELECT COUNT(*) FROM race_entries WHERE status = 'scratched') AS scratched_entries,
+    (SELECT COUNT(*) FROM tracks WHERE active = true) AS total_tracks,
+    NOW() AS refreshed_at;
+
+CREATE UNIQUE INDEX idx_system_stats_id ON system_stats (id);
@@ -0,0 +1,14 @@
+-- 0011_scrape_log.sql - Último scraping de cada URL de tarjeta
+--
+-- /api/scrape responde desde aquí si la misma URL se scrapeó hace menos de
+-- SCRAPE_MIN_INTERVAL_SECONDS (ver database/scrape_log.py). races guarda la
+-- respuesta tal como salió del scraping; los status de los participantes se
+-- leen de race_entries al responder.
+
+CREATE TABLE IF NOT EXISTS scrape_log (
+    url TEXT PRIMARY KEY,
+    last_scraped_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    page_title TEXT,
+    total_races INTEGER NOT NULL DEFAULT 0,
+    races JSONB NOT NULL DEFAULT '[]'::jsonb
+);
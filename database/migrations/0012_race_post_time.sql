@@ -0,0 +1,16 @@
+-- 0012_race_post_time.sql - Hora de largada de cada carrera
+--
+-- El sondeo de retiros (services/scratch_scheduler.py) decide cada cuánto
+-- revisar una tarjeta según cuánto falta para su próxima largada. La hora es
+-- la del título de la carrera ("Gulfstream Park Race # 1, 6:50 PM"), hora local
+-- del hipódromo.
+--
+-- En una tabla particionada la columna nueva se agrega a todas las particiones.
+
+ALTER TABLE races ADD COLUMN IF NOT EXISTS post_time TIME;
+
+-- Carreras ya guardadas: la hora sale de race_name, que es ese mismo título
+UPDATE races
+SET post_time = to_timestamp(substring(race_name FROM '(\d{1,2}:\d{2} ?[AP]M)'), 'HH12:MI AM')::time
+WHERE post_time IS NULL
+  AND race_name ~ '(^|[^0-9])(1[0-2]|0?[1-9]):[0-5]\d ?[AP]M';
@@ -0,0 +1,66 @@
+-- 0013_data_versions.sql - Versión por tabla para los validadores de GET condicional
+--
+-- Los ETag/Last-Modified de la API se calculaban con COUNT(*) y MAX(updated_at).
+-- Eso recorría toda la tabla horses en cada página y no era confiable:
+-- updated_at = CURRENT_TIMESTAMP es la hora de *inicio* de la transacción, así
+-- que un scraping largo podía hacer commit de filas más viejas que el MAX ya
+-- visto sin cambiar el conteo, y el cliente recibía un 304 con datos viejos.
+--
+-- Ahora cada tabla tiene un contador en data_versions que se incrementa al
+-- hacer commit (trigger de restricción diferido), con el lock de la fila
+-- tomado recién en ese momento. Dos commits que tocan la misma tabla quedan
+-- ordenados: el que termina después tiene versión y changed_at mayores.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+INSERT INTO data_versions (name) VALUES ('horses'), ('races'), ('race_entries')
+ON CONFLICT (name) DO NOTHING;
+
+-- Incrementa las versiones de las tablas indicadas. También lo usa
+-- database/partitions.py al archivar o restaurar un mes (sin DML fila por fila).
+CREATE OR REPLACE FUNCTION bump_data_versions(p_names TEXT[]) RETURNS VOID AS $$
+BEGIN
+    -- Siempre todas las filas y en el mismo orden: dos commits que tocan
+    -- tablas distintas nunca se bloquean en cruz
+    PERFORM 1 FROM data_versions ORDER BY name FOR UPDATE;
+    -- Después de esperar el lock: clock_timestamp() queda en orden de commit
+    UPDATE data_versions
+    SET version = version + 1, changed_at = clock_timestamp()
+    WHERE name = ANY(p_names);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION data_versions_trigger() RETURNS trigger AS $$
+BEGIN
+    -- Una vez por tabla y transacción (la variable es local a la transacción)
+    IF current_setting('caballos.version_bumped_' || TG_ARGV[0], true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config('caballos.version_bumped_' || TG_ARGV[0], 'on', true);
+    PERFORM bump_data_versions(ARRAY[TG_ARGV[0]]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- DEFERRABLE INITIALLY DEFERRED: se ejecuta al hacer commit, no en cada sentencia
+DROP TRIGGER IF EXISTS trg_horses_data_version ON horses;
+CREATE CONSTRAINT TRIGGER trg_horses_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON horses
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION data_versions_trigger('horses');
+
+DROP TRIGGER IF EXISTS trg_races_data_version ON races;
+CREATE CONSTRAINT TRIGGER trg_races_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON races
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION data_versions_trigger('races');
+
+DROP TRIGGER IF EXISTS trg_race_entries_data_version ON race_entries;
+CREATE CONSTRAINT TRIGGER trg_race_entries_data_version
+    AFTER INSERT OR UPDATE OR DELETE ON race_entries
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION data_versions_trigger('race_entries');
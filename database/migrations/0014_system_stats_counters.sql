@@ -0,0 +1,229 @@
+-- 0014_system_stats_counters.sql - Resumen del dashboard mantenido con triggers
+--
+-- La vista materializada de 0006 (recreada en 0010) se refrescaba con
+-- REFRESH ... CONCURRENTLY, que vuelve a hacer cada COUNT(*) sobre horses,
+-- races y race_entries después de cada scraping. Ahora los conteos se
+-- mantienen de forma incremental, como las estadísticas de padres (0005).
+--
+-- Cada sentencia que cambia filas agrega una fila con sus diferencias a
+-- system_stats_deltas (triggers por sentencia con tablas de transición: un
+-- lote de 500 filas es una sola fila). Escribir deltas en lugar de actualizar
+-- un contador único evita que todos los scrapings se bloqueen en la misma
+-- fila. Leer suma las filas; compact_system_stats() las junta en una sola
+-- (services/stats_service.py la ejecuta en segundo plano después de los
+-- scrapings).
+--
+-- system_stats pasa a ser una vista con las mismas columnas. horses_stale
+-- depende de la hora, así que se calcula al leer (índice sobre updated_at).
+
+DROP MATERIALIZED VIEW IF EXISTS system_stats;
+
+CREATE TABLE IF NOT EXISTS system_stats_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    total_horses BIGINT NOT NULL DEFAULT 0,
+    horses_with_profile BIGINT NOT NULL DEFAULT 0,
+    horses_with_pedigree BIGINT NOT NULL DEFAULT 0,
+    total_races BIGINT NOT NULL DEFAULT 0,
+    total_entries BIGINT NOT NULL DEFAULT 0,
+    active_entries BIGINT NOT NULL DEFAULT 0,
+    scratched_entries BIGINT NOT NULL DEFAULT 0
+);
+
+-- Punto de partida: los conteos actuales
+INSERT INTO system_stats_deltas (total_horses, horses_with_profile, horses_with_pedigree, total_races,
+                                 total_entries, active_entries, scratched_entries)
+SELECT
+    (SELECT COUNT(*) FROM horses),
+    (SELECT COUNT(*) FROM horses WHERE updated_at IS NOT NULL),
+    (SELECT COUNT(*) FROM pedigree),
+    (SELECT COUNT(*) FROM races),
+    (SELECT COUNT(*) FROM race_entries),
+    (SELECT COUNT(*) FROM race_entries WHERE status = 'active'),
+    (SELECT COUNT(*) FROM race_entries WHERE status = 'scratched');
+
+-- Junta todas las filas en una. Las filas de transacciones todavía abiertas no
+-- son visibles y quedan para la próxima compactación.
+CREATE OR REPLACE FUNCTION compact_system_stats() RETURNS VOID AS $$
+    WITH moved AS (
+        DELETE FROM system_stats_deltas RETURNING *
+    )
+    INSERT INTO system_stats_deltas (total_horses, horses_with_profile, horses_with_pedigree, total_races,
+                                     total_entries, active_entries, scratched_entries)
+    SELECT COALESCE(SUM(total_horses), 0), COALESCE(SUM(horses_with_profile), 0),
+           COALESCE(SUM(horses_with_pedigree), 0), COALESCE(SUM(total_races), 0),
+           COALESCE(SUM(total_entries), 0), COALESCE(SUM(active_entries), 0),
+           COALESCE(SUM(scratched_entries), 0)
+    FROM moved;
+$$ LANGUAGE sql;
+
+-- horses -----------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION horses_system_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    horses_delta BIGINT := 0;
+    profile_delta BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT horses_delta + CASE WHEN TG_OP = 'INSERT' THEN COUNT(*) ELSE 0 END,
+               profile_delta + COUNT(*) FILTER (WHERE updated_at IS NOT NULL)
+        INTO horses_delta, profile_delta
+        FROM new_rows;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT horses_delta - CASE WHEN TG_OP = 'DELETE' THEN COUNT(*) ELSE 0 END,
+               profile_delta - COUNT(*) FILTER (WHERE updated_at IS NOT NULL)
+        INTO horses_delta, profile_delta
+        FROM old_rows;
+    END IF;
+    IF horses_delta <> 0 OR profile_delta <> 0 THEN
+        INSERT INTO system_stats_deltas (total_horses, horses_with_profile) VALUES (horses_delta, profile_delta);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_horses_system_stats_insert ON horses;
+CREATE TRIGGER trg_horses_system_stats_insert
+    AFTER INSERT ON horses REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION horses_system_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_horses_system_stats_update ON horses;
+CREATE TRIGGER trg_horses_system_stats_update
+    AFTER UPDATE ON horses REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION horses_system_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_horses_system_stats_delete ON horses;
+CREATE TRIGGER trg_horses_system_stats_delete
+    AFTER DELETE ON horses REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION horses_system_stats_trigger();
+
+-- pedigree ---------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION pedigree_system_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    pedigree_delta BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO pedigree_delta FROM new_rows;
+    ELSE
+        SELECT -COUNT(*) INTO pedigree_delta FROM old_rows;
+    END IF;
+    IF pedigree_delta <> 0 THEN
+        INSERT INTO system_stats_deltas (horses_with_pedigree) VALUES (pedigree_delta);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_pedigree_system_stats_insert ON pedigree;
+CREATE TRIGGER trg_pedigree_system_stats_insert
+    AFTER INSERT ON pedigree REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pedigree_system_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_pedigree_system_stats_delete ON pedigree;
+CREATE TRIGGER trg_pedigree_system_stats_delete
+    AFTER DELETE ON pedigree REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pedigree_system_stats_trigger();
+
+-- races ------------------------------------------------------------------
+-- En la tabla particionada: las tablas de transición traen las filas de todas las particiones
+
+CREATE OR REPLACE FUNCTION races_system_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    races_delta BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO races_delta FROM new_rows;
+    ELSE
+        SELECT -COUNT(*) INTO races_delta FROM old_rows;
+    END IF;
+    IF races_delta <> 0 THEN
+        INSERT INTO system_stats_deltas (total_races) VALUES (races_delta);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_races_system_stats_insert ON races;
+CREATE TRIGGER trg_races_system_stats_insert
+    AFTER INSERT ON races REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION races_system_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_races_system_stats_delete ON races;
+CREATE TRIGGER trg_races_system_stats_delete
+    AFTER DELETE ON races REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION races_system_stats_trigger();
+
+-- race_entries -----------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION race_entries_system_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    entries_delta BIGINT := 0;
+    active_delta BIGINT := 0;
+    scratched_delta BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT entries_delta + CASE WHEN TG_OP = 'INSERT' THEN COUNT(*) ELSE 0 END,
+               active_delta + COUNT(*) FILTER (WHERE status = 'active'),
+               scratched_delta + COUNT(*) FILTER (WHERE status = 'scratched')
+        INTO entries_delta, active_delta, scratched_delta
+        FROM new_rows;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT entries_delta - CASE WHEN TG_OP = 'DELETE' THEN COUNT(*) ELSE 0 END,
+               active_delta - COUNT(*) FILTER (WHERE status = 'active'),
+               scratched_delta - COUNT(*) FILTER (WHERE status = 'scratched')
+        INTO entries_delta, active_delta, scratched_delta
+        FROM old_rows;
+    END IF;
+    IF entries_delta <> 0 OR active_delta <> 0 OR scratched_delta <> 0 THEN
+        INSERT INTO system_stats_deltas (total_entries, active_entries, scratched_entries)
+        VALUES (entries_delta, active_delta, scratched_delta);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_race_entries_system_stats_insert ON race_entries;
+CREATE TRIGGER trg_race_entries_system_stats_insert
+    AFTER INSERT ON race_entries REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION race_entries_system_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_race_entries_system_stats_update ON race_entries;
+CREATE TRIGGER trg_race_entries_system_stats_update
+    AFTER UPDATE ON race_entries REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION race_entries_system_stats_trigger();
+
+DROP TRIGGER IF EXISTS trg_race_entries_system_stats_delete ON race_entries;
+CREATE TRIGGER trg_race_entries_system_stats_delete
+    AFTER DELETE ON race_entries REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION race_entries_system_stats_trigger();
+
+-- Vista con las columnas de la vista materializada anterior ---------------
+
+CREATE VIEW system_stats AS
+SELECT
+    1 AS id,
+    d.total_horses,
+    d.horses_with_profile,
+    -- Sin perfil o con más de 20 días: el total menos los actualizados hace poco
+    d.total_horses - (SELECT COUNT(*) FROM horses
+                      WHERE updated_at >= NOW() - INTERVAL '20 days') AS horses_stale,
+    d.horses_with_pedigree,
+    d.total_races,
+    (SELECT MAX(race_date) FROM races) AS last_race_date,
+    d.total_entries,
+    d.active_entries,
+    d.scratched_entries,
+    (SELECT COUNT(*) FROM tracks WHERE active = true) AS total_tracks,
+    NOW() AS refreshed_at
+FROM (
+    SELECT SUM(total_horses)::bigint AS total_horses,
+           SUM(horses_with_profile)::bigint AS horses_with_profile,
+           SUM(horses_with_pedigree)::bigint AS horses_with_pedigree,
+           SUM(total_races)::bigint AS total_races,
+           SUM(total_entries)::bigint AS total_entries,
+           SUM(active_entries)::bigint AS active_entries,
+           SUM(scratched_entries)::bigint AS scratched_entries
+    FROM system_stats_deltas
+) d;
@@ -0,0 +1,13 @@
+-- 0015_horse_scrape_log.sql - Último perfil scrapeado de cada caballo
+--
+-- El advisory lock de services/single_flight.py evita que dos procesos
+-- scrapeen el mismo caballo a la vez, pero el que esperaba volvía a descargar
+-- el perfil apenas el otro terminaba. El perfil se guarda aquí al terminar
+-- (con la hora del reloj de la BD) y quien esperó el lock lo reutiliza si se
+-- guardó después de que empezó a esperar (ver database/scrape_log.py).
+
+CREATE TABLE IF NOT EXISTS horse_scrape_log (
+    horse_id VARCHAR(255) PRIMARY KEY,
+    last_scraped_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    profile JSONB NOT NULL
+);
@@ -0,0 +1,292 @@
+-- 0016_sire_stats_deltas.sql - Estadísticas de padres con filas de diferencias
+--
+-- Los triggers fila por fila de 0005 (recreados en 0010) sumaban 1 directamente
+-- en la fila compartida de cada padre. Dos guardados de tarjetas o lotes de
+-- pedigree con padres en común se bloqueaban en las mismas filas, en el orden
+-- en que venían los participantes, y podían terminar en deadlock (y perder el
+-- guardado de la tarjeta entera).
+--
+-- Igual que system_stats (0014): cada sentencia agrega filas con sus
+-- diferencias ya agrupadas por padre (triggers por sentencia con tablas de
+-- transición) y sire_stats, sire_starter_stats y sire_daily_runners pasan a ser
+-- vistas que las suman. Solo se insertan filas, así que no hay locks
+-- compartidos. compact_sire_stats() junta las filas (services/stats_service.py
+-- la ejecuta en segundo plano después de los scrapings).
+--
+-- Además, la progenie usaba pedigree.sire_id (el id de la URL, que puede llevar
+-- un sufijo: "Into_Mischief_1") y los participantes el nombre del padre, así
+-- que un mismo padre quedaba en dos filas. Ahora todas las claves salen de
+-- sire_stats_key(), que acepta nombre o id y quita ese sufijo.
+
+CREATE OR REPLACE FUNCTION sire_stats_key(sire TEXT) RETURNS TEXT AS $$
+    SELECT regexp_replace(sire_key_from_name(sire), '_[0-9]+$', '')
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Los triggers anteriores ---------------------------------------------------
+
+DROP TRIGGER IF EXISTS trg_pedigree_sire_stats ON pedigree;
+DROP TRIGGER IF EXISTS trg_pedigree_sire_stats_update ON pedigree;
+DROP TRIGGER IF EXISTS trg_race_entries_sire_stats ON race_entries;
+DROP TRIGGER IF EXISTS trg_race_entries_sire_stats_update ON race_entries;
+DROP FUNCTION IF EXISTS sire_stats_add(TEXT, INTEGER, INTEGER);
+
+-- Tablas de diferencias -----------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS sire_progeny_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    sire_key VARCHAR(255) NOT NULL,
+    progeny_count INTEGER NOT NULL DEFAULT 0,
+    damsire_progeny_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_sire_progeny_deltas_key ON sire_progeny_deltas (sire_key);
+
+CREATE TABLE IF NOT EXISTS sire_starter_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    sire_key VARCHAR(255) NOT NULL,
+    surface VARCHAR(50) NOT NULL,
+    distance VARCHAR(50) NOT NULL,
+    starters INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_sire_starter_deltas_key ON sire_starter_deltas (sire_key);
+
+CREATE TABLE IF NOT EXISTS sire_daily_runner_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    sire_key VARCHAR(255) NOT NULL,
+    race_date DATE NOT NULL,
+    runners INTEGER NOT NULL DEFAULT 0
+);
+-- "Padres con corredores hoy" y consulta por padre y fecha
+CREATE INDEX IF NOT EXISTS idx_sire_daily_runner_deltas_date ON sire_daily_runner_deltas (race_date, sire_key);
+
+-- Punto de partida. La progenie se recalcula desde pedigree (con la clave
+-- nueva); los participantes se pasan desde los agregados actuales porque
+-- incluyen los meses ya archivados (ver scripts/manage_partitions.py).
+INSERT INTO sire_progeny_deltas (sire_key, progeny_count, damsire_progeny_count)
+SELECT sire_key, SUM(progeny), SUM(damsire_progeny)
+FROM (
+    SELECT sire_stats_key(sire_id) AS sire_key, 1 AS progeny, 0 AS damsire_progeny FROM pedigree
+    UNION ALL
+    SELECT sire_stats_key(maternal_grandsire_id), 0, 1 FROM pedigree
+) AS progeny
+WHERE sire_key IS NOT NULL
+GROUP BY sire_key;
+
+INSERT INTO sire_starter_deltas (sire_key, surface, distance, starters, updated_at)
+SELECT sire_stats_key(sire_key), surface, distance, SUM(starters), MAX(updated_at)
+FROM sire_starter_stats
+GROUP BY 1, 2, 3;
+
+INSERT INTO sire_daily_runner_deltas (sire_key, race_date, runners)
+SELECT sire_stats_key(sire_key), race_date, SUM(runners)
+FROM sire_daily_runners
+GROUP BY 1, 2;
+
+DROP TABLE sire_stats;
+DROP TABLE sire_starter_stats;
+DROP TABLE sire_daily_runners;
+
+-- Vistas con las columnas de las tablas anteriores --------------------------
+
+CREATE VIEW sire_stats AS
+SELECT sire_key,
+       SUM(progeny_count)::integer AS progeny_count,
+       SUM(damsire_progeny_count)::integer AS damsire_progeny_count,
+       MAX(updated_at) AS updated_at
+FROM sire_progeny_deltas
+GROUP BY sire_key;
+
+CREATE VIEW sire_starter_stats AS
+SELECT sire_key, surface, distance,
+       SUM(starters)::integer AS starters,
+       MAX(updated_at) AS updated_at
+FROM sire_starter_deltas
+GROUP BY sire_key, surface, distance;
+
+CREATE VIEW sire_daily_runners AS
+SELECT sire_key, race_date, SUM(runners)::integer AS runners
+FROM sire_daily_runner_deltas
+GROUP BY sire_key, race_date;
+
+-- Junta las filas de cada padre en una. Las filas de transacciones todavía
+-- abiertas no son visibles y quedan para la próxima compactación.
+CREATE OR REPLACE FUNCTION compact_sire_stats() RETURNS VOID AS $$
+    WITH moved AS (
+        DELETE FROM sire_progeny_deltas RETURNING *
+    )
+    INSERT INTO sire_progeny_deltas (sire_key, progeny_count, damsire_progeny_count, updated_at)
+    SELECT sire_key, SUM(progeny_count), SUM(damsire_progeny_count), MAX(updated_at)
+    FROM moved
+    GROUP BY sire_key;
+
+    WITH moved AS (
+        DELETE FROM sire_starter_deltas RETURNING *
+    )
+    INSERT INTO sire_starter_deltas (sire_key, surface, distance, starters, updated_at)
+    SELECT sire_key, surface, distance, SUM(starters), MAX(updated_at)
+    FROM moved
+    GROUP BY sire_key, surface, distance;
+
+    -- Los corredores por día que suman 0 (p. ej. retirados) no hace falta guardarlos
+    WITH moved AS (
+        DELETE FROM sire_daily_runner_deltas RETURNING *
+    )
+    INSERT INTO sire_daily_runner_deltas (sire_key, race_date, runners)
+    SELECT sire_key, race_date, SUM(runners)
+    FROM moved
+    GROUP BY sire_key, race_date
+    HAVING SUM(runners) <> 0;
+$$ LANGUAGE sql;
+
+-- Progenie (pedigree) -------------------------------------------------------
+
+-- Filas nuevas suman y viejas restan, agrupadas por padre; en un UPDATE que no
+-- cambia padre ni abuelo materno se cancelan y no se escribe nada
+CREATE OR REPLACE FUNCTION sire_progeny_deltas_add(p_new pedigree[], p_old pedigree[]) RETURNS VOID AS $$
+    INSERT INTO sire_progeny_deltas (sire_key, progeny_count, damsire_progeny_count)
+    SELECT sire_key, SUM(progeny), SUM(damsire_progeny)
+    FROM (
+        SELECT sire_stats_key(sire_id) AS sire_key, 1 AS progeny, 0 AS damsire_progeny FROM unnest(p_new)
+        UNION ALL
+        SELECT sire_stats_key(maternal_grandsire_id), 0, 1 FROM unnest(p_new)
+        UNION ALL
+        SELECT sire_stats_key(sire_id), -1, 0 FROM unnest(p_old)
+        UNION ALL
+        SELECT sire_stats_key(maternal_grandsire_id), 0, -1 FROM unnest(p_old)
+    ) AS changes
+    WHERE sire_key IS NOT NULL
+    GROUP BY sire_key
+    HAVING SUM(progeny) <> 0 OR SUM(damsire_progeny) <> 0;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION pedigree_sire_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    -- Cada operación solo tiene sus tablas de transición (un trigger por evento, como en 0014)
+    IF TG_OP = 'INSERT' THEN
+        PERFORM sire_progeny_deltas_add(ARRAY(SELECT n::pedigree FROM new_rows n), '{}'::pedigree[]);
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM sire_progeny_deltas_add(ARRAY(SELECT n::pedigree FROM new_rows n), ARRAY(SELECT o::pedigree FROM old_rows o));
+    ELSE
+        PERFORM sire_progeny_deltas_add('{}'::pedigree[], ARRAY(SELECT o::pedigree FROM old_rows o));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_pedigree_sire_stats_insert
+    AFTER INSERT ON pedigree REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pedigree_sire_stats_trigger();
+
+CREATE TRIGGER trg_pedigree_sire_stats_update
+    AFTER UPDATE ON pedigree REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pedigree_sire_stats_trigger();
+
+CREATE TRIGGER trg_pedigree_sire_stats_delete
+    AFTER DELETE ON pedigree REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION pedigree_sire_stats_trigger();
+
+-- Participantes (race_entries) ----------------------------------------------
+
+-- Participantes activos que entran (p_new) y salen (p_old), con superficie y
+-- distancia de su carrera. Si la carrera ya no existe, su trigger de borrado
+-- ya descontó a sus participantes.
+CREATE OR REPLACE FUNCTION sire_entry_deltas_add(p_new race_entries[], p_old race_entries[]) RETURNS VOID AS $$
+    WITH changes AS (
+        SELECT sire_stats_key(e.sire) AS sire_key, r.race_date,
+               COALESCE(NULLIF(btrim(r.surface), ''), 'Unknown') AS surface,
+               COALESCE(NULLIF(btrim(r.distance), ''), 'Unknown') AS distance,
+               e.delta
+        FROM (
+            SELECT race_id, race_date, sire, 1 AS delta FROM unnest(p_new) WHERE status = 'active'
+            UNION ALL
+            SELECT race_id, race_date, sire, -1 FROM unnest(p_old) WHERE status = 'active'
+        ) AS e
+        JOIN races r ON r.race_id = e.race_id AND r.race_date = e.race_date
+    ), starters AS (
+        INSERT INTO sire_starter_deltas (sire_key, surface, distance, starters)
+        SELECT sire_key, surface, distance, SUM(delta)
+        FROM changes
+        WHERE sire_key IS NOT NULL
+        GROUP BY sire_key, surface, distance
+        HAVING SUM(delta) <> 0
+    )
+    INSERT INTO sire_daily_runner_deltas (sire_key, race_date, runners)
+    SELECT sire_key, race_date, SUM(delta)
+    FROM changes
+    WHERE sire_key IS NOT NULL
+    GROUP BY sire_key, race_date
+    HAVING SUM(delta) <> 0;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION race_entries_sire_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM sire_entry_deltas_add(ARRAY(SELECT n::race_entries FROM new_rows n), '{}'::race_entries[]);
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM sire_entry_deltas_add(ARRAY(SELECT n::race_entries FROM new_rows n), ARRAY(SELECT o::race_entries FROM old_rows o));
+    ELSE
+        PERFORM sire_entry_deltas_add('{}'::race_entries[], ARRAY(SELECT o::race_entries FROM old_rows o));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- En la tabla particionada: las tablas de transición traen las filas de todas las particiones
+CREATE TRIGGER trg_race_entries_sire_stats_insert
+    AFTER INSERT ON race_entries REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION race_entries_sire_stats_trigger();
+
+CREATE TRIGGER trg_race_entries_sire_stats_update
+    AFTER UPDATE ON race_entries REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION race_entries_sire_stats_trigger();
+
+CREATE TRIGGER trg_race_entries_sire_stats_delete
+    AFTER DELETE ON race_entries REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION race_entries_sire_stats_trigger();
+
+-- Carreras (races) ----------------------------------------------------------
+-- Los triggers fila por fila de 0010 se mantienen (cambiar fecha, superficie o
+-- distancia de una carrera, o borrarla, es raro); ahora escriben diferencias.
+
+CREATE OR REPLACE FUNCTION sire_entry_stats_apply(
+    p_sire_key TEXT, p_race_date DATE, p_surface TEXT, p_distance TEXT, p_delta INTEGER
+) RETURNS void AS $$
+BEGIN
+    IF p_sire_key IS NULL OR p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO sire_starter_deltas (sire_key, surface, distance, starters)
+    VALUES (p_sire_key,
+            COALESCE(NULLIF(btrim(p_surface), ''), 'Unknown'),
+            COALESCE(NULLIF(btrim(p_distance), ''), 'Unknown'),
+            p_delta);
+    IF p_race_date IS NOT NULL THEN
+        INSERT INTO sire_daily_runner_deltas (sire_key, race_date, runners)
+        VALUES (p_sire_key, p_race_date, p_delta);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION races_sire_stats_trigger() RETURNS trigger AS $$
+DECLARE
+    entry RECORD;
+BEGIN
+    FOR entry IN
+        SELECT sire_stats_key(sire) AS sire_key, COUNT(*)::integer AS runners
+        FROM race_entries
+        WHERE race_id = OLD.race_id AND race_date = OLD.race_date AND status = 'active'
+        GROUP BY 1
+    LOOP
+        PERFORM sire_entry_stats_apply(entry.sire_key, OLD.race_date, OLD.surface, OLD.distance, -entry.runners);
+        IF TG_OP = 'UPDATE' THEN
+            PERFORM sire_entry_stats_apply(entry.sire_key, NEW.race_date, NEW.surface, NEW.distance, entry.runners);
+        END IF;
+    END LOOP;
+    -- En BEFORE DELETE hay que devolver OLD para que el borrado continúe
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
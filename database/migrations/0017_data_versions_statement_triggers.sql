@@ -0,0 +1,132 @@
+-- 0017_data_versions_statement_triggers.sql - Un evento diferido por tabla y transacción
+--
+-- En 0013 cada fila modificada encolaba un evento del trigger de restricción
+-- diferido (un lote de 500 caballos = 500 eventos al hacer commit, aunque solo
+-- el primero hiciera algo), y bump_data_versions bloqueaba todas las filas de
+-- data_versions aunque la transacción tocara una sola tabla: cualquier
+-- commit de horses esperaba a uno de race_entries y viceversa.
+--
+-- Ahora:
+--   * Triggers por sentencia (con tablas de transición, para no contar las
+--     sentencias que no cambian filas, como el upsert sin cambios de una
+--     carrera) anotan la tabla en data_versions_pending la primera vez en la
+--     transacción. Los triggers de restricción son solo FOR EACH ROW, así que
+--     el evento diferido vive en esa tabla: una fila por tabla y transacción.
+--   * Al hacer commit, el primer evento diferido incrementa juntas todas las
+--     tablas anotadas por la transacción y borra sus filas; los demás ya no
+--     encuentran nada. Así los locks se toman de una sola vez y en orden de
+--     nombre, y dos commits nunca se bloquean en cruz.
+--   * bump_data_versions bloquea solo las filas indicadas.
+
+CREATE OR REPLACE FUNCTION bump_data_versions(p_names TEXT[]) RETURNS VOID AS $$
+BEGIN
+    -- Solo las filas indicadas, siempre en el mismo orden: dos commits que
+    -- tocan tablas en común nunca se bloquean en cruz
+    PERFORM 1 FROM data_versions WHERE name = ANY(p_names) ORDER BY name FOR UPDATE;
+    -- Después de esperar el lock: clock_timestamp() queda en orden de commit
+    UPDATE data_versions
+    SET version = version + 1, changed_at = clock_timestamp()
+    WHERE name = ANY(p_names);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tablas modificadas por transacciones en curso (las filas se borran antes del commit)
+CREATE TABLE IF NOT EXISTS data_versions_pending (
+    name TEXT NOT NULL,
+    txid BIGINT NOT NULL DEFAULT txid_current()
+);
+
+CREATE OR REPLACE FUNCTION data_versions_trigger() RETURNS trigger AS $$
+BEGIN
+    -- Una vez por tabla y transacción (la variable es local a la transacción
+    -- y vuelve atrás junto con un savepoint deshecho)
+    IF current_setting('caballos.version_bumped_' || TG_ARGV[0], true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config('caballos.version_bumped_' || TG_ARGV[0], 'on', true);
+    INSERT INTO data_versions_pending (name) VALUES (TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION data_versions_commit_trigger() RETURNS trigger AS $$
+DECLARE
+    v_names TEXT[];
+BEGIN
+    WITH done AS (
+        DELETE FROM data_versions_pending
+        WHERE txid = txid_current()
+        RETURNING name
+    )
+    SELECT array_agg(DISTINCT name) INTO v_names FROM done;
+
+    IF v_names IS NOT NULL THEN
+        PERFORM bump_data_versions(v_names);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- DEFERRABLE INITIALLY DEFERRED: se ejecuta al hacer commit, no en cada sentencia
+DROP TRIGGER IF EXISTS trg_data_versions_pending_commit ON data_versions_pending;
+CREATE CONSTRAINT TRIGGER trg_data_versions_pending_commit
+    AFTER INSERT ON data_versions_pending
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION data_versions_commit_trigger();
+
+-- horses -----------------------------------------------------------------
+DROP TRIGGER IF EXISTS trg_horses_data_version ON horses;
+
+DROP TRIGGER IF EXISTS trg_horses_data_version_insert ON horses;
+CREATE TRIGGER trg_horses_data_version_insert
+    AFTER INSERT ON horses REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('horses');
+
+DROP TRIGGER IF EXISTS trg_horses_data_version_update ON horses;
+CREATE TRIGGER trg_horses_data_version_update
+    AFTER UPDATE ON horses REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('horses');
+
+DROP TRIGGER IF EXISTS trg_horses_data_version_delete ON horses;
+CREATE TRIGGER trg_horses_data_version_delete
+    AFTER DELETE ON horses REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('horses');
+
+-- races ------------------------------------------------------------------
+DROP TRIGGER IF EXISTS trg_races_data_version ON races;
+
+DROP TRIGGER IF EXISTS trg_races_data_version_insert ON races;
+CREATE TRIGGER trg_races_data_version_insert
+    AFTER INSERT ON races REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('races');
+
+DROP TRIGGER IF EXISTS trg_races_data_version_update ON races;
+CREATE TRIGGER trg_races_data_version_update
+    AFTER UPDATE ON races REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('races');
+
+DROP TRIGGER IF EXISTS trg_races_data_version_delete ON races;
+CREATE TRIGGER trg_races_data_version_delete
+    AFTER DELETE ON races REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('races');
+
+-- race_entries -----------------------------------------------------------
+DROP TRIGGER IF EXISTS trg_race_entries_data_version ON race_entries;
+
+DROP TRIGGER IF EXISTS trg_race_entries_data_version_insert ON race_entries;
+CREATE TRIGGER trg_race_entries_data_version_insert
+    AFTER INSERT ON race_entries REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('race_entries');
+
+DROP TRIGGER IF EXISTS trg_race_entries_data_version_update ON race_entries;
+CREATE TRIGGER trg_race_entries_data_version_update
+    AFTER UPDATE ON race_entries REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('race_entries');
+
+DROP TRIGGER IF EXISTS trg_race_entries_data_version_delete ON race_entries;
+CREATE TRIGGER trg_race_entries_data_version_delete
+    AFTER DELETE ON race_entries REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION data_versions_trigger('race_entries');
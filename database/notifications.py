@@ -0,0 +1,49 @@
+# database/notifications.py - Avisos de cambios entre procesos (NOTIFY)
+#
+# Las funciones de guardado emiten un pg_notify con lo que cambió. El aviso es
+# transaccional: PostgreSQL solo lo entrega si la transacción hace commit, y
+# llega a todos los procesos web que escuchan el canal
+# (ver services/change_listener.py).
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHANGES_CHANNEL = 'caballos_changes'
+
+# El payload de NOTIFY admite menos de 8000 bytes: los lotes grandes se parten
+MAX_PAYLOAD_BYTES = 7000
+
+# Tipos de cambio
+RACE_CHANGED = 'race'
+HORSE_CHANGED = 'horse'
+PEDIGREE_CHANGED = 'pedigree'
+# Lo emite el trigger trg_horses_name_notify (migración 0009), no el código Python
+HORSE_NAME_CHANGED = 'horse_name'
+
+
+def notify_race_changed(cursor, race_id, race_date=None):
+    """Una carrera o sus participantes cambiaron"""
+    payload = {'kind': RACE_CHANGED, 'race_id': race_id, 'race_date': str(race_date) if race_date else None}
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANGES_CHANNEL, json.dumps(payload)))
+
+
+def notify_horses_changed(cursor, kind, horse_ids):
+    """Cambió el perfil (HORSE_CHANGED) o el pedigree (PEDIGREE_CHANGED) de estos caballos"""
+    chunk = []
+    size = 0
+    for horse_id in horse_ids:
+        id_size = len(json.dumps(horse_id).encode('utf-8')) + 1
+        if chunk and size + id_size > MAX_PAYLOAD_BYTES:
+            _notify_horses(cursor, kind, chunk)
+            chunk, size = [], 0
+        chunk.append(horse_id)
+        size += id_size
+    if chunk:
+        _notify_horses(cursor, kind, chunk)
+
+
+def _notify_horses(cursor, kind, horse_ids):
+    payload = {'kind': kind, 'horse_ids': horse_ids}
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANGES_CHANNEL, json.dumps(payload)))
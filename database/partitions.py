@@ -0,0 +1,254 @@
+# database/partitions.py - Particiones mensuales de races y race_entries
+#
+# Las dos tablas están particionadas por rango de race_date, un mes por
+# partición (migración 0010). No hay partición por defecto: antes de guardar
+# una carrera se asegura que exista su mes, y scripts/manage_partitions.py crea
+# los meses siguientes por adelantado y archiva los viejos en CSV comprimidos.
+#
+# Archivar suelta la partición sin DELETE fila por fila, así que los triggers
+# no se disparan: las estadísticas de padres conservan los conteos históricos.
+# Restaurar carga los datos en tablas sueltas y las adjunta como particiones,
+# de modo que tampoco se vuelven a sumar. Los conteos del dashboard
+# (system_stats) sí siguen a las tablas y se ajustan a mano en ambos casos.
+
+import os
+import gzip
+import logging
+from datetime import date, datetime, timedelta
+from utils.race_parser import race_date_from_race_id
+
+logger = logging.getLogger(__name__)
+
+# Meses cuyas particiones ya se verificaron en este proceso
+_known_months = set()
+
+# Tablas particionadas, en orden de carga (la FK de race_entries apunta a races)
+PARTITIONED_TABLES = ('races', 'race_entries')
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_suffix(month):
+    return month.strftime('%Y_%m')
+
+
+def parse_month(text):
+    """'YYYY-MM' → date del primer día del mes"""
+    return datetime.strptime(text, '%Y-%m').date()
+
+
+def resolve_race_date(race_id, race_date):
+    """
+    Fecha con la que se guarda la carrera: la scrapeada ('YYYY-MM-DD') o, si no
+    vino, la codificada en el race_id. None si no hay ninguna.
+    """
+    if isinstance(race_date, date):
+        return race_date
+    if race_date and race_date != 'N/A':
+        try:
+            return datetime.strptime(race_date, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return race_date_from_race_id(race_id)
+
+
+def race_date_filter(race_id, column='race_date'):
+    """
+    Predicado y parámetros para que una consulta por race_id toque solo la
+    partición de su mes. Si el race_id no trae fecha el predicado es siempre
+    verdadero (se revisan todas las particiones).
+    """
+    race_date = race_date_from_race_id(race_id)
+    return f"({column} = %s OR %s::date IS NULL)", [race_date, race_date]
+
+
+def ensure_race_partition(cursor, race_date):
+    """
+    Asegura las particiones del mes de race_date. Devuelve el mes si las creó
+    esta transacción (si se deshace hay que olvidarlo con forget_known_partitions),
+    o None si ya existían.
+    """
+    month = month_start(race_date)
+    if month in _known_months:
+        return None
+    # Lo normal es que el mes ya exista (manage_partitions.py --ahead): se verifica
+    # sin tomar el lock de ensure_race_partitions, que dura hasta el commit y
+    # serializaría los guardados
+    suffix = partition_suffix(month)
+    cursor.execute(
+        "SELECT to_regclass(%s) IS NOT NULL AND to_regclass(%s) IS NOT NULL",
+        (f'races_{suffix}', f'race_entries_{suffix}')
+    )
+    if cursor.fetchone()[0]:
+        _known_months.add(month)
+        return None
+    cursor.execute("SELECT ensure_race_partitions(%s, %s)", (month, month))
+    created = cursor.fetchone()[0]
+    if created:
+        logger.info(f"🗂️ Particiones de carreras creadas para {month:%Y-%m}")
+    _known_months.add(month)
+    return month if created else None
+
+
+def forget_known_partitions(months=None):
+    """Olvida los meses indicados (o todos): la transacción que los creó se deshizo o se soltaron"""
+    if months is None:
+        _known_months.clear()
+    else:
+        _known_months.difference_update(months)
+
+
+def ensure_partitions_ahead(cursor, months_ahead):
+    """Crea desde el mes actual hasta `months_ahead` meses adelante. Devuelve los meses creados."""
+    first = last = month_start(date.today())
+    for _ in range(months_ahead):
+        last = next_month(last)
+    cursor.execute("SELECT ensure_race_partitions(%s, %s)", (first, last))
+    return cursor.fetchone()[0]
+
+
+def list_race_partitions(cursor):
+    """[(mes, carreras, participantes, bytes)] de las particiones existentes, de la más vieja a la más nueva"""
+    cursor.execute("""
+        SELECT child.relname, parent.relname,
+               COALESCE(child_stats.n_live_tup, 0), pg_total_relation_size(child.oid)
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+        LEFT JOIN pg_stat_user_tables child_stats ON child_stats.relid = child.oid
+        WHERE parent.relname IN ('races', 'race_entries') AND ns.nspname = current_schema()
+    """)
+    months = {}
+    for child_name, parent_name, rows, size in cursor.fetchall():
+        month = datetime.strptime(child_name[len(parent_name) + 1:], '%Y_%m').date()
+        entry = months.setdefault(month, [0, 0, 0])
+        entry[0 if parent_name == 'races' else 1] += rows
+        entry[2] += size
+    return [(month, races, entries, size) for month, (races, entries, size) in sorted(months.items())]
+
+
+def _table_columns(cursor, table):
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _adjust_system_stats(cursor, suffix, sign):
+    """
+    Suma (sign=1) o resta (sign=-1) las filas de las particiones del mes en los
+    conteos del dashboard: adjuntar o soltar particiones no dispara sus triggers.
+    """
+    cursor.execute(f"""
+        INSERT INTO system_stats_deltas (total_races, total_entries, active_entries, scratched_entries)
+        SELECT %(sign)s * (SELECT COUNT(*) FROM races_{suffix}),
+               %(sign)s * COUNT(*),
+               %(sign)s * COUNT(*) FILTER (WHERE status = 'active'),
+               %(sign)s * COUNT(*) FILTER (WHERE status = 'scratched')
+        FROM race_entries_{suffix}
+    """, {'sign': sign})
+
+
+def archive_file_path(directory, table, month):
+    return os.path.join(directory, f"{table}_{partition_suffix(month)}.csv.gz")
+
+
+def archive_race_month(conn, month, directory):
+    """
+    Copia a `directory` las carreras, participantes y eventos de status del mes
+    (CSV con encabezado, gzip) y suelta sus particiones. Todo en una transacción:
+    si algo falla no se borra nada. Devuelve {tabla: filas archivadas}.
+    """
+    suffix = partition_suffix(month)
+    races_partition = f"races_{suffix}"
+    entries_partition = f"race_entries_{suffix}"
+    os.makedirs(directory, exist_ok=True)
+
+    cur = conn.cursor()
+    try:
+        sources = {
+            'races': f"SELECT {', '.join(_table_columns(cur, 'races'))} FROM {races_partition}",
+            'race_entries': f"SELECT {', '.join(_table_columns(cur, 'race_entries'))} FROM {entries_partition}",
+            'entry_status_events': f"""
+                SELECT * FROM entry_status_events
+                WHERE race_id IN (SELECT race_id FROM {races_partition})
+            """,
+        }
+        archived = {}
+        for table, query in sources.items():
+            with gzip.open(archive_file_path(directory, table, month), 'wt', encoding='utf-8', newline='') as f:
+                cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+            archived[table] = cur.rowcount
+
+        cur.execute(f"""
+            DELETE FROM entry_status_events
+            WHERE race_id IN (SELECT race_id FROM {races_partition})
+        """)
+        _adjust_system_stats(cur, suffix, -1)
+        # Primero los participantes: la FK impide soltar una partición de races referenciada
+        cur.execute(f"ALTER TABLE race_entries DETACH PARTITION {entries_partition}")
+        cur.execute(f"DROP TABLE {entries_partition}")
+        cur.execute(f"ALTER TABLE races DETACH PARTITION {races_partition}")
+        cur.execute(f"DROP TABLE {races_partition}")
+        # Soltar particiones no dispara los triggers: los validadores HTTP deben cambiar igual
+        cur.execute("SELECT bump_data_versions(%s)", (list(PARTITIONED_TABLES),))
+        conn.commit()
+        forget_known_partitions([month])
+        logger.info(f"📦 Mes {month:%Y-%m} archivado en {directory}: {archived}")
+        return archived
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def restore_race_month(conn, month, directory):
+    """
+    Vuelve a cargar un mes archivado con archive_race_month. Las filas se copian
+    a tablas sueltas que luego se adjuntan como particiones. Devuelve {tabla: filas}.
+    """
+    suffix = partition_suffix(month)
+    cur = conn.cursor()
+    try:
+        restored = {}
+        for table in PARTITIONED_TABLES + ('entry_status_events',):
+            path = archive_file_path(directory, table, month)
+            with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+                # El encabezado trae las columnas tal como estaban al archivar
+                columns = f.readline().strip()
+                if table == 'entry_status_events':
+                    target = table
+                else:
+                    target = f"{table}_{suffix}"
+                    cur.execute(f"CREATE TABLE {target} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+                cur.copy_expert(f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)", f)
+                restored[table] = cur.rowcount
+            if table != 'entry_status_events':
+                cur.execute(
+                    f"ALTER TABLE {table} ATTACH PARTITION {target} FOR VALUES FROM (%s) TO (%s)",
+                    (month, next_month(month))
+                )
+        _adjust_system_stats(cur, suffix, 1)
+        cur.execute("""
+            SELECT setval(pg_get_serial_sequence('entry_status_events', 'event_id'),
+                          GREATEST((SELECT MAX(event_id) FROM entry_status_events), 1))
+        """)
+        cur.execute("SELECT bump_data_versions(%s)", (list(PARTITIONED_TABLES),))
+        conn.commit()
+        logger.info(f"📂 Mes {month:%Y-%m} restaurado desde {directory}: {restored}")
+        return restored
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
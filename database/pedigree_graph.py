@@ -0,0 +1,158 @@
+# database/pedigree_graph.py - Aristas del pedigree y clausura de ancestros
+#
+# La tabla pedigree guarda 4 generaciones en columnas posicionales. Aquí se
+# traducen a aristas hijo → progenitor (pedigree_edges) y se mantiene la tabla
+# pedigree_closure (todos los pares ancestro/descendiente con su profundidad
+# mínima) solo para los subárboles afectados por cada lote guardado.
+
+import logging
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# Protección ante ciclos por datos erróneos al recorrer las aristas
+PEDIGREE_MAX_DEPTH = 20
+
+# (columna del hijo, rol, columna del progenitor); None = el propio caballo
+PEDIGREE_EDGE_COLUMNS = [
+    (None, 'sire', 'sire_id'),
+    (None, 'dam', 'dam_id'),
+    ('sire_id', 'sire', 'paternal_grandsire_id'),
+    ('sire_id', 'dam', 'paternal_granddam_id'),
+    ('dam_id', 'sire', 'maternal_grandsire_id'),
+    ('dam_id', 'dam', 'maternal_granddam_id'),
+    ('paternal_grandsire_id', 'sire', 'paternal_gg_sire_id'),
+    ('paternal_grandsire_id', 'dam', 'paternal_gg_dam_id'),
+    ('paternal_granddam_id', 'sire', 'paternal_gd_sire_id'),
+    ('paternal_granddam_id', 'dam', 'paternal_gd_dam_id'),
+    ('maternal_grandsire_id', 'sire', 'maternal_gg_sire_id'),
+    ('maternal_grandsire_id', 'dam', 'maternal_gg_dam_id'),
+    ('maternal_granddam_id', 'sire', 'maternal_gd_sire_id'),
+    ('maternal_granddam_id', 'dam', 'maternal_gd_dam_id'),
+]
+
+UPSERT_EDGES_QUERY = """
+    INSERT INTO pedigree_edges (child_id, role, parent_id)
+    VALUES %s
+    ON CONFLICT (child_id, role) DO UPDATE SET
+        parent_id = EXCLUDED.parent_id,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE pedigree_edges.parent_id IS DISTINCT FROM EXCLUDED.parent_id
+    RETURNING child_id
+"""
+
+REBUILD_CLOSURE_QUERY = f"""
+    INSERT INTO pedigree_closure (descendant_id, ancestor_id, depth)
+    WITH RECURSIVE walk (descendant_id, ancestor_id, depth) AS (
+        SELECT child_id, parent_id, 1
+        FROM pedigree_edges
+        WHERE child_id = ANY(%(horse_ids)s)
+        UNION
+        SELECT w.descendant_id, e.parent_id, w.depth + 1
+        FROM walk w
+        JOIN pedigree_edges e ON e.child_id = w.ancestor_id
+        WHERE w.depth < {PEDIGREE_MAX_DEPTH}
+    )
+    SELECT descendant_id, ancestor_id, MIN(depth)
+    FROM walk
+    WHERE descendant_id <> ancestor_id
+    GROUP BY descendant_id, ancestor_id
+"""
+
+
+def pedigree_edges_from_row(horse_id, pedigree_data):
+    """Convierte las columnas posicionales de un pedigree en aristas (child_id, role, parent_id)"""
+    edges = []
+    for child_column, role, parent_column in PEDIGREE_EDGE_COLUMNS:
+        child_id = horse_id if child_column is None else pedigree_data.get(child_column)
+        parent_id = pedigree_data.get(parent_column)
+        if child_id and parent_id and child_id != parent_id:
+            edges.append((child_id, role, parent_id))
+    return edges
+
+
+def rebuild_closure(cursor, horse_ids):
+    """
+    Recalcula la clausura de los caballos indicados y de todos sus descendientes.
+    Al cambiar los progenitores de un caballo cambian los ancestros de todo su subárbol.
+    """
+    if not horse_ids:
+        return []
+
+    # Descendientes según la clausura previa (no dependen de los progenitores del caballo)
+    cursor.execute("""
+        SELECT DISTINCT descendant_id FROM pedigree_closure WHERE ancestor_id = ANY(%s)
+    """, (list(horse_ids),))
+    affected = set(horse_ids) | {row[0] for row in cursor.fetchall()}
+    affected = list(affected)
+
+    cursor.execute("DELETE FROM pedigree_closure WHERE descendant_id = ANY(%s)", (affected,))
+    cursor.execute(REBUILD_CLOSURE_QUERY, {'horse_ids': affected})
+    return affected
+
+
+def sync_pedigree_edges(cursor, pedigrees):
+    """
+    Sincroniza las aristas de los pedigrees guardados ({horse_id: pedigree_data})
+    y actualiza la clausura solo para los caballos cuyos progenitores cambiaron.
+    Los ancestros ausentes en el scraping no borran aristas (igual que la columna de
+    pedigree); un padre o madre presente en None borra la arista del propio caballo.
+    """
+    edges = {}
+    removed = []
+    for horse_id, pedigree_data in pedigrees.items():
+        for child_id, role, parent_id in pedigree_edges_from_row(horse_id, pedigree_data):
+            # Un mismo progenitor puede venir en varios pedigrees del lote: gana el último
+            edges[(child_id, role)] = parent_id
+        for child_column, role, parent_column in PEDIGREE_EDGE_COLUMNS:
+            if child_column is None and parent_column in pedigree_data and not pedigree_data[parent_column]:
+                removed.append((horse_id, role))
+
+    changed_children = set()
+    if removed:
+        cursor.execute("""
+            DELETE FROM pedigree_edges e
+            USING unnest(%s::text[], %s::text[]) AS r (child_id, role)
+            WHERE e.child_id = r.child_id AND e.role = r.role
+            RETURNING e.child_id
+        """, ([child_id for child_id, _ in removed], [role for _, role in removed]))
+        changed_children.update(row[0] for row in cursor.fetchall())
+
+    if edges:
+        rows = [(child_id, role, parent_id) for (child_id, role), parent_id in edges.items()]
+        results = execute_values(cursor, UPSERT_EDGES_QUERY, rows, page_size=len(rows), fetch=True)
+        changed_children.update(row[0] for row in results)
+
+    changed_children = sorted(changed_children)
+
+    if changed_children:
+        affected = rebuild_closure(cursor, changed_children)
+        logger.info(
+            f"🧬 Aristas de pedigree: {len(changed_children)} caballos con progenitores nuevos o distintos, "
+            f"clausura recalculada para {len(affected)} caballos"
+        )
+    return changed_children
+
+
+def get_ancestors(cursor, horse_id, max_depth=None):
+    """Ancestros de un caballo como lista de (ancestor_id, depth)"""
+    cursor.execute("""
+        SELECT ancestor_id, depth
+        FROM pedigree_closure
+        WHERE descendant_id = %s
+        AND (%s IS NULL OR depth <= %s)
+        ORDER BY depth, ancestor_id
+    """, (horse_id, max_depth, max_depth))
+    return cursor.fetchall()
+
+
+def get_descendants(cursor, horse_id, max_depth=None):
+    """Descendientes de un caballo como lista de (descendant_id, depth)"""
+    cursor.execute("""
+        SELECT descendant_id, depth
+        FROM pedigree_closure
+        WHERE ancestor_id = %s
+        AND (%s IS NULL OR depth <= %s)
+        ORDER BY depth, descendant_id
+    """, (horse_id, max_depth, max_depth))
+    return cursor.fetchall()
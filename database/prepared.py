@@ -0,0 +1,79 @@
+# database/prepared.py - Sentencias preparadas para el SQL que se repite por fila
+#
+# Al guardar una carrera se ejecutan las mismas búsquedas/inserts por cada
+# participante (trainer, jockey, caballo) y PostgreSQL vuelve a parsear y
+# planificar el mismo texto cada vez. Aquí se registran esas sentencias con
+# nombre: la primera vez que una conexión usa una se hace PREPARE y desde ahí
+# se ejecuta con EXECUTE, sin volver a parsear ni planificar.
+#
+# Las sentencias preparadas viven lo que dura la sesión, así que se recuerda
+# cuáles ya se prepararon en cada conexión (y se olvidan al cerrarla).
+#
+# No hay pool de conexiones: cada request abre la suya, y preparar una
+# sentencia que corre una sola vez por conexión cuesta un viaje extra (PREPARE
+# + EXECUTE) sin ahorrar nada. Solo se registran las que se repiten dentro de
+# la misma conexión, por participante o por caballo (database/entries.py y la
+# lectura del perfil en update_horse_data); el resto usa cursor.execute.
+
+import os
+import re
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# PREPARED_STATEMENTS=0 ejecuta el SQL tal cual (para comparar o diagnosticar)
+PREPARED_STATEMENTS_ENABLED = os.getenv("PREPARED_STATEMENTS", "1") == "1"
+
+# nombre → SQL con marcadores %s (el mismo texto que se usaría con cursor.execute)
+_statements = {}
+
+# conexión → nombres ya preparados en esa sesión
+_prepared_by_connection = weakref.WeakKeyDictionary()
+
+_PLACEHOLDER = re.compile(r'%s')
+
+
+def register_statement(name, sql):
+    """Registra una sentencia con nombre. Devuelve el nombre para usarlo como constante."""
+    if _statements.get(name, sql) != sql:
+        raise ValueError(f"La sentencia preparada '{name}' ya está registrada con otro SQL")
+    _statements[name] = sql
+    return name
+
+
+def _to_positional(sql):
+    """'... = %s AND ... = %s' → '... = $1 AND ... = $2' (sintaxis de PREPARE)"""
+    counter = iter(range(1, sql.count('%s') + 1))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql)
+
+
+def execute_prepared(cursor, name, params=()):
+    """
+    Ejecuta la sentencia registrada `name` con `params`. La prepara en la
+    conexión del cursor si todavía no lo estaba. Los resultados se leen del
+    cursor como con cursor.execute.
+    """
+    if not PREPARED_STATEMENTS_ENABLED:
+        cursor.execute(_statements[name], params)
+        return
+
+    connection = cursor.connection
+    prepared = _prepared_by_connection.get(connection)
+    if prepared is None:
+        prepared = _prepared_by_connection[connection] = set()
+
+    if name not in prepared:
+        # PREPARE no es transaccional: sobrevive a un rollback posterior
+        cursor.execute(f"PREPARE {name} AS {_to_positional(_statements[name])}")
+        prepared.add(name)
+
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def prepared_statement_names(connection):
+    """Sentencias ya preparadas en esta conexión (para diagnóstico y benchmarks)"""
+    return sorted(_prepared_by_connection.get(connection, ()))
@@ -0,0 +1,172 @@
+# database/scrape_log.py - Último scraping de cada URL de tarjeta y de cada caballo
+#
+# Si la misma tarjeta se pide otra vez dentro de SCRAPE_MIN_INTERVAL_SECONDS,
+# /api/scrape responde con lo guardado en scrape_log en lugar de abrir el
+# navegador y reprocesar la página. Los status de los participantes se toman
+# de race_entries, así que un retiro registrado después se ve igual.
+#
+# Los perfiles de caballos se guardan en horse_scrape_log, pero solo los
+# reutiliza quien esperó el lock de otro proceso que scrapeaba el mismo
+# caballo (ver services/single_flight.py); un pedido sin espera siempre scrapea.
+
+import os
+import json
+import logging
+from psycopg2.extras import Json
+from database.models import get_db_connection
+from utils.race_parser import race_date_from_race_id
+
+logger = logging.getLogger(__name__)
+
+# 0 desactiva el atajo (siempre se scrapea)
+SCRAPE_MIN_INTERVAL_SECONDS = int(os.getenv("SCRAPE_MIN_INTERVAL_SECONDS", "300"))
+
+
+def normalize_scrape_url(url):
+    """Clave de la tarjeta: la misma URL con o sin '/' final es la misma página"""
+    return url.strip().rstrip('/')
+
+
+def record_scrape(url, page_title, races):
+    """Registra un scraping exitoso de la URL con la respuesta que devolvió"""
+    conn = get_db_connection()
+    if not conn:
+        logger.warning(f"No se pudo registrar el scraping de {url}: sin conexión")
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO scrape_log (url, last_scraped_at, page_title, total_races, races)
+            VALUES (%s, LOCALTIMESTAMP, %s, %s, %s)
+            ON CONFLICT (url) DO UPDATE SET
+                last_scraped_at = EXCLUDED.last_scraped_at,
+                page_title = EXCLUDED.page_title,
+                total_races = EXCLUDED.total_races,
+                races = EXCLUDED.races
+        """, (
+            normalize_scrape_url(url), page_title, len(races),
+            Json(races, dumps=lambda value: json.dumps(value, default=str))
+        ))
+        conn.commit()
+        cur.close()
+        return True
+    except Exception as e:
+        logger.error(f"Error registrando el scraping de {url}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+def _apply_current_statuses(cur, races):
+    """Reemplaza el status de cada participante por el guardado en race_entries"""
+    race_ids = [race.get('race_id') for race in races if race.get('race_id')]
+    race_dates = list({race_date_from_race_id(race_id) for race_id in race_ids} - {None})
+    if not race_ids:
+        return
+    # Las fechas limitan la lectura a las particiones de la tarjeta
+    cur.execute("""
+        SELECT race_id, horse_id, status FROM race_entries
+        WHERE race_id = ANY(%s) AND race_date = ANY(%s::date[])
+    """, (race_ids, race_dates))
+    statuses = {(race_id, horse_id): status for race_id, horse_id, status in cur.fetchall()}
+    for race in races:
+        for participant in race.get('participants', []):
+            status = statuses.get((race.get('race_id'), participant.get('horse_id')))
+            if status:
+                participant['status'] = status
+
+
+def load_recent_scrape(url, max_age_seconds=None):
+    """
+    Resultado del último scraping de la URL si tiene menos de max_age_seconds
+    (por defecto SCRAPE_MIN_INTERVAL_SECONDS), con el mismo formato que
+    scrape_races_from_url más 'from_cache', 'scraped_at' y 'age_seconds'.
+    None si no hay.
+    """
+    max_age_seconds = SCRAPE_MIN_INTERVAL_SECONDS if max_age_seconds is None else max_age_seconds
+    if max_age_seconds <= 0:
+        return None
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT last_scraped_at, EXTRACT(EPOCH FROM LOCALTIMESTAMP - last_scraped_at),
+                   page_title, total_races, races
+            FROM scrape_log
+            WHERE url = %s AND last_scraped_at > LOCALTIMESTAMP - make_interval(secs => %s)
+        """, (normalize_scrape_url(url), max_age_seconds))
+        row = cur.fetchone()
+        if not row:
+            cur.close()
+            return None
+        scraped_at, age_seconds, page_title, total_races, races = row
+        _apply_current_statuses(cur, races)
+        cur.close()
+        return {
+            'success': True,
+            'page_title': page_title,
+            'total_races': total_races,
+            'url': url,
+            'races': races,
+            'from_cache': True,
+            'scraped_at': scraped_at.isoformat(),
+            'age_seconds': round(float(age_seconds), 1),
+        }
+    except Exception as e:
+        # Sin el atajo se scrapea normalmente
+        logger.error(f"Error leyendo el último scraping de {url}: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def record_horse_scrape(horse_id, profile):
+    """Guarda el perfil recién scrapeado del caballo para quien esté esperando el mismo scraping"""
+    conn = get_db_connection()
+    if not conn:
+        logger.warning(f"No se pudo registrar el scraping de {horse_id}: sin conexión")
+        return False
+    try:
+        cur = conn.cursor()
+        # clock_timestamp(): se compara con la hora en que otro proceso empezó a esperar el lock
+        cur.execute("""
+            INSERT INTO horse_scrape_log (horse_id, last_scraped_at, profile)
+            VALUES (%s, clock_timestamp(), %s)
+            ON CONFLICT (horse_id) DO UPDATE SET
+                last_scraped_at = EXCLUDED.last_scraped_at,
+                profile = EXCLUDED.profile
+        """, (horse_id, Json(profile, dumps=lambda value: json.dumps(value, default=str))))
+        conn.commit()
+        cur.close()
+        return True
+    except Exception as e:
+        logger.error(f"Error registrando el scraping de {horse_id}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+def load_horse_scrape_since(horse_id, since):
+    """Perfil del caballo scrapeado después de since (hora de la BD), o None"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT profile FROM horse_scrape_log
+            WHERE horse_id = %s AND last_scraped_at >= %s
+        """, (horse_id, since))
+        row = cur.fetchone()
+        cur.close()
+        return row[0] if row else None
+    except Exception as e:
+        # Sin el atajo se scrapea normalmente
+        logger.error(f"Error leyendo el último scraping de {horse_id}: {e}")
+        return None
+    finally:
+        conn.close()
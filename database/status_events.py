@@ -0,0 +1,53 @@
+# database/status_events.py - Historial de status de los participantes (append-only)
+#
+# Cada cambio de status observado en un scraping es una fila en
+# entry_status_events. El texto status_history que consume el frontend se
+# arma al leer, con el mismo formato que se guardaba antes en race_entries.
+
+import logging
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+INSERT_STATUS_EVENTS_QUERY = """
+    INSERT INTO entry_status_events (race_id, horse_id, track_code, from_status, to_status, observed_at)
+    VALUES %s
+"""
+
+
+def record_status_events(cursor, events):
+    """
+    Inserta en un solo lote los eventos (race_id, horse_id, track_code, from_status, to_status, observed_at).
+    from_status None indica la primera observación del caballo en la carrera.
+    """
+    if not events:
+        return 0
+    execute_values(cursor, INSERT_STATUS_EVENTS_QUERY, events, page_size=len(events))
+    return len(events)
+
+
+def format_status_event(from_status, to_status, observed_at):
+    """Línea de historial compatible con el formato anterior de status_history"""
+    timestamp = observed_at.strftime('%Y-%m-%d %H:%M:%S')
+    if from_status is None:
+        if to_status == 'scratched':
+            return f"{timestamp}: active → scratched (inicial)"
+        return f"{timestamp}: inicial → {to_status}"
+    return f"{timestamp}: {from_status} → {to_status}"
+
+
+def fetch_status_histories(cursor, race_id):
+    """Devuelve {horse_id: status_history} para todos los participantes de una carrera"""
+    cursor.execute("""
+        SELECT horse_id, from_status, to_status, observed_at
+        FROM entry_status_events
+        WHERE race_id = %s
+        ORDER BY horse_id, observed_at, event_id
+    """, (race_id,))
+
+    lines_by_horse = {}
+    for horse_id, from_status, to_status, observed_at in cursor.fetchall():
+        lines_by_horse.setdefault(horse_id, []).append(
+            format_status_event(from_status, to_status, observed_at)
+        )
+    return {horse_id: '\n'.join(lines) for horse_id, lines in lines_by_horse.items()}
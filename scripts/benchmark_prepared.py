@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark de sentencias planificadas vs preparadas en el guardado de carreras
+
+Repite el trabajo por participante de save_race_data_to_db y update_horse_data
+(búsqueda/alta de trainer, jockey y caballo, y lectura del perfil) sobre
+participantes sintéticos, primero ejecutando el SQL tal cual y luego con las
+sentencias preparadas de database/prepared.py. Cada modo usa su propia
+conexión y corre dentro de una transacción que se deshace al terminar, así que
+la base de datos no cambia.
+
+Los participantes se crean antes de medir con un INSERT masivo: se mide el caso
+de volver a guardar programas conocidos (solo búsquedas), sin el costo de
+generar IPA de las altas, que no depende del SQL.
+
+El refresco masivo de perfiles (scripts/update_all_horses.py con
+HorseProfileBulkWriter) queda fuera: escribe cada lote con un único
+execute_values, una sentencia por lote, así que no repite SQL por caballo y
+las sentencias preparadas no le aplican.
+
+Uso:
+    python scripts/benchmark_prepared.py
+    python scripts/benchmark_prepared.py --participants 50000 --repeat 5
+"""
+
+import sys
+import os
+import time
+import argparse
+import logging
+from psycopg2.extras import execute_values
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database.models import get_db_connection
+from database import prepared
+from database.prepared import execute_prepared, prepared_statement_names
+from database.entries import find_or_create_trainer, find_or_create_jockey, find_or_create_horse_with_id
+from services.scraping_service import SELECT_HORSE_PROFILE
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Sentencias por participante en cada pasada (todas búsquedas: los participantes ya existen)
+STATEMENTS_PER_PARTICIPANT = 4
+
+
+def synthetic_participants(count):
+    """Participantes con pocos trainers/jockeys repetidos, como en los programas reales"""
+    prefix = f"bench{os.getpid()}"
+    return [
+        (f"{prefix}_h{i}", f"Bench Horse {i}", f"Bench Trainer {prefix} {i % 300}", f"Bench Jockey {prefix} {i % 150}")
+        for i in range(count)
+    ]
+
+
+def seed_participants(cur, participants):
+    """Crea trainers, jockeys y caballos de una vez (dentro de la transacción del benchmark)"""
+    execute_values(cur, "INSERT INTO trainers (trainer_name) VALUES %s ON CONFLICT DO NOTHING",
+                   sorted({(trainer,) for _, _, trainer, _ in participants}))
+    execute_values(cur, "INSERT INTO jockeys (jockey_name) VALUES %s ON CONFLICT DO NOTHING",
+                   sorted({(jockey,) for _, _, _, jockey in participants}))
+    execute_values(cur, "INSERT INTO horses (horse_id, horse_name, trainer, status) VALUES %s ON CONFLICT DO NOTHING",
+                   [(horse_id, horse_name, trainer, 'active') for horse_id, horse_name, trainer, _ in participants])
+
+
+def save_participants(cur, participants):
+    """Mismas llamadas que save_race_data_to_db + la lectura de update_horse_data"""
+    for horse_id, horse_name, trainer, jockey in participants:
+        find_or_create_trainer(cur, trainer)
+        find_or_create_jockey(cur, jockey)
+        find_or_create_horse_with_id(cur, horse_id, horse_name, trainer_name=trainer)
+        execute_prepared(cur, SELECT_HORSE_PROFILE, (horse_id,))
+        cur.fetchone()
+
+
+def run_mode(use_prepared, participants, repeat):
+    """Devuelve los segundos de la mejor pasada"""
+    prepared.PREPARED_STATEMENTS_ENABLED = use_prepared
+    conn = get_db_connection()
+    if not conn:
+        logger.error("No se pudo conectar a la base de datos")
+        sys.exit(1)
+    cur = conn.cursor()
+    try:
+        seed_participants(cur, participants)
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            save_participants(cur, participants)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        if use_prepared:
+            print(f"Sentencias preparadas en la conexión: {', '.join(prepared_statement_names(conn))}")
+        return best
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de SQL planificado vs sentencias preparadas')
+    parser.add_argument('--participants', type=int, default=10000, help='Participantes sintéticos (default: 10000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Pasadas por modo; se toma la mejor (default: 3)')
+    args = parser.parse_args()
+
+    participants = synthetic_participants(args.participants)
+    statements = args.participants * STATEMENTS_PER_PARTICIPANT
+
+    results = {}
+    for label, use_prepared in (('planificado', False), ('preparado', True)):
+        results[label] = run_mode(use_prepared, participants, args.repeat)
+
+    print(f"\n{'Modo':<12} {'Tiempo':>10} {'Sentencias/s':>14}")
+    print('-' * 38)
+    for label, seconds in results.items():
+        print(f"{label:<12} {seconds:>9.2f}s {statements / seconds:>14.0f}")
+    print(f"\n{results['planificado'] / results['preparado']:.2f}x con sentencias preparadas")
+
+
+if __name__ == '__main__':
+    main()
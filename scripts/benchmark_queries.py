@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las consultas de los endpoints con EXPLAIN (ANALYZE, BUFFERS)
+
+Crea un esquema temporal en la base de datos configurada, le aplica las
+migraciones, lo llena con datos sintéticos y ejecuta EXPLAIN ANALYZE sobre
+cada consulta caliente. Así se ven los planes (Index Scan vs Seq Scan) y los
+tiempos antes de que una regresión llegue a producción.
+
+Uso:
+    python scripts/benchmark_queries.py
+    python scripts/benchmark_queries.py --horses 500000 --days 730
+    python scripts/benchmark_queries.py --without-indexes   # comparar sin la migración 0002
+    python scripts/benchmark_queries.py --verbose           # imprimir los planes completos
+"""
+
+import sys
+import os
+import time
+import argparse
+import logging
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database.models import get_db_connection
+from database.migrate import apply_migrations
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Índices creados por 0002_hot_query_indexes.sql (para --without-indexes)
+HOT_QUERY_INDEXES = [
+    'idx_races_date_number',
+    'idx_race_entries_horse_id',
+    'idx_horses_updated_at',
+    'idx_pedigree_sire_id',
+    'idx_pedigree_dam_id',
+    'idx_pedigree_maternal_grandsire_id',
+]
+
+# Consultas de los endpoints (mismas formas que en api/ y scripts/)
+BENCHMARK_QUERIES = [
+    ('races: carreras del último día', """
+        SELECT race_id, race_name, race_number, race_type,
+               distance, surface, conditions_clean, age_restriction,
+               specific_race_url, race_date, track_name, track_code, created_at
+        FROM races
+        WHERE race_date = (SELECT MAX(race_date) FROM races)
+        ORDER BY race_number
+    """),
+    ('races: participantes de una carrera', """
+        SELECT horse_name, horse_id, sire, trainer, jockey,
+               status, status_changed_at, post_position
+        FROM race_entries WHERE race_id = %(race_id)s AND race_date = %(race_date)s
+        ORDER BY post_position NULLS LAST, horse_name
+    """),
+    ('races: historial de status de una carrera', """
+        SELECT horse_id, from_status, to_status, observed_at
+        FROM entry_status_events
+        WHERE race_id = %(race_id)s
+        ORDER BY horse_id, observed_at, event_id
+    """),
+    ('status: retiros de un hipódromo hoy', """
+        SELECT race_id, horse_id, observed_at
+        FROM entry_status_events
+        WHERE track_code = %(track_code)s
+        AND to_status = 'scratched'
+        AND observed_at >= CURRENT_DATE
+    """),
+    ('scraping: caballos de una carrera pendientes', """
+        SELECT re.horse_id, re.horse_name
+        FROM race_entries re
+        LEFT JOIN horses h ON re.horse_id = h.horse_id
+        WHERE re.race_id = %(race_id)s AND re.race_date = %(race_date)s
+        AND re.horse_id IS NOT NULL
+        AND re.horse_id != 'N/A'
+        AND (
+            h.updated_at IS NULL
+            OR h.updated_at < NOW() - INTERVAL '20 days'
+        )
+    """),
+    ('scraping: carreras de un caballo', """
+        SELECT re.race_id, re.status
+        FROM race_entries re
+        WHERE re.horse_id = %(horse_id)s
+    """),
+    ('scraping: caballos desactualizados', """
+        SELECT horse_id, horse_name
+        FROM horses
+        WHERE updated_at IS NULL
+        OR updated_at < NOW() - INTERVAL '20 days'
+        ORDER BY horse_name
+    """),
+    ('scraping: caballos nunca scrapeados', """
+        SELECT horse_id, horse_name
+        FROM horses
+        WHERE updated_at IS NULL
+        ORDER BY horse_name
+    """),
+    ('scraping: caballos al día (conteo)', """
+        SELECT COUNT(*)
+        FROM horses
+        WHERE updated_at IS NOT NULL
+        AND updated_at >= NOW() - INTERVAL '20 days'
+    """),
+    ('pedigree: hijos de un padre', """
+        SELECT horse_id FROM pedigree WHERE sire_id = %(sire_id)s
+    """),
+    ('pedigree: hijos de una madre', """
+        SELECT horse_id FROM pedigree WHERE dam_id = %(dam_id)s
+    """),
+    ('pedigree: nietos por abuelo materno', """
+        SELECT horse_id FROM pedigree WHERE maternal_grandsire_id = %(maternal_grandsire_id)s
+    """),
+]
+
+
+def seed_synthetic_data(cur, horses, days, tracks, races_per_day, runners):
+    """Llena el esquema de prueba con datos sintéticos de tamaño configurable"""
+    logger.info(f"Generando {horses} caballos...")
+    # ~10% nunca scrapeados, el resto repartido en el último año
+    cur.execute("""
+        INSERT INTO horses (horse_id, horse_name, status, country_of_birth, created_at, updated_at)
+        SELECT 'h' || g, 'Horse ' || md5(g::text), 'active', 'USA',
+               NOW() - (g %% 365) * INTERVAL '1 day',
+               CASE WHEN g %% 10 = 0 THEN NULL ELSE NOW() - (g %% 365) * INTERVAL '1 day' END
+        FROM generate_series(1, %s) AS g
+    """, (horses,))
+
+    logger.info(f"Generando {days * tracks * races_per_day} carreras...")
+    # races y race_entries están particionadas por mes (0010): crear los meses del rango
+    cur.execute("SELECT ensure_race_partitions(CURRENT_DATE - (%s - 1), CURRENT_DATE)", (days,))
+    cur.execute("""
+        INSERT INTO races (race_id, race_date, race_number, track_code, track_name, race_name, created_at)
+        SELECT 'T' || t || '_' || to_char(d, 'YYYYMMDD') || '_R' || n,
+               d, n, 'T' || t, 'Track ' || t, 'Race # ' || n, NOW()
+        FROM generate_series(CURRENT_DATE - (%s - 1), CURRENT_DATE, INTERVAL '1 day') AS d,
+             generate_series(1, %s) AS t,
+             generate_series(1, %s) AS n
+    """, (days, tracks, races_per_day))
+
+    logger.info(f"Generando participantes ({runners} por carrera)...")
+    cur.execute("""
+        INSERT INTO race_entries (race_id, race_date, horse_id, horse_name, status, post_position)
+        SELECT r.race_id, r.race_date, 'h' || (1 + abs(hashtext(r.race_id || p)) %% %(horses)s),
+               'Horse', 'active', p
+        FROM races r, generate_series(1, %(runners)s) AS p
+        ON CONFLICT DO NOTHING
+    """, {'horses': horses, 'runners': runners})
+
+    logger.info("Generando eventos de status...")
+    # Un evento inicial por participante y ~5% de retiros posteriores
+    cur.execute("""
+        INSERT INTO entry_status_events (race_id, horse_id, track_code, from_status, to_status, observed_at)
+        SELECT re.race_id, re.horse_id, r.track_code, NULL, 'active', r.race_date
+        FROM race_entries re JOIN races r ON r.race_id = re.race_id AND r.race_date = re.race_date
+        UNION ALL
+        SELECT re.race_id, re.horse_id, r.track_code, 'active', 'scratched', r.race_date + INTERVAL '10 hours'
+        FROM race_entries re JOIN races r ON r.race_id = re.race_id AND r.race_date = re.race_date
+        WHERE re.post_position = 1 AND r.race_number % 2 = 0
+    """)
+
+    logger.info("Generando pedigrees...")
+    # Pocos sementales y muchas yeguas, como en la población real
+    cur.execute("""
+        INSERT INTO pedigree (horse_id, sire_id, dam_id, maternal_grandsire_id)
+        SELECT 'h' || g,
+               'h' || (1 + g %% 500),
+               'h' || (1 + (g * 7) %% (%(horses)s / 4)),
+               'h' || (1 + (g * 13) %% 500)
+        FROM generate_series(1, %(horses)s) AS g
+    """, {'horses': horses})
+
+    cur.execute("ANALYZE")
+
+
+def pick_parameters(cur):
+    """Elige valores reales del dataset para las consultas con parámetros"""
+    cur.execute("SELECT race_id, race_date, track_code FROM races ORDER BY race_date DESC, race_number LIMIT 1")
+    race_id, race_date, track_code = cur.fetchone()
+    cur.execute("SELECT horse_id, sire_id, dam_id, maternal_grandsire_id FROM pedigree LIMIT 1")
+    horse_id, sire_id, dam_id, maternal_grandsire_id = cur.fetchone()
+    return {
+        'race_id': race_id,
+        'race_date': race_date,
+        'track_code': track_code,
+        'horse_id': horse_id,
+        'sire_id': sire_id,
+        'dam_id': dam_id,
+        'maternal_grandsire_id': maternal_grandsire_id,
+    }
+
+
+def collect_scans(plan, scans):
+    """Recorre el plan JSON y junta los nodos de lectura de tablas"""
+    node_type = plan.get('Node Type', '')
+    if 'Scan' in node_type:
+        target = plan.get('Index Name') or plan.get('Relation Name') or ''
+        scans.append(f"{node_type}({target})" if target else node_type)
+    for child in plan.get('Plans', []):
+        collect_scans(child, scans)
+    return scans
+
+
+def run_benchmark(cur, params, verbose=False):
+    """Ejecuta EXPLAIN ANALYZE para cada consulta y devuelve los resultados"""
+    results = []
+    for label, query in BENCHMARK_QUERIES:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        explain = cur.fetchone()[0][0]
+        plan = explain['Plan']
+        shared = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+        results.append({
+            'label': label,
+            'execution_ms': explain['Execution Time'],
+            'planning_ms': explain['Planning Time'],
+            'buffers': shared,
+            'scans': collect_scans(plan, []),
+        })
+        if verbose:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+            print(f"\n--- {label} ---")
+            print('\n'.join(row[0] for row in cur.fetchall()))
+    return results
+
+
+def print_results(results):
+    print(f"\n{'Consulta':<45} {'Ejecución':>11} {'Plan':>9} {'Buffers':>9}  Lecturas")
+    print('-' * 120)
+    for result in results:
+        seq_scan = any(scan.startswith('Seq Scan') for scan in result['scans'])
+        print(
+            f"{result['label']:<45} {result['execution_ms']:>9.2f}ms {result['planning_ms']:>7.2f}ms "
+            f"{result['buffers']:>9}  {'⚠️ ' if seq_scan else ''}{', '.join(result['scans'])}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de consultas con EXPLAIN ANALYZE sobre datos sintéticos')
+    parser.add_argument('--horses', type=int, default=200000, help='Cantidad de caballos (default: 200000)')
+    parser.add_argument('--days', type=int, default=365, help='Días de carreras (default: 365)')
+    parser.add_argument('--tracks', type=int, default=10, help='Hipódromos por día (default: 10)')
+    parser.add_argument('--races-per-day', type=int, default=10, help='Carreras por hipódromo y día (default: 10)')
+    parser.add_argument('--runners', type=int, default=8, help='Participantes por carrera (default: 8)')
+    parser.add_argument('--without-indexes', action='store_true', help='Eliminar los índices de 0002 antes de medir')
+    parser.add_argument('--keep', action='store_true', help='No borrar el esquema de prueba al terminar')
+    parser.add_argument('--verbose', action='store_true', help='Imprimir los planes completos')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        logger.error("No se pudo conectar a la base de datos")
+        sys.exit(1)
+
+    schema = f"benchmark_{os.getpid()}"
+    cur = conn.cursor()
+    try:
+        cur.execute(f"CREATE SCHEMA {schema}")
+        cur.execute(f"SET search_path TO {schema}, public")
+        conn.commit()
+
+        if apply_migrations(conn) is None:
+            logger.error("No se pudieron aplicar las migraciones en el esquema de prueba")
+            sys.exit(1)
+
+        start = time.time()
+        seed_synthetic_data(cur, args.horses, args.days, args.tracks, args.races_per_day, args.runners)
+        conn.commit()
+        logger.info(f"Datos sintéticos generados en {time.time() - start:.1f}s")
+
+        if args.without_indexes:
+            for index_name in HOT_QUERY_INDEXES:
+                cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+            cur.execute("ANALYZE")
+            conn.commit()
+            logger.info("Índices de 0002 eliminados para la comparación")
+
+        results = run_benchmark(cur, pick_parameters(cur), verbose=args.verbose)
+        conn.rollback()
+        print_results(results)
+
+    finally:
+        conn.rollback()
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            conn.commit()
+        else:
+            logger.info(f"Esquema de prueba conservado: {schema}")
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Exporta caballos o participaciones a NDJSON o CSV leyendo con un cursor del
+servidor: la memoria se mantiene constante aunque la tabla tenga millones de filas.
+
+Uso:
+    python scripts/export_data.py horses --output horses.ndjson
+    python scripts/export_data.py entries --format csv --date-from 2025-01-01 --output entries.csv
+    python scripts/export_data.py entries --track-code SA > entries.ndjson
+"""
+
+import sys
+import os
+import time
+import argparse
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.export_service import (
+    EXPORT_FORMATS, HORSE_EXPORT_COLUMNS, ENTRY_EXPORT_COLUMNS,
+    horses_export_query, entries_export_query, export_lines
+)
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportar datos a NDJSON o CSV')
+    parser.add_argument('dataset', choices=['horses', 'entries'], help='Qué exportar')
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson', help='Formato de salida')
+    parser.add_argument('--output', help='Archivo de salida (por defecto, stdout)')
+    parser.add_argument('--date-from', type=parse_date, help='Solo entries: fecha mínima YYYY-MM-DD')
+    parser.add_argument('--date-to', type=parse_date, help='Solo entries: fecha máxima YYYY-MM-DD')
+    parser.add_argument('--track-code', help='Solo entries: código del hipódromo')
+    args = parser.parse_args()
+
+    if args.dataset == 'horses':
+        columns = HORSE_EXPORT_COLUMNS
+        query, params = horses_export_query()
+    else:
+        columns = ENTRY_EXPORT_COLUMNS
+        query, params = entries_export_query(args.date_from, args.date_to, args.track_code)
+
+    try:
+        lines = export_lines(args.format, columns, query, params)
+    except ConnectionError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.time()
+    rows = 0
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        for line in lines:
+            output.write(line)
+            rows += 1
+    finally:
+        if args.output:
+            output.close()
+
+    # En CSV la primera línea es el encabezado
+    if args.format == 'csv':
+        rows -= 1
+    print(f"✅ {rows} filas exportadas en {time.time() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
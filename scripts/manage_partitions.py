@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Mantenimiento de las particiones mensuales de races y race_entries
+
+Crea los meses siguientes por adelantado (los guardados también crean su mes si
+falta, pero así nunca se hace DDL en medio de un scraping) y archiva los meses
+viejos en CSV comprimidos con gzip, soltando sus particiones. Un mes archivado
+se puede volver a cargar con --restore.
+
+Al archivar también se guardan y borran los eventos de status de esas carreras.
+Las estadísticas de padres (sire_stats y afines) conservan los conteos
+históricos.
+
+Uso:
+    python scripts/manage_partitions.py                           # listar particiones
+    python scripts/manage_partitions.py --ahead 3                 # crear hasta 3 meses adelante
+    python scripts/manage_partitions.py --archive-before 2024-01  # archivar meses anteriores a enero 2024
+    python scripts/manage_partitions.py --restore 2023-06         # volver a cargar junio 2023
+
+Pensado para correr una vez por día desde cron:
+    0 4 * * * cd /ruta/al/proyecto && python scripts/manage_partitions.py --ahead 3
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database.models import get_db_connection
+from database.partitions import (
+    parse_month, ensure_partitions_ahead, list_race_partitions, archive_race_month, restore_race_month
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), '..', 'archive', 'races')
+
+
+def print_partitions(cur):
+    partitions = list_race_partitions(cur)
+    print(f"\n{'Mes':<8} {'Carreras':>10} {'Participantes':>14} {'Tamaño':>10}")
+    print('-' * 45)
+    for month, races, entries, size in partitions:
+        print(f"{month:%Y-%m}  {races:>10} {entries:>14} {size / (1024 * 1024):>8.1f}MB")
+    print(f"\n{len(partitions)} meses (los conteos son estimados de pg_stat)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Particiones mensuales de races y race_entries')
+    parser.add_argument('--ahead', type=int, help='Crear particiones hasta N meses después del actual')
+    parser.add_argument('--archive-before', metavar='YYYY-MM',
+                        help='Archivar y soltar las particiones de los meses anteriores a este')
+    parser.add_argument('--restore', metavar='YYYY-MM', help='Volver a cargar un mes archivado')
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR,
+                        help='Directorio de los archivos .csv.gz (default: archive/races)')
+    args = parser.parse_args()
+
+    try:
+        archive_before = parse_month(args.archive_before) if args.archive_before else None
+        restore_month = parse_month(args.restore) if args.restore else None
+    except ValueError:
+        logger.error("Mes inválido, formato esperado YYYY-MM")
+        sys.exit(1)
+
+    conn = get_db_connection()
+    if not conn:
+        logger.error("No se pudo conectar a la base de datos")
+        sys.exit(1)
+
+    try:
+        cur = conn.cursor()
+
+        if args.ahead is not None:
+            created = ensure_partitions_ahead(cur, args.ahead)
+            conn.commit()
+            logger.info(f"🗂️ {created} meses nuevos creados ({args.ahead} meses adelante)")
+
+        if archive_before:
+            old_months = [month for month, _, _, _ in list_race_partitions(cur) if month < archive_before]
+            conn.commit()
+            for month in old_months:
+                archive_race_month(conn, month, args.archive_dir)
+            logger.info(f"📦 {len(old_months)} meses archivados en {args.archive_dir}")
+
+        if restore_month:
+            restore_race_month(conn, restore_month, args.archive_dir)
+
+        print_partitions(cur)
+        cur.close()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,9 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from utils.database import get_db_connection
-from services.scraping_service import scrape_horse_profile, update_horse_data
+from services.scraping_service import scrape_horse_profile
+from database.bulk_writers import HorseProfileBulkWriter
+from services.stats_service import refresh_system_stats
 import logging
 
 # Configurar logging
@@ -53,8 +55,8 @@ def get_all_horse_ids():
         logger.error(f"Error obteniendo horse_ids: {e}")
         return []
 
-def update_single_horse(horse_id, retry_count=3):
-    """Actualizar un solo caballo con reintentos"""
+def scrape_single_horse(horse_id, retry_count=3):
+    """Scrapear un solo caballo con reintentos; la escritura en BD se hace por lotes"""
     for attempt in range(retry_count):
         try:
             logger.info(f"Procesando {horse_id} (intento {attempt + 1}/{retry_count})")
@@ -66,21 +68,11 @@ def update_single_horse(horse_id, retry_count=3):
             horse_data = scrape_horse_profile(horse_id, horse_name)
             
             if horse_data:
-                # Guardar en base de datos
-                connection = get_db_connection()
-                cursor = connection.cursor()
-                
-                update_horse_data(cursor, horse_id, horse_data)
-                connection.commit()
-                
-                cursor.close()
-                connection.close()
-                
-                logger.info(f"✅ {horse_id} actualizado correctamente")
-                return True
+                logger.info(f"✅ {horse_id} scrapeado correctamente")
+                return horse_data
             else:
                 logger.warning(f"⚠️ No se pudieron extraer datos para {horse_id}")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"❌ Error procesando {horse_id} (intento {attempt + 1}): {e}")
@@ -88,7 +80,24 @@ def update_single_horse(horse_id, retry_count=3):
                 time.sleep(5)  # Esperar antes del siguiente intento
             
     logger.error(f"❌ Falló definitivamente: {horse_id}")
-    return False
+    return None
+
+def flush_batch(connection, writer):
+    """
+    Escribir el lote pendiente y confirmar la transacción.
+    Devuelve cuántos perfiles del lote no se pudieron guardar.
+    """
+    pending_count = len(writer.pending)
+    failed_before = len(writer.failed_horses)
+    try:
+        writer.flush()
+        connection.commit()
+        return len(writer.failed_horses) - failed_before
+    except Exception as e:
+        logger.error(f"❌ Error guardando lote de perfiles: {e}")
+        connection.rollback()
+        writer.discard()
+        return pending_count
 
 def main():
     parser = argparse.ArgumentParser(description='Actualizar todos los caballos de la base de datos')
@@ -135,17 +144,32 @@ def main():
     
     logger.info(f"📊 Procesando {total_horses} caballos...")
     
+    # Una sola conexión para todo el proceso; los perfiles se escriben por lotes
+    connection = get_db_connection()
+    if not connection:
+        logger.error("No se pudo conectar a la base de datos")
+        return
+    cursor = connection.cursor()
+    # Sin flush automático: este bucle escribe y hace commit cada --batch-size caballos
+    writer = HorseProfileBulkWriter(cursor, batch_size=None)
+    
     # Procesar caballos
     for i, horse_id in enumerate(horse_ids, 1):
         logger.info(f"🐎 [{i}/{total_horses}] Procesando: {horse_id}")
         
-        success = update_single_horse(horse_id)
+        horse_data = scrape_single_horse(horse_id)
         
-        if success:
+        if horse_data:
+            writer.add(horse_id, horse_data)
             successful += 1
         else:
             failed += 1
         
+        if len(writer.pending) >= args.batch_size:
+            lost = flush_batch(connection, writer)
+            failed += lost
+            successful -= lost
+        
         # Mostrar progreso cada 10 caballos
         if i % 10 == 0:
             elapsed = datetime.now() - start_time
@@ -161,6 +185,19 @@ def main():
         if i < total_horses:  # No esperar después del último
             time.sleep(args.delay)
     
+    # Escribir el último lote
+    if writer.pending:
+        lost = flush_batch(connection, writer)
+        failed += lost
+        successful -= lost
+    
+    cursor.close()
+    connection.close()
+    
+    # Compactar los conteos del dashboard una sola vez, al final de la corrida
+    if writer.total_changed:
+        refresh_system_stats()
+    
     # Estadísticas finales
     end_time = datetime.now()
     total_time = end_time - start_time
@@ -169,6 +206,7 @@ def main():
     logger.info(f"📊 Estadísticas finales:")
     logger.info(f"   Total procesados: {total_horses}")
     logger.info(f"   Exitosos: {successful}")
+    logger.info(f"   Con cambios reales en BD: {writer.total_changed}")
     logger.info(f"   Fallidos: {failed}")
     logger.info(f"   Tasa de éxito: {successful/total_horses*100:.1f}%")
     logger.info(f"   Tiempo total: {total_time}")
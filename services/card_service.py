@@ -0,0 +1,139 @@
+# services/card_service.py - Programa completo de una jornada en una sola consulta
+#
+# Carreras, participantes, perfil del caballo (con IPA) e historial de status se
+# arman en PostgreSQL con json_agg: la página de carreras hace un solo pedido
+# y la base una sola consulta, en lugar de una por carrera.
+
+import logging
+from datetime import datetime
+from database.models import get_db_connection
+from database.status_events import format_status_event
+from utils.http_cache import data_versions_query
+
+logger = logging.getLogger(__name__)
+
+CARD_RACES_CTE = """
+    WITH card_date AS (
+        SELECT COALESCE(
+            %(race_date)s::date,
+            (SELECT MAX(race_date) FROM races WHERE %(track_code)s = 'all' OR track_code = %(track_code)s)
+        ) AS race_date
+    ),
+    card_races AS (
+        -- Subconsulta escalar: la fecha se conoce antes de leer y solo se toca su partición
+        SELECT r.*
+        FROM races r
+        WHERE r.race_date = (SELECT race_date FROM card_date)
+        AND (%(track_code)s = 'all' OR r.track_code = %(track_code)s)
+    )
+"""
+
+# Validador para GET condicional: cambia si cambia cualquier carrera, participante o perfil
+CARD_VALIDATOR_QUERY = data_versions_query('races', 'race_entries', 'horses')
+
+CARD_QUERY = CARD_RACES_CTE + """
+    SELECT
+        (SELECT race_date FROM card_date),
+        COALESCE(json_agg(json_build_object(
+            'race_id', cr.race_id,
+            'race_title', cr.race_name,
+            'race_name', cr.race_name,
+            'race_number', cr.race_number,
+            'race_type', cr.race_type,
+            'distance', cr.distance,
+            'surface', cr.surface,
+            'conditions', cr.conditions_clean,
+            'conditions_clean', cr.conditions_clean,
+            'age_restriction', cr.age_restriction,
+            'specific_race_url', cr.specific_race_url,
+            'race_date', cr.race_date,
+            'track_name', cr.track_name,
+            'track_ipa', cr.track_ipa,
+            'track_code', cr.track_code,
+            'entries', COALESCE((
+                SELECT json_agg(json_build_object(
+                    'horse_id', re.horse_id,
+                    'horse_name', re.horse_name,
+                    'horse_name_ipa', h.horse_name_ipa,
+                    'post_position', re.post_position,
+                    'sire', re.sire,
+                    'trainer', re.trainer,
+                    'trainer_ipa', h.trainer_ipa,
+                    'jockey', re.jockey,
+                    'owner', h.owner,
+                    'owner_ipa', h.owner_ipa,
+                    'breeder', h.breeder,
+                    'breeder_ipa', h.breeder_ipa,
+                    'age', h.age,
+                    'sex', h.sex,
+                    'color', h.color,
+                    'country_of_birth', h.country_of_birth,
+                    'profile_updated_at', h.updated_at,
+                    'status', re.status,
+                    'status_changed_at', re.status_changed_at,
+                    'status_events', (
+                        SELECT json_agg(json_build_array(ev.from_status, ev.to_status,
+                                                         to_char(ev.observed_at, 'YYYY-MM-DD HH24:MI:SS'))
+                                        ORDER BY ev.observed_at, ev.event_id)
+                        FROM entry_status_events ev
+                        WHERE ev.race_id = re.race_id AND ev.horse_id = re.horse_id
+                    )
+                ) ORDER BY re.post_position NULLS LAST, re.horse_name)
+                FROM race_entries re
+                LEFT JOIN horses h ON h.horse_id = re.horse_id
+                WHERE re.race_id = cr.race_id AND re.race_date = cr.race_date
+            ), '[]'::json)
+        ) ORDER BY cr.track_code, cr.race_number), '[]'::json)
+    FROM card_races cr
+"""
+
+
+def _status_history(events):
+    """Texto de historial con el mismo formato que /api/races/<race_id>/entries"""
+    if not events:
+        return None
+    return '\n'.join(
+        format_status_event(from_status, to_status, datetime.strptime(observed_at, '%Y-%m-%d %H:%M:%S'))
+        for from_status, to_status, observed_at in events
+    )
+
+
+def card_params(track_code, race_date=None):
+    return {'track_code': track_code, 'race_date': race_date}
+
+
+def load_race_card(cursor, track_code, race_date=None):
+    """
+    Programa de una jornada: track_code='all' para todos los hipódromos y
+    race_date=None para la última fecha con carreras.
+    """
+    cursor.execute(CARD_QUERY, card_params(track_code, race_date))
+    card_date, races = cursor.fetchone()
+
+    total_entries = 0
+    for race in races:
+        for entry in race['entries']:
+            entry['status_history'] = _status_history(entry.pop('status_events'))
+        total_entries += len(race['entries'])
+
+    return {
+        'track_code': track_code,
+        'race_date': card_date.isoformat() if card_date else None,
+        'races': races,
+        'total_races': len(races),
+        'total_entries': total_entries,
+    }
+
+
+def get_race_card(track_code, race_date=None):
+    """Igual que load_race_card, abriendo y cerrando su propia conexión"""
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Error de conexión a la base de datos')
+    try:
+        cur = conn.cursor()
+        card = load_race_card(cur, track_code, race_date)
+        cur.close()
+    finally:
+        conn.close()
+    return card
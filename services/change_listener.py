@@ -0,0 +1,162 @@
+# services/change_listener.py - Coherencia de cachés entre procesos
+#
+# Cada proceso web abre una conexión dedicada con LISTEN sobre el canal de
+# cambios. Un hilo en segundo plano espera los avisos (sin consultar la BD
+# periódicamente), invalida las cachés locales (respuestas y árboles de
+# pedigree), actualiza los índices de búsqueda en memoria (autocompletado y
+# fonético) y reenvía el evento a los suscriptores del feed de cambios
+# (/api/changes/stream).
+#
+# Los avisos que se emiten mientras la conexión está caída se pierden, así que
+# cada vez que el LISTEN queda activo (al arrancar y al reconectar) se
+# descartan las cachés y los índices locales y se recargan en el próximo uso.
+
+import os
+import json
+import queue
+import select
+import logging
+import threading
+import psycopg2.extensions
+from database.models import get_db_connection
+from database.notifications import (
+    CHANGES_CHANNEL, RACE_CHANGED, HORSE_CHANGED, PEDIGREE_CHANGED, HORSE_NAME_CHANGED
+)
+from services.pedigree_service import invalidate_pedigree_trees, clear_pedigree_caches
+from services.horse_search_service import apply_name_change, reset_name_trie
+from services.phonetic_search_service import refresh_horses as refresh_phonetic_horses, drop_phonetic_index
+from utils.response_cache import response_cache, invalidate_response_cache, race_tags, horse_tags
+
+logger = logging.getLogger(__name__)
+
+CHANGE_LISTENER_ENABLED = os.getenv("CHANGE_LISTENER_ENABLED", "1") == "1"
+# Segundos máximos de espera en select() antes de revisar si hay que detenerse
+LISTEN_TIMEOUT = 5
+# Espera antes de reconectar después de perder la conexión
+RECONNECT_DELAY = 5
+# Eventos pendientes por suscriptor; si un cliente no los consume se descartan
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_subscribers = set()
+_subscribers_lock = threading.Lock()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def subscribe():
+    """Registra un suscriptor del feed de cambios y devuelve su cola de eventos"""
+    events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _subscribers_lock:
+        _subscribers.add(events)
+    return events
+
+
+def unsubscribe(events):
+    with _subscribers_lock:
+        _subscribers.discard(events)
+
+
+def publish(event):
+    """Entrega el evento a todos los suscriptores sin bloquear al listener"""
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for events in subscribers:
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            logger.warning("Suscriptor del feed de cambios saturado, evento descartado")
+
+
+def apply_change(cursor, event):
+    """Invalida las cachés locales afectadas por un evento de cambio"""
+    kind = event.get('kind')
+    if kind == RACE_CHANGED:
+        invalidate_response_cache(race_tags(event['race_id'], event.get('race_date')))
+    elif kind == HORSE_CHANGED:
+        invalidate_response_cache(horse_tags(event['horse_ids']))
+        invalidate_pedigree_trees(cursor, event['horse_ids'])
+        refresh_phonetic_horses(cursor, event['horse_ids'])
+    elif kind == PEDIGREE_CHANGED:
+        invalidate_pedigree_trees(cursor, event['horse_ids'])
+    elif kind == HORSE_NAME_CHANGED:
+        apply_name_change(event['horse_id'], event.get('old_name'), event.get('new_name'))
+        refresh_phonetic_horses(cursor, [event['horse_id']])
+    else:
+        logger.warning(f"Evento de cambio desconocido: {event}")
+
+
+def reset_local_state():
+    """
+    Descarta todo lo que depende de los avisos: los que llegaron mientras no
+    había LISTEN se perdieron. Las cachés y los índices se vuelven a llenar
+    desde la BD en el próximo uso.
+    """
+    response_cache.clear()
+    clear_pedigree_caches()
+    reset_name_trie()
+    drop_phonetic_index('horse')
+    logger.info("🧹 Cachés e índices locales descartados al suscribirse a los cambios")
+
+
+class ChangeListener(threading.Thread):
+    """Hilo que escucha el canal de cambios y reconecta si se pierde la conexión"""
+
+    def __init__(self):
+        super().__init__(name='change-listener', daemon=True)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            conn = get_db_connection()
+            if not conn:
+                self._stop_event.wait(RECONNECT_DELAY)
+                continue
+            try:
+                self._listen(conn)
+            except Exception as e:
+                logger.error(f"Listener de cambios desconectado: {e}")
+                self._stop_event.wait(RECONNECT_DELAY)
+            finally:
+                conn.close()
+
+    def _listen(self, conn):
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+        cur.execute(f"LISTEN {CHANGES_CHANNEL}")
+        # Después del LISTEN: un cambio posterior llega como aviso, uno anterior
+        # ya está en la BD cuando se recargue
+        reset_local_state()
+        logger.info(f"👂 Escuchando cambios en el canal {CHANGES_CHANNEL}")
+
+        while not self._stop_event.is_set():
+            if select.select([conn], [], [], LISTEN_TIMEOUT) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    event = json.loads(notify.payload)
+                    apply_change(cur, event)
+                    publish(event)
+                except Exception as e:
+                    logger.error(f"Error procesando aviso de cambio {notify.payload!r}: {e}")
+
+
+def listener_is_running():
+    """True si este proceso recibe los avisos de cambios"""
+    return _listener is not None and _listener.is_alive()
+
+
+def start_change_listener():
+    """Arranca el listener del proceso (una sola vez)"""
+    global _listener
+    if not CHANGE_LISTENER_ENABLED:
+        return None
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = ChangeListener()
+            _listener.start()
+    return _listener
@@ -0,0 +1,136 @@
+# services/export_service.py - Exportación por streaming de caballos y participaciones
+#
+# Las filas se leen con un cursor con nombre (del lado del servidor): PostgreSQL
+# las entrega de a EXPORT_ITERSIZE y cada una se escribe apenas llega, así que la
+# memoria no crece con el tamaño de la tabla. Lo usan api/exports.py y
+# scripts/export_data.py.
+
+import os
+import io
+import csv
+import json
+import uuid
+import logging
+from database.models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Filas por viaje de red del cursor del servidor
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", "5000"))
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+HORSE_EXPORT_COLUMNS = [
+    'horse_id', 'horse_name', 'horse_name_ipa', 'owner', 'owner_ipa',
+    'trainer', 'trainer_ipa', 'breeder', 'breeder_ipa', 'country',
+    'country_of_birth', 'age', 'status', 'sex', 'color', 'url', 'profile_url',
+    'last_race_date', 'created_at', 'updated_at'
+]
+
+ENTRY_EXPORT_COLUMNS = [
+    'race_id', 'race_date', 'track_code', 'race_number', 'distance', 'surface',
+    'horse_id', 'horse_name', 'post_position', 'trainer', 'jockey', 'sire',
+    'status', 'status_changed_at', 'updated_at'
+]
+
+
+def horses_export_query():
+    return f"""
+        SELECT {', '.join(HORSE_EXPORT_COLUMNS)}
+        FROM horses
+        ORDER BY horse_name, horse_id
+    """, []
+
+
+def entries_export_query(date_from=None, date_to=None, track_code=None):
+    """Participaciones con los datos de su carrera, filtradas por rango de fechas e hipódromo"""
+    conditions = []
+    params = []
+    # El rango va sobre ambas tablas para que cada una lea solo las particiones de esos meses
+    if date_from:
+        conditions.append("r.race_date >= %s AND re.race_date >= %s")
+        params.extend([date_from, date_from])
+    if date_to:
+        conditions.append("r.race_date <= %s AND re.race_date <= %s")
+        params.extend([date_to, date_to])
+    if track_code:
+        conditions.append("r.track_code = %s")
+        params.append(track_code)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    return f"""
+        SELECT re.race_id, r.race_date, r.track_code, r.race_number, r.distance, r.surface,
+               re.horse_id, re.horse_name, re.post_position, re.trainer, re.jockey, re.sire,
+               re.status, re.status_changed_at, re.updated_at
+        FROM race_entries re
+        JOIN races r ON r.race_id = re.race_id AND r.race_date = re.race_date
+        {where}
+        ORDER BY r.race_date, r.track_code, r.race_number, re.post_position NULLS LAST, re.horse_id
+    """, params
+
+
+def iter_rows(conn, query, params, itersize=EXPORT_ITERSIZE):
+    """
+    Genera las filas de la consulta con un cursor del servidor. La conexión se
+    cierra al terminar la iteración (o si el cliente corta la descarga).
+    """
+    try:
+        # Los cursores con nombre viven dentro de una transacción: solo lectura
+        conn.set_session(readonly=True)
+        cur = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+        cur.itersize = itersize
+        cur.execute(query, params)
+        for row in cur:
+            yield row
+        cur.close()
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def ndjson_lines(columns, rows):
+    """Una línea JSON por fila"""
+    for row in rows:
+        yield json.dumps(
+            {column: _json_value(value) for column, value in zip(columns, row)},
+            ensure_ascii=False
+        ) + '\n'
+
+
+def csv_lines(columns, rows):
+    """Encabezado y una línea CSV por fila, reutilizando el mismo buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return line
+
+    writer.writerow(columns)
+    yield flush()
+    for row in rows:
+        writer.writerow(row)
+        yield flush()
+
+
+def export_lines(export_format, columns, query, params):
+    """
+    Líneas del export en el formato pedido ('ndjson' o 'csv'). La conexión se
+    abre acá y no al iterar, para poder responder con error antes de empezar.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Error de conexión a la base de datos')
+    rows = iter_rows(conn, query, params)
+    if export_format == 'csv':
+        return csv_lines(columns, rows)
+    return ndjson_lines(columns, rows)
@@ -0,0 +1,245 @@
+# services/horse_search_service.py - Búsqueda y autocompletado de caballos
+#
+# La búsqueda libre usa los índices de trigramas de pg_trgm (migración 0008).
+# El autocompletado por prefijo se resuelve en memoria con un trie de nombres:
+# se carga una vez por proceso y se mantiene con los avisos de altas, bajas y
+# cambios de nombre que emite el trigger de la migración 0009.
+
+import os
+import time
+import logging
+import threading
+import unicodedata
+from database.models import get_db_connection
+from services.export_service import iter_rows
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = {
+    'name': 'horse_name',
+    'trainer': 'trainer',
+    'owner': 'owner',
+}
+SEARCH_MIN_LENGTH = 2
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Sin listener de cambios el trie se vuelve a cargar completo pasado este tiempo
+AUTOCOMPLETE_RELOAD_SECONDS = int(os.getenv("AUTOCOMPLETE_RELOAD_SECONDS", "600"))
+
+# Clave reservada de cada nodo del trie para los caballos cuyo nombre termina ahí
+_TERMINAL = '\0'
+
+
+def normalize_name(name):
+    """Minúsculas, sin acentos y con espacios simples: 'Café  Olé' → 'cafe ole'"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(without_accents.casefold().split())
+
+
+class PrefixTrie:
+    """
+    Trie de nombres normalizados. Cada nodo es un dict carácter → nodo; la clave
+    _TERMINAL guarda {horse_id: nombre original} de los caballos con ese nombre.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def insert(self, name, horse_id):
+        key = normalize_name(name)
+        if not key:
+            return
+        with self._lock:
+            node = self.root
+            for char in key:
+                node = node.setdefault(char, {})
+            terminal = node.setdefault(_TERMINAL, {})
+            if horse_id not in terminal:
+                self.size += 1
+            terminal[horse_id] = name
+
+    def remove(self, name, horse_id):
+        key = normalize_name(name)
+        with self._lock:
+            path = [self.root]
+            for char in key:
+                node = path[-1].get(char)
+                if node is None:
+                    return
+                path.append(node)
+            terminal = path[-1].get(_TERMINAL)
+            if not terminal or terminal.pop(horse_id, None) is None:
+                return
+            self.size -= 1
+            if not terminal:
+                del path[-1][_TERMINAL]
+            # Podar los nodos que quedaron vacíos
+            for depth in range(len(key), 0, -1):
+                if path[depth]:
+                    break
+                del path[depth - 1][key[depth - 1]]
+
+    def complete(self, prefix, limit):
+        """Hasta `limit` caballos cuyo nombre empieza con prefix, en orden alfabético"""
+        key = normalize_name(prefix)
+        with self._lock:
+            node = self.root
+            for char in key:
+                node = node.get(char)
+                if node is None:
+                    return []
+
+            results = []
+            # Recorrido en profundidad en orden alfabético; el nombre exacto va primero
+            stack = [node]
+            while stack and len(results) < limit:
+                current = stack.pop()
+                terminal = current.get(_TERMINAL)
+                if terminal:
+                    for horse_id, name in sorted(terminal.items(), key=lambda item: item[1]):
+                        results.append({'horse_id': horse_id, 'horse_name': name})
+                stack.extend(current[char] for char in sorted((c for c in current if c != _TERMINAL), reverse=True))
+            return results[:limit]
+
+
+_trie = None
+_trie_loaded_at = 0.0
+_trie_lock = threading.Lock()
+
+# Cambios de nombre recibidos mientras se carga un trie nuevo (None = no hay carga).
+# La carga lee la tabla en streaming: un cambio confirmado a mitad de camino
+# puede no estar en lo leído, así que se vuelve a aplicar al trie nuevo.
+_pending_changes = None
+_pending_lock = threading.Lock()
+
+
+def _load_trie():
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Error de conexión a la base de datos')
+    trie = PrefixTrie()
+    start = time.time()
+    for horse_id, horse_name in iter_rows(conn, "SELECT horse_id, horse_name FROM horses", []):
+        trie.insert(horse_name, horse_id)
+    logger.info(f"🔤 Índice de autocompletado cargado: {trie.size} caballos en {time.time() - start:.1f}s")
+    return trie
+
+
+def _trie_expired():
+    from services.change_listener import listener_is_running
+    return not listener_is_running() and time.time() - _trie_loaded_at > AUTOCOMPLETE_RELOAD_SECONDS
+
+
+def _reload_trie():
+    """Carga un trie nuevo y lo instala con los cambios recibidos durante la carga (con _trie_lock tomado)"""
+    global _trie, _trie_loaded_at, _pending_changes
+    with _pending_lock:
+        _pending_changes = []
+    try:
+        trie = _load_trie()
+    except Exception:
+        with _pending_lock:
+            _pending_changes = None
+        raise
+    with _pending_lock:
+        # Aplicar un cambio dos veces no altera el resultado (remove/insert por horse_id)
+        for horse_id, old_name, new_name in _pending_changes:
+            _apply_to_trie(trie, horse_id, old_name, new_name)
+        if _pending_changes:
+            logger.info(f"🔤 {len(_pending_changes)} cambios de nombre recibidos durante la carga aplicados")
+        _pending_changes = None
+        _trie = trie
+        _trie_loaded_at = time.time()
+
+
+def get_name_trie():
+    """Trie del proceso; se carga en el primer uso"""
+    if _trie is None or _trie_expired():
+        with _trie_lock:
+            # Se vuelve a evaluar con el lock: otro hilo pudo recargarlo mientras se esperaba
+            if _trie is None or _trie_expired():
+                _reload_trie()
+    return _trie
+
+
+def reset_name_trie():
+    """Descarta el trie; el próximo uso lo vuelve a cargar desde la BD"""
+    global _trie, _trie_loaded_at
+    with _trie_lock:
+        _trie = None
+        _trie_loaded_at = 0.0
+
+
+def _apply_to_trie(trie, horse_id, old_name, new_name):
+    if old_name:
+        trie.remove(old_name, horse_id)
+    if new_name:
+        trie.insert(new_name, horse_id)
+
+
+def apply_name_change(horse_id, old_name, new_name):
+    """Aplica un alta/baja/cambio de nombre al trie cargado y al que se esté cargando"""
+    with _pending_lock:
+        if _pending_changes is not None:
+            _pending_changes.append((horse_id, old_name, new_name))
+        trie = _trie
+        if trie is not None:
+            _apply_to_trie(trie, horse_id, old_name, new_name)
+
+
+def autocomplete_horses(prefix, limit=AUTOCOMPLETE_DEFAULT_LIMIT):
+    return get_name_trie().complete(prefix, limit)
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_horses(query, columns=None, limit=SEARCH_DEFAULT_LIMIT):
+    """
+    Búsqueda por subcadena o similitud de trigramas en nombre, entrenador y/o
+    propietario. Primero los nombres que empiezan con el texto, luego por similitud.
+    """
+    columns = [SEARCH_COLUMNS[c] for c in (columns or SEARCH_COLUMNS)]
+    conditions = ' OR '.join(
+        f"{column} ILIKE %(contains)s OR {column} %% %(query)s" for column in columns
+    )
+    score = ', '.join(f"similarity(COALESCE({column}, ''), %(query)s)" for column in columns)
+    matched_on = ' '.join(
+        f"WHEN {column} ILIKE %(contains)s OR {column} %% %(query)s THEN '{column}'" for column in columns
+    )
+
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Error de conexión a la base de datos')
+    try:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT horse_id, horse_name, horse_name_ipa, trainer, owner, country_of_birth, status,
+                   GREATEST({score}) AS score,
+                   CASE {matched_on} END AS matched_on
+            FROM horses
+            WHERE {conditions}
+            ORDER BY (horse_name ILIKE %(prefix)s) DESC, score DESC, horse_name, horse_id
+            LIMIT %(limit)s
+        """, {
+            'query': query,
+            'contains': f"%{_escape_like(query)}%",
+            'prefix': f"{_escape_like(query)}%",
+            'limit': limit,
+        })
+        fields = [description[0] for description in cur.description]
+        horses = [dict(zip(fields, row)) for row in cur.fetchall()]
+        cur.close()
+    finally:
+        conn.close()
+
+    for horse in horses:
+        horse['score'] = round(float(horse['score']), 4)
+    return horses
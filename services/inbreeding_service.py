@@ -0,0 +1,269 @@
+# services/inbreeding_service.py - Consanguinidad, ancestros duplicados y nicks
+#
+# Los pedigrees de todos los caballos pedidos se cargan en una matriz NumPy
+# (caballos × 63 posiciones, 5 generaciones en layout de heap: la posición p
+# tiene al padre en 2p+1 y a la madre en 2p+2). Sobre esa matriz se calcula el
+# coeficiente de Wright para todos los caballos a la vez, sin recursión por caballo.
+
+import os
+import logging
+import numpy as np
+from database.models import get_db_connection
+from services.pedigree_service import register_pedigree_cache
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+INBREEDING_GENERATIONS = 5
+PEDIGREE_POSITIONS = 2 ** (INBREEDING_GENERATIONS + 1) - 1
+
+# Generación de cada posición del heap (0 = el caballo, 1 = padre/madre, ...)
+POSITION_GENERATION = np.floor(np.log2(np.arange(PEDIGREE_POSITIONS) + 1)).astype(np.int64)
+
+
+def _subtree_positions(root):
+    """Posiciones del heap bajo root (incluida), en orden creciente"""
+    positions = []
+    level = [root]
+    while level and level[0] < PEDIGREE_POSITIONS:
+        positions.extend(level)
+        level = [child for p in level for child in (2 * p + 1, 2 * p + 2)]
+    return np.array(positions, dtype=np.int64)
+
+
+# Lado paterno (subárbol del padre, posición 1) y materno (subárbol de la madre, posición 2)
+SIRE_SIDE = _subtree_positions(1)
+DAM_SIDE = _subtree_positions(2)
+
+
+def _local_parent_index(side):
+    """Para cada posición del lado, índice local de la posición hija más cercana al caballo"""
+    local_index = {int(p): i for i, p in enumerate(side)}
+    # La raíz del lado (padre o madre) apunta a un índice de relleno siempre False
+    return np.array([local_index.get((int(p) - 1) // 2, len(side)) for p in side], dtype=np.int64)
+
+
+SIRE_SIDE_PARENT = _local_parent_index(SIRE_SIDE)
+DAM_SIDE_PARENT = _local_parent_index(DAM_SIDE)
+
+# Peso de cada par de caminos: (1/2)^(n1 + n2 + 1), con n = generación - 1 a cada lado
+PATH_WEIGHTS = 0.5 ** (
+    POSITION_GENERATION[SIRE_SIDE][:, None] + POSITION_GENERATION[DAM_SIDE][None, :] - 1
+)
+
+# horse_id → resultado sin nicks (los conteos de nicks se consultan en cada pedido)
+_inbreeding_cache = LRUCache(maxsize=int(os.getenv("INBREEDING_CACHE_SIZE", "4096")))
+register_pedigree_cache(_inbreeding_cache)
+
+ANCESTOR_EDGES_QUERY = f"""
+    WITH RECURSIVE walk (horse_id, depth) AS (
+        SELECT unnest(%s::varchar[]), 0
+        UNION
+        SELECT e.parent_id, w.depth + 1
+        FROM walk w
+        JOIN pedigree_edges e ON e.child_id = w.horse_id
+        WHERE w.depth < {INBREEDING_GENERATIONS}
+    )
+    SELECT DISTINCT e.child_id, e.role, e.parent_id
+    FROM walk w
+    JOIN pedigree_edges e ON e.child_id = w.horse_id
+    WHERE w.depth < {INBREEDING_GENERATIONS}
+"""
+
+
+def build_ancestor_matrix(horse_ids, edges):
+    """
+    Matriz (caballos × 63) de ids enteros de ancestros en layout de heap.
+    0 = ancestro desconocido. Devuelve (matriz, lista de ids por entero).
+    """
+    vocabulary = {None: 0}
+    id_list = [None]
+
+    def encode(horse_id):
+        if horse_id not in vocabulary:
+            vocabulary[horse_id] = len(id_list)
+            id_list.append(horse_id)
+        return vocabulary[horse_id]
+
+    for horse_id in horse_ids:
+        encode(horse_id)
+    encoded_edges = [(encode(child), role, encode(parent)) for child, role, parent in edges]
+
+    sire_of = np.zeros(len(id_list), dtype=np.int64)
+    dam_of = np.zeros(len(id_list), dtype=np.int64)
+    for child, role, parent in encoded_edges:
+        (sire_of if role == 'sire' else dam_of)[child] = parent
+
+    matrix = np.zeros((len(horse_ids), PEDIGREE_POSITIONS), dtype=np.int64)
+    matrix[:, 0] = [vocabulary[horse_id] for horse_id in horse_ids]
+    # Nivel por nivel: cada posición se llena desde su hijo (sire_of/dam_of de 0 es 0)
+    for position in range(PEDIGREE_POSITIONS // 2):
+        matrix[:, 2 * position + 1] = sire_of[matrix[:, position]]
+        matrix[:, 2 * position + 2] = dam_of[matrix[:, position]]
+    return matrix, id_list
+
+
+def _propagate_to_ancestors(flags, parent_index, axis):
+    """
+    OR acumulado hacia los ancestros a lo largo de un eje: flags[..., i, ...] queda
+    en True si i o alguna posición entre i y el caballo tenía True.
+    Las posiciones están en orden creciente, así que el hijo siempre se procesa antes.
+    """
+    for i, parent in enumerate(parent_index):
+        if parent == len(parent_index):
+            continue
+        if axis == 1:
+            flags[:, i, :] |= flags[:, parent, :]
+        else:
+            flags[:, :, i] |= flags[:, :, parent]
+    return flags
+
+
+def wright_coefficients(matrix):
+    """
+    Coeficiente de consanguinidad de Wright para cada fila de la matriz:
+    F = Σ (1/2)^(n1+n2+1) sobre los pares de caminos padre→A y madre→A que no
+    comparten otro individuo además de A. Se asume F_A = 0 para los ancestros
+    comunes (no hay generaciones suficientes para estimarlo).
+    """
+    sire_side = matrix[:, SIRE_SIDE]
+    dam_side = matrix[:, DAM_SIDE]
+
+    # M[h, i, j]: la posición paterna i y la materna j son el mismo ancestro
+    matches = (sire_side[:, :, None] == dam_side[:, None, :]) & (sire_side[:, :, None] != 0)
+
+    # Q[h, i, j]: algún par (i', j') con i' entre i y el padre y j' entre j y la madre coincide
+    closure = matches.copy()
+    _propagate_to_ancestors(closure, SIRE_SIDE_PARENT, axis=1)
+    _propagate_to_ancestors(closure, DAM_SIDE_PARENT, axis=2)
+
+    # Un par de caminos hacia A se excluye si sus tramos más cercanos al caballo
+    # (sin contar A) ya pasan por un ancestro común
+    padded = np.zeros((closure.shape[0], closure.shape[1] + 1, closure.shape[2] + 1), dtype=bool)
+    padded[:, :-1, :-1] = closure
+    excluded = padded[:, SIRE_SIDE_PARENT][:, :, DAM_SIDE_PARENT]
+
+    return ((matches & ~excluded) * PATH_WEIGHTS).sum(axis=(1, 2))
+
+
+def duplicate_ancestors(row, id_list, names):
+    """Ancestros que aparecen más de una vez en el pedigree, con notación NxM"""
+    sire_ids = row[SIRE_SIDE]
+    dam_ids = row[DAM_SIDE]
+    ancestors = row[1:]
+    values, counts = np.unique(ancestors[ancestors != 0], return_counts=True)
+
+    duplicates = []
+    for value, count in zip(values, counts):
+        if count < 2:
+            continue
+        sire_generations = sorted(POSITION_GENERATION[SIRE_SIDE][sire_ids == value].tolist())
+        dam_generations = sorted(POSITION_GENERATION[DAM_SIDE][dam_ids == value].tolist())
+        ancestor_id = id_list[value]
+        duplicates.append({
+            'horse_id': ancestor_id,
+            'horse_name': names.get(ancestor_id),
+            'occurrences': int(count),
+            'sire_side_generations': sire_generations,
+            'dam_side_generations': dam_generations,
+            # Notación clásica: "4x3" (generaciones del lado paterno x materno)
+            'cross': 'x'.join(str(g) for g in sire_generations + dam_generations),
+        })
+    duplicates.sort(key=lambda d: (-d['occurrences'], min(d['sire_side_generations'] + d['dam_side_generations'])))
+    return duplicates
+
+
+def compute_inbreeding(cursor, horse_ids):
+    """Calcula consanguinidad y ancestros duplicados para una lista de caballos"""
+    if not horse_ids:
+        return {}
+
+    cursor.execute(ANCESTOR_EDGES_QUERY, (list(horse_ids),))
+    edges = cursor.fetchall()
+    matrix, id_list = build_ancestor_matrix(list(horse_ids), edges)
+
+    cursor.execute(
+        "SELECT horse_id, horse_name FROM horses WHERE horse_id = ANY(%s)",
+        ([horse_id for horse_id in id_list if horse_id is not None],)
+    )
+    names = dict(cursor.fetchall())
+
+    coefficients = wright_coefficients(matrix)
+    results = {}
+    for index, horse_id in enumerate(horse_ids):
+        row = matrix[index]
+        results[horse_id] = {
+            'horse_id': horse_id,
+            'horse_name': names.get(horse_id),
+            'generations': INBREEDING_GENERATIONS,
+            'known_ancestors': int(np.count_nonzero(row[1:])),
+            'inbreeding_coefficient': round(float(coefficients[index]), 6),
+            'duplicate_ancestors': duplicate_ancestors(row, id_list, names),
+            'sire_id': id_list[row[1]],
+            'damsire_id': id_list[row[5]],
+        }
+    return results
+
+
+def nick_counts(cursor, pairs):
+    """Cantidad de caballos en BD con cada cruce padre × abuelo materno"""
+    pairs = [pair for pair in set(pairs) if pair[0] and pair[1]]
+    if not pairs:
+        return {}
+    cursor.execute("""
+        SELECT p.sire_id, p.maternal_grandsire_id, COUNT(*)
+        FROM pedigree p
+        JOIN (SELECT unnest(%s::varchar[]) AS sire_id, unnest(%s::varchar[]) AS damsire_id) AS n
+          ON n.sire_id = p.sire_id AND n.damsire_id = p.maternal_grandsire_id
+        GROUP BY p.sire_id, p.maternal_grandsire_id
+    """, ([sire for sire, _ in pairs], [damsire for _, damsire in pairs]))
+    return {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+
+
+def get_inbreeding_report(horse_ids):
+    """
+    Informe de consanguinidad para una lista de caballos (por ejemplo, una jornada).
+    Los resultados por caballo se sirven desde caché hasta que cambie su pedigree.
+    """
+    horse_ids = list(dict.fromkeys(horse_id for horse_id in horse_ids if horse_id))
+
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Error de conexión a la base de datos')
+    try:
+        cur = conn.cursor()
+
+        results = {}
+        missing = []
+        for horse_id in horse_ids:
+            cached = _inbreeding_cache.get(horse_id)
+            if cached is None:
+                missing.append(horse_id)
+            else:
+                results[horse_id] = cached
+
+        if missing:
+            computed = compute_inbreeding(cur, missing)
+            for horse_id, result in computed.items():
+                _inbreeding_cache.set(horse_id, result)
+            results.update(computed)
+
+        nicks = nick_counts(cur, [(r['sire_id'], r['damsire_id']) for r in results.values()])
+        cur.close()
+    finally:
+        conn.close()
+
+    report = []
+    for horse_id in horse_ids:
+        result = dict(results[horse_id])
+        result['nick'] = {
+            'sire_id': result.pop('sire_id'),
+            'damsire_id': result.pop('damsire_id'),
+        }
+        result['nick']['foals_in_db'] = nicks.get((result['nick']['sire_id'], result['nick']['damsire_id']), 0)
+        report.append(result)
+    return report
+
+
+def inbreeding_cache_stats():
+    return _inbreeding_cache.stats()
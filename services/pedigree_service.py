@@ -0,0 +1,153 @@
+# services/pedigree_service.py - Árbol de pedigree con caché en memoria
+#
+# El árbol se arma a partir de pedigree_edges con una sola consulta recursiva
+# y se guarda en una caché LRU por caballo. Cuando cambia el pedigree o el
+# perfil de un caballo se invalidan su árbol y los de todos sus descendientes,
+# junto con las demás cachés registradas con register_pedigree_cache().
+
+import os
+import logging
+from database.models import get_db_connection
+from database.after_commit import after_commit
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PEDIGREE_DEPTH = 4
+MAX_PEDIGREE_DEPTH = 8
+
+# horse_id → {depth: árbol}
+_pedigree_tree_cache = LRUCache(maxsize=int(os.getenv("PEDIGREE_CACHE_SIZE", "2048")))
+
+# Otras cachés por horse_id que dependen del pedigree (p. ej. consanguinidad)
+_dependent_caches = [_pedigree_tree_cache]
+
+
+def register_pedigree_cache(cache):
+    """Registra una caché por horse_id para invalidarla junto con los árboles"""
+    _dependent_caches.append(cache)
+
+
+PEDIGREE_TREE_QUERY = """
+    WITH RECURSIVE walk (horse_id, depth) AS (
+        SELECT %(horse_id)s::varchar, 0
+        UNION
+        SELECT e.parent_id, w.depth + 1
+        FROM walk w
+        JOIN pedigree_edges e ON e.child_id = w.horse_id
+        WHERE w.depth < %(depth)s
+    ),
+    nodes AS (
+        SELECT horse_id, MIN(depth) AS depth FROM walk GROUP BY horse_id
+    )
+    SELECT n.horse_id, h.horse_name, h.horse_name_ipa, h.country_of_birth,
+           e.role, e.parent_id
+    FROM nodes n
+    LEFT JOIN horses h ON h.horse_id = n.horse_id
+    LEFT JOIN pedigree_edges e ON e.child_id = n.horse_id AND n.depth < %(depth)s
+"""
+
+
+def _build_tree(horse_id, depth, horses, parents):
+    """Arma el nodo de un caballo con sus progenitores hasta la profundidad pedida"""
+    name, name_ipa, country = horses.get(horse_id, (None, None, None))
+    node = {
+        'horse_id': horse_id,
+        'horse_name': name,
+        'horse_name_ipa': name_ipa,
+        'country_of_birth': country,
+        'sire': None,
+        'dam': None,
+    }
+    if depth > 0:
+        for role, parent_id in parents.get(horse_id, {}).items():
+            node[role] = _build_tree(parent_id, depth - 1, horses, parents)
+    return node
+
+
+def load_pedigree_tree(cursor, horse_id, depth):
+    """Consulta la BD y arma el árbol. Devuelve None si el caballo no existe."""
+    cursor.execute(PEDIGREE_TREE_QUERY, {'horse_id': horse_id, 'depth': depth})
+
+    horses = {}
+    parents = {}
+    for node_id, name, name_ipa, country, role, parent_id in cursor.fetchall():
+        if name is not None:
+            horses[node_id] = (name, name_ipa, country)
+        if role:
+            parents.setdefault(node_id, {})[role] = parent_id
+
+    if horse_id not in horses and horse_id not in parents:
+        return None
+    return _build_tree(horse_id, depth, horses, parents)
+
+
+def get_pedigree_tree(horse_id, depth=DEFAULT_PEDIGREE_DEPTH):
+    """Árbol de pedigree de un caballo, servido desde memoria si ya se armó antes"""
+    trees = _pedigree_tree_cache.get(horse_id)
+    if trees and depth in trees:
+        return trees[depth]
+
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Error de conexión a la base de datos')
+    try:
+        cur = conn.cursor()
+        tree = load_pedigree_tree(cur, horse_id, depth)
+        cur.close()
+    finally:
+        conn.close()
+
+    if tree is not None:
+        trees = dict(_pedigree_tree_cache.get(horse_id) or {})
+        trees[depth] = tree
+        _pedigree_tree_cache.set(horse_id, trees)
+    return tree
+
+
+def pedigree_dependents(cursor, horse_ids):
+    """Los caballos indicados y todos sus descendientes (un cambio en un ancestro aparece en sus árboles)"""
+    cursor.execute("""
+        SELECT DISTINCT descendant_id FROM pedigree_closure WHERE ancestor_id = ANY(%s)
+    """, (list(horse_ids),))
+    return set(horse_ids) | {row[0] for row in cursor.fetchall()}
+
+
+def drop_pedigree_trees(horse_ids):
+    """Quita de las cachés las entradas de estos caballos (sin incluir descendientes)"""
+    removed = sum(cache.pop_many(horse_ids) for cache in _dependent_caches)
+    if removed:
+        logger.info(f"🧹 {removed} entradas de pedigree invalidadas en caché")
+    return removed
+
+
+def invalidate_pedigree_trees(cursor, horse_ids):
+    """
+    Invalida ya los árboles de los caballos indicados y de sus descendientes.
+    Para cambios ya confirmados (p. ej. avisos de otros procesos).
+    """
+    if not horse_ids or not any(len(cache) for cache in _dependent_caches):
+        return 0
+    return drop_pedigree_trees(pedigree_dependents(cursor, horse_ids))
+
+
+def invalidate_pedigree_trees_after_commit(cursor, horse_ids):
+    """
+    Igual que invalidate_pedigree_trees para cambios hechos en la transacción
+    del cursor: la descendencia se busca ahora (con las aristas nuevas) y las
+    cachés se vacían después del commit, para que un pedido intermedio no
+    vuelva a guardar el árbol anterior.
+    """
+    if not horse_ids:
+        return
+    after_commit(cursor, drop_pedigree_trees, pedigree_dependents(cursor, horse_ids))
+
+
+def clear_pedigree_caches():
+    """Vacía todas las cachés de pedigree (p. ej. si se pudieron perder avisos de cambios)"""
+    for cache in _dependent_caches:
+        cache.clear()
+
+
+def pedigree_cache_stats():
+    return _pedigree_tree_cache.stats()
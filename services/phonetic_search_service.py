@@ -0,0 +1,226 @@
+# services/phonetic_search_service.py - Búsqueda de nombres "que suenan como"
+#
+# Índice invertido en memoria sobre las transcripciones IPA guardadas: cada
+# nombre se reduce a fonemas canónicos (utils/ipa_phonemes.py) y se indexa por
+# sus bigramas de fonemas. Una búsqueda junta candidatos por bigramas en común
+# (sin recorrer todos los nombres) y solo a los mejores les calcula la
+# distancia fonética completa.
+#
+# Hay un índice por tipo de nombre, cargado en el primer uso. El de caballos se
+# actualiza con los avisos de cambios (HORSE_CHANGED / HORSE_NAME_CHANGED); los
+# de personas y pistas se recargan cada PHONETIC_RELOAD_SECONDS.
+
+import os
+import time
+import heapq
+import logging
+import threading
+from collections import Counter
+from operator import itemgetter
+from database.models import get_db_connection
+from services.export_service import iter_rows
+from utils.ipa_generator import generate_english_ipa
+from utils.ipa_phonemes import ipa_to_phonemes, phoneme_grams, phonetic_similarity
+
+logger = logging.getLogger(__name__)
+
+# Consultas de carga por tipo: (clave, nombre, ipa). Personas y pistas se leen de
+# su tabla y de las columnas desnormalizadas; la primera transcripción gana.
+PHONETIC_SOURCES = {
+    'horse': """
+        SELECT horse_id, horse_name, horse_name_ipa FROM horses
+        WHERE horse_name_ipa IS NOT NULL AND horse_name_ipa <> ''
+    """,
+    'trainer': """
+        SELECT trainer_name, trainer_name, trainer_name_ipa FROM trainers WHERE trainer_name_ipa IS NOT NULL
+        UNION ALL
+        SELECT DISTINCT trainer, trainer, trainer_ipa FROM horses WHERE trainer_ipa IS NOT NULL
+    """,
+    'jockey': """
+        SELECT jockey_name, jockey_name, jockey_name_ipa FROM jockeys WHERE jockey_name_ipa IS NOT NULL
+    """,
+    'owner': """
+        SELECT owner_name, owner_name, owner_name_ipa FROM owners WHERE owner_name_ipa IS NOT NULL
+        UNION ALL
+        SELECT DISTINCT owner, owner, owner_ipa FROM horses WHERE owner_ipa IS NOT NULL
+    """,
+    'breeder': """
+        SELECT breeder_name, breeder_name, breeder_name_ipa FROM breeders WHERE breeder_name_ipa IS NOT NULL
+        UNION ALL
+        SELECT DISTINCT breeder, breeder, breeder_ipa FROM horses WHERE breeder_ipa IS NOT NULL
+    """,
+    'track': """
+        SELECT track_code, track_name, track_name_ipa FROM tracks WHERE track_name_ipa IS NOT NULL
+        UNION ALL
+        SELECT DISTINCT track_code, track_name, track_ipa FROM races
+        WHERE track_ipa IS NOT NULL AND track_code IS NOT NULL
+    """,
+}
+
+PHONETIC_DEFAULT_LIMIT = 10
+PHONETIC_MAX_LIMIT = 50
+# Candidatos (por bigramas en común) a los que se calcula la distancia completa
+PHONETIC_CANDIDATES = int(os.getenv("PHONETIC_CANDIDATES", "200"))
+# Máximo de claves a contar por búsqueda: se recorren primero los bigramas menos
+# frecuentes y los muy comunes (que aparecen en miles de nombres) se omiten
+PHONETIC_POSTINGS_BUDGET = int(os.getenv("PHONETIC_POSTINGS_BUDGET", "20000"))
+# Bigramas que siempre se cuentan aunque superen el presupuesto
+PHONETIC_MIN_GRAMS = 2
+PHONETIC_RELOAD_SECONDS = int(os.getenv("PHONETIC_RELOAD_SECONDS", "600"))
+
+
+class PhoneticIndex:
+    """Nombres indexados por bigramas de fonemas: {bigrama: {clave, ...}}"""
+
+    def __init__(self):
+        self.entries = {}
+        self.postings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key, name, ipa):
+        phonemes = ipa_to_phonemes(ipa)
+        if not phonemes:
+            return
+        grams = phoneme_grams(phonemes)
+        with self._lock:
+            self._discard(key)
+            self.entries[key] = (name, ipa, phonemes, grams)
+            for gram in grams:
+                self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in entry[3]:
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    def search(self, phonemes, limit, candidates=PHONETIC_CANDIDATES):
+        """Los `limit` nombres más parecidos en sonido a la secuencia de fonemas"""
+        grams = phoneme_grams(phonemes)
+        with self._lock:
+            postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+            shared = Counter()
+            counted = 0
+            for position, keys in enumerate(postings):
+                if position >= PHONETIC_MIN_GRAMS and counted + len(keys) > PHONETIC_POSTINGS_BUDGET:
+                    break
+                shared.update(keys)
+                counted += len(keys)
+            # Preselección por bigramas en común y luego coeficiente de Dice
+            # (que no favorece a los nombres largos) para elegir a quién comparar a fondo
+            pool = heapq.nlargest(candidates * 4, shared.items(), key=itemgetter(1))
+            best = heapq.nlargest(
+                candidates, pool,
+                key=lambda item: 2 * item[1] / (len(grams) + len(self.entries[item[0]][3]))
+            )
+            scored = []
+            for key, _ in best:
+                name, ipa, entry_phonemes, _ = self.entries[key]
+                # Cota superior por diferencia de largo: si no alcanza al peor de los
+                # `limit` mejores no hace falta la distancia completa
+                longest = max(len(phonemes), len(entry_phonemes))
+                bound = 1.0 - abs(len(phonemes) - len(entry_phonemes)) / longest
+                if len(scored) >= limit and bound <= scored[-1][0]:
+                    continue
+                scored.append((phonetic_similarity(phonemes, entry_phonemes), name, key, ipa))
+                if len(scored) >= limit:
+                    scored.sort(key=lambda item: (-item[0], item[1]))
+                    del scored[limit:]
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            {'id': key, 'name': name, 'ipa': ipa, 'score': round(score, 4)}
+            for score, name, key, ipa in scored[:limit]
+        ]
+
+
+_indexes = {}
+_loaded_at = {}
+_indexes_lock = threading.Lock()
+
+
+def _load_index(kind):
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError('Error de conexión a la base de datos')
+    index = PhoneticIndex()
+    start = time.time()
+    for key, name, ipa in iter_rows(conn, PHONETIC_SOURCES[kind], []):
+        if key not in index.entries:
+            index.add(key, name, ipa)
+    logger.info(f"🗣️ Índice fonético '{kind}' cargado: {len(index)} nombres en {time.time() - start:.1f}s")
+    return index
+
+
+def _needs_load(kind):
+    from services.change_listener import listener_is_running
+    if kind not in _indexes:
+        return True
+    if kind == 'horse' and listener_is_running():
+        return False
+    return time.time() - _loaded_at[kind] > PHONETIC_RELOAD_SECONDS
+
+
+def get_phonetic_index(kind):
+    """Índice del tipo pedido; el de caballos solo se recarga si no llegan avisos de cambios"""
+    if _needs_load(kind):
+        with _indexes_lock:
+            if _needs_load(kind):
+                _indexes[kind] = _load_index(kind)
+                _loaded_at[kind] = time.time()
+    return _indexes[kind]
+
+
+def drop_phonetic_index(kind):
+    """Descarta el índice del tipo pedido; el próximo uso lo vuelve a cargar"""
+    with _indexes_lock:
+        _indexes.pop(kind, None)
+        _loaded_at.pop(kind, None)
+
+
+def refresh_horses(cursor, horse_ids):
+    """
+    Vuelve a leer nombre e IPA de estos caballos si el índice de caballos ya está
+    cargado (los que ya no existen o no tienen IPA salen del índice)
+    """
+    index = _indexes.get('horse')
+    if index is None or not horse_ids:
+        return
+    cursor.execute(
+        "SELECT horse_id, horse_name, horse_name_ipa FROM horses WHERE horse_id = ANY(%s)",
+        (list(horse_ids),)
+    )
+    found = set()
+    for horse_id, horse_name, horse_name_ipa in cursor.fetchall():
+        found.add(horse_id)
+        if horse_name_ipa:
+            index.add(horse_id, horse_name, horse_name_ipa)
+        else:
+            index.remove(horse_id)
+    for horse_id in set(horse_ids) - found:
+        index.remove(horse_id)
+
+
+def sounds_like(kind, text=None, ipa=None, limit=PHONETIC_DEFAULT_LIMIT):
+    """
+    Nombres de `kind` que suenan como `text` (se transcribe con el mismo
+    generador que los datos guardados) o como la transcripción `ipa`.
+    Devuelve (ipa usada, resultados).
+    """
+    query_ipa = ipa or generate_english_ipa(text)
+    phonemes = ipa_to_phonemes(query_ipa)
+    if not phonemes:
+        return query_ipa, []
+    return query_ipa, get_phonetic_index(kind).search(phonemes, limit)
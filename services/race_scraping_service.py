@@ -4,6 +4,8 @@ from playwright.sync_api import sync_playwright, Error as PlaywrightError
 from datetime import datetime
 import psycopg2
 
+logger = logging.getLogger(__name__)
+
 # 🚨 VERSIÓN NUEVA CON DETECCIÓN DE SCRATCHED - FORZAR RECARGA 🚨
 logger.info("=" * 80)
 logger.info("🐎 RACE_SCRAPING_SERVICE VERSION 2.0 - SCRATCH DETECTION ACTIVE")
@@ -12,10 +14,13 @@ logger.info("=" * 80)
 
 from utils.race_parser import parse_race_url_data, parse_race_title_data, generate_race_id
 from utils.text_processing import clean_text, clean_race_type, extract_age_from_conditions, extract_purse_value
-from database.models import create_database_tables, save_race_data_to_db
+from database.models import save_race_data_to_db
+from database.after_commit import AfterCommitConnection
+from database.migrate import ensure_schema_ready
 from services.scraping_service import scrape_horse_profile, update_horse_data
-
-logger = logging.getLogger(__name__)
+from services.stats_service import schedule_stats_refresh
+from services.single_flight import single_flight, SCRAPE_CARD_LOCK
+from database.scrape_log import normalize_scrape_url, load_recent_scrape, record_scrape
 
 def initialize_playwright_and_load_page(url_to_scrape):
     """Inicializa Playwright y carga la página"""
@@ -53,6 +58,163 @@ def initialize_playwright_and_load_page(url_to_scrape):
         if pw_instance: pw_instance.stop()
         raise # Re-lanza la excepción original para que sea manejada por scrape_route
 
+def find_race_containers(page):
+    """Contenedores de cada carrera de la tarjeta, probando varios selectores"""
+    # Buscar contenedores de carreras - probar diferentes selectores
+    race_containers = page.query_selector_all('div.race-container')
+
+    # Si no encuentra race-container, probar con otros selectores
+    if not race_containers:
+        logger.info("No se encontraron div.race-container, probando selectores alternativos...")
+
+        # Probar con div.my-5 que aparece en los logs
+        race_containers = page.query_selector_all('div.my-5')
+        logger.info(f"Encontrados {len(race_containers)} elementos con div.my-5")
+
+        # Si tampoco encuentra, probar con selectores más generales
+        if not race_containers:
+            # Buscar cualquier div que contenga "Race #" en el texto
+            all_divs = page.query_selector_all('div')
+            race_containers = []
+            for div in all_divs:
+                text_content = div.inner_text() if div.inner_text() else ""
+                if "Race #" in text_content or "Race " in text_content:
+                    race_containers.append(div)
+            logger.info(f"Encontrados {len(race_containers)} elementos que contienen 'Race #'")
+    return race_containers
+
+def find_race_title(race_container):
+    """Título de la carrera ("Gulfstream Park Race # 1, 6:50 PM") y href del encabezado, o (None, None)"""
+    header_link = race_container.query_selector('h2.row a.race-header')
+    if header_link:
+        race_title_full = header_link.inner_text().strip() if header_link.inner_text() else 'Título no disponible'
+        return race_title_full, header_link.get_attribute('href')
+    
+    # Si no encuentra el selector original, buscar cualquier h2 que contenga "Race #"
+    for h2 in race_container.query_selector_all('h2'):
+        text_content = h2.inner_text() if h2.inner_text() else ""
+        if "Race #" in text_content:
+            return text_content.strip(), None
+    
+    # Si no encuentra h2, buscar en el texto del contenedor
+    container_text = race_container.inner_text() if race_container.inner_text() else ""
+    for line in container_text.split('\n'):
+        if "Race #" in line and ("PM" in line or "AM" in line):
+            return line.strip(), None
+    return None, None
+
+def find_participant_rows(race_container, title):
+    """Filas de la tabla de participantes de la carrera (lista vacía si no hay tabla)"""
+    # Buscar la tabla de participantes con diferentes selectores
+    race_without_results = race_container.query_selector('div.race-without-results')
+    participant_rows = []
+
+    logging.info(f"  Buscando tabla de participantes en '{title}'...")
+
+    if race_without_results:
+        logging.info(f"  ✓ Encontrado div.race-without-results para '{title}'")
+
+        # Buscar tabla con clase específica
+        participants_table = race_without_results.query_selector('table.table-entries tbody')
+        if participants_table:
+            participant_rows = participants_table.query_selector_all('tr')
+            logging.info(f"  ✓ Encontradas {len(participant_rows)} filas de participantes en table.table-entries tbody.")
+        else:
+            logging.info(f"  ✗ No se encontró table.table-entries tbody, intentando con selector genérico...")
+            # Intentar con cualquier tabla dentro de race-without-results
+            participants_table = race_without_results.query_selector('table tbody')
+            if participants_table:
+                participant_rows = participants_table.query_selector_all('tr')
+                logging.info(f"  ✓ Encontradas {len(participant_rows)} filas de participantes usando table tbody genérico.")
+            else:
+                logging.warning(f"  ✗ No se encontró ninguna tabla tbody en div.race-without-results.")
+    else:
+        logging.info(f"  ✗ No se encontró div.race-without-results, buscando tabla directamente...")
+
+        # Buscar cualquier tabla en el contenedor
+        any_table = race_container.query_selector('table')
+        if any_table:
+            table_classes = any_table.get_attribute('class') or 'sin-clase'
+            logging.info(f"  Encontrada tabla con clases: '{table_classes}'")
+
+            # Buscar tbody o usar todas las filas
+            tbody = any_table.query_selector('tbody')
+            if tbody:
+                participant_rows = tbody.query_selector_all('tr')
+                logging.info(f"  ✓ Encontradas {len(participant_rows)} filas en tbody")
+            else:
+                all_rows = any_table.query_selector_all('tr')
+                # Filtrar header row (primera fila)
+                participant_rows = all_rows[1:] if len(all_rows) > 1 else []
+                logging.info(f"  ✓ Encontradas {len(participant_rows)} filas (excluyendo header)")
+        else:
+            logging.warning(f"  ✗ No se encontró ninguna tabla en el contenedor.")
+    return participant_rows
+
+def detect_participant_status(row):
+    """Status de la fila ('active' o 'scratched') y las pistas usadas para decidirlo"""
+    status = 'active'  # Default status
+    debug_info = []  # Para debugging
+
+    # ⚠️ FORZAR DEBUG: Mostrar SIEMPRE información de cada participante
+    debug_info.append(f"🐎 HORSE_DETECTION_v2.0_ACTIVE")
+
+    # 1. Verificar la clase de la fila (PRIMERA PRIORIDAD)
+    row_class = row.get_attribute('class') or ''
+    debug_info.append(f"row_class='{row_class}'")
+    if 'scratched' in row_class.lower():
+        status = 'scratched'
+        debug_info.append("✅ DETECTED via row_class")
+
+    # 2. CORREGIDO: Verificar SOLO la columna específica de scratch
+    scratch_cell = row.query_selector('td.table-entries-scratch-col')
+    if scratch_cell:
+        scratch_text = scratch_cell.inner_text().strip()
+        scratch_html = scratch_cell.inner_html().strip()
+        debug_info.append(f"scratch_text='{scratch_text}'")
+        debug_info.append(f"scratch_html='{scratch_html}'")
+
+        # SOLO verificar si contiene específicamente "(Scratched)" o "Scratched"
+        if scratch_text and ('(scratched)' in scratch_text.lower() or 'scratched' in scratch_text.lower()):
+            status = 'scratched'
+            debug_info.append(f"✅ DETECTED via scratch_text exact match")
+    else:
+        debug_info.append("scratch_cell=NOT_FOUND")
+
+    # 3. Verificar abbr title en la última columna (ML odds) - SOLO para "SCR" 
+    if status == 'active':  # Solo si no se detectó ya como scratched
+        ml_abbr = row.query_selector('td:last-child .table-entries-scratch-sm abbr')
+        if ml_abbr:
+            abbr_title = ml_abbr.get_attribute('title') or ''
+            abbr_text = ml_abbr.inner_text().strip()
+            debug_info.append(f"ml_abbr_text='{abbr_text}' title='{abbr_title}'")
+            if abbr_text.upper() == 'SCR' or '(scratched)' in abbr_title.lower():
+                status = 'scratched'
+                debug_info.append("✅ DETECTED via ml_abbr")
+
+    # 4. Verificar si falta imagen de PP (program number) - INDICADOR FUERTE
+    pp_img = row.query_selector('td:first-child img')
+    if not pp_img and status == 'active':
+        debug_info.append("⚠️ MISSING PP image - probable scratch")
+        # En el HTML que mostraste, los scratched no tienen imagen PP
+        status = 'scratched'
+        debug_info.append("✅ DETECTED via missing_pp_img")
+    return status, debug_info
+
+def extract_horse_link(horse_sire_cell):
+    """(horse_name, horse_id) del enlace al perfil en la celda del caballo; 'N/A' si falta alguno"""
+    horse_link = horse_sire_cell.query_selector('h4 a')
+    if not horse_link:
+        return 'N/A', 'N/A'
+    horse_name = horse_link.inner_text().strip()
+    horse_id = 'N/A'
+    # Extraer horse_id del href del enlace
+    horse_href = horse_link.get_attribute('href')
+    if horse_href:
+        # El href es algo como "/horse/Chabelita_1"
+        horse_id = horse_href.split('/')[-1] if '/' in horse_href else horse_href
+    return horse_name, horse_id
+
 def process_race_container(race_container, track_name_slug, race_date_obj, main_page_url):
     """Procesa un contenedor de carrera individual"""
     # Initialize race_data with all fields expected by index.html and internal logic
@@ -91,49 +253,21 @@ def process_race_container(race_container, track_name_slug, race_date_obj, main_
     }
 
     try:
-        # Buscar el encabezado de la carrera con diferentes selectores
-        header_link = race_container.query_selector('h2.row a.race-header')
-        
-        # Si no encuentra el selector original, probar alternativas
-        if not header_link:
-            # Buscar cualquier h2 que contenga "Race #"
-            h2_elements = race_container.query_selector_all('h2')
-            for h2 in h2_elements:
-                text_content = h2.inner_text() if h2.inner_text() else ""
-                if "Race #" in text_content:
-                    # Crear un elemento ficticio para mantener compatibilidad
-                    race_title_full = text_content.strip()
-                    race_data['race_name_scraped'] = race_title_full
-                    race_data['title'] = race_title_full
-                    break
-            
-            # Si no encuentra h2, buscar en el texto del contenedor
-            if not race_data.get('title'):
-                container_text = race_container.inner_text() if race_container.inner_text() else ""
-                lines = container_text.split('\n')
-                for line in lines:
-                    if "Race #" in line and ("PM" in line or "AM" in line):
-                        race_title_full = line.strip()
-                        race_data['race_name_scraped'] = race_title_full
-                        race_data['title'] = race_title_full
-                        break
-            
-            if not race_data.get('title'):
-                logging.warning("No se encontró el título de la carrera. Saltando este contenedor.")
-                return None
-        else:
-            race_title_full = header_link.inner_text().strip() if header_link.inner_text() else 'Título no disponible'
+        race_title_full, race_url_path = find_race_title(race_container)
+        if race_title_full:
             race_data['race_name_scraped'] = race_title_full
             race_data['title'] = race_title_full # Set frontend title
-
-            race_url_path = header_link.get_attribute('href')
-            if race_url_path:
-                full_race_url = f"https://www.horseracingnation.com{race_url_path}"
-                race_data['race_url'] = full_race_url
-                race_data['specific_race_url'] = full_race_url # Set frontend specific_race_url
-
+        else:
+            logging.warning("No se encontró el título de la carrera, se usa el título por defecto.")
+        if race_url_path:
+            full_race_url = f"https://www.horseracingnation.com{race_url_path}"
+            race_data['race_url'] = full_race_url
+            race_data['specific_race_url'] = full_race_url # Set frontend specific_race_url
+        
         parsed_title_info = parse_race_title_data(race_data['title'])
         race_data['race_number'] = parsed_title_info.get('number', 'N/A')
+        post_time = parsed_title_info.get('post_time')
+        race_data['time_post_scraped'] = post_time.strftime('%H:%M') if post_time else None
         
         # Generar URL específica con formato #race-X si tenemos el número de carrera
         if race_data['race_number'] != 'N/A' and main_page_url:
@@ -227,50 +361,7 @@ def process_race_container(race_container, track_name_slug, race_date_obj, main_
         logging.info(f"  Race ID generado: {race_data['race_id']}")
         
         # Extraer participantes de la tabla
-        # Buscar la tabla de participantes con diferentes selectores
-        race_without_results = race_container.query_selector('div.race-without-results')
-        participant_rows = []
-        
-        logging.info(f"  Buscando tabla de participantes en '{race_data['title']}'...")
-        
-        if race_without_results:
-            logging.info(f"  ✓ Encontrado div.race-without-results para '{race_data['title']}'")
-            
-            # Buscar tabla con clase específica
-            participants_table = race_without_results.query_selector('table.table-entries tbody')
-            if participants_table:
-                participant_rows = participants_table.query_selector_all('tr')
-                logging.info(f"  ✓ Encontradas {len(participant_rows)} filas de participantes en table.table-entries tbody.")
-            else:
-                logging.info(f"  ✗ No se encontró table.table-entries tbody, intentando con selector genérico...")
-                # Intentar con cualquier tabla dentro de race-without-results
-                participants_table = race_without_results.query_selector('table tbody')
-                if participants_table:
-                    participant_rows = participants_table.query_selector_all('tr')
-                    logging.info(f"  ✓ Encontradas {len(participant_rows)} filas de participantes usando table tbody genérico.")
-                else:
-                    logging.warning(f"  ✗ No se encontró ninguna tabla tbody en div.race-without-results.")
-        else:
-            logging.info(f"  ✗ No se encontró div.race-without-results, buscando tabla directamente...")
-            
-            # Buscar cualquier tabla en el contenedor
-            any_table = race_container.query_selector('table')
-            if any_table:
-                table_classes = any_table.get_attribute('class') or 'sin-clase'
-                logging.info(f"  Encontrada tabla con clases: '{table_classes}'")
-                
-                # Buscar tbody o usar todas las filas
-                tbody = any_table.query_selector('tbody')
-                if tbody:
-                    participant_rows = tbody.query_selector_all('tr')
-                    logging.info(f"  ✓ Encontradas {len(participant_rows)} filas en tbody")
-                else:
-                    all_rows = any_table.query_selector_all('tr')
-                    # Filtrar header row (primera fila)
-                    participant_rows = all_rows[1:] if len(all_rows) > 1 else []
-                    logging.info(f"  ✓ Encontradas {len(participant_rows)} filas (excluyendo header)")
-            else:
-                logging.warning(f"  ✗ No se encontró ninguna tabla en el contenedor.")
+        participant_rows = find_participant_rows(race_container, race_data['title'])
         
         if participant_rows and len(participant_rows) > 0:
             logging.info(f"  Procesando {len(participant_rows)} filas de participantes...")
@@ -278,52 +369,7 @@ def process_race_container(race_container, track_name_slug, race_date_obj, main_
             for row_idx, row in enumerate(participant_rows):
                 try:
                     # ✅ MEJORADO: Detectar status del caballo con más métodos - VERSION 2.0
-                    status = 'active'  # Default status
-                    debug_info = []  # Para debugging
-                    
-                    # ⚠️ FORZAR DEBUG: Mostrar SIEMPRE información de cada participante
-                    debug_info.append(f"🐎 HORSE_DETECTION_v2.0_ACTIVE")
-                    
-                    # 1. Verificar la clase de la fila (PRIMERA PRIORIDAD)
-                    row_class = row.get_attribute('class') or ''
-                    debug_info.append(f"row_class='{row_class}'")
-                    if 'scratched' in row_class.lower():
-                        status = 'scratched'
-                        debug_info.append("✅ DETECTED via row_class")
-                    
-                    # 2. CORREGIDO: Verificar SOLO la columna específica de scratch
-                    scratch_cell = row.query_selector('td.table-entries-scratch-col')
-                    if scratch_cell:
-                        scratch_text = scratch_cell.inner_text().strip()
-                        scratch_html = scratch_cell.inner_html().strip()
-                        debug_info.append(f"scratch_text='{scratch_text}'")
-                        debug_info.append(f"scratch_html='{scratch_html}'")
-                        
-                        # SOLO verificar si contiene específicamente "(Scratched)" o "Scratched"
-                        if scratch_text and ('(scratched)' in scratch_text.lower() or 'scratched' in scratch_text.lower()):
-                            status = 'scratched'
-                            debug_info.append(f"✅ DETECTED via scratch_text exact match")
-                    else:
-                        debug_info.append("scratch_cell=NOT_FOUND")
-                    
-                    # 3. Verificar abbr title en la última columna (ML odds) - SOLO para "SCR" 
-                    if status == 'active':  # Solo si no se detectó ya como scratched
-                        ml_abbr = row.query_selector('td:last-child .table-entries-scratch-sm abbr')
-                        if ml_abbr:
-                            abbr_title = ml_abbr.get_attribute('title') or ''
-                            abbr_text = ml_abbr.inner_text().strip()
-                            debug_info.append(f"ml_abbr_text='{abbr_text}' title='{abbr_title}'")
-                            if abbr_text.upper() == 'SCR' or '(scratched)' in abbr_title.lower():
-                                status = 'scratched'
-                                debug_info.append("✅ DETECTED via ml_abbr")
-                    
-                    # 4. Verificar si falta imagen de PP (program number) - INDICADOR FUERTE
-                    pp_img = row.query_selector('td:first-child img')
-                    if not pp_img and status == 'active':
-                        debug_info.append("⚠️ MISSING PP image - probable scratch")
-                        # En el HTML que mostraste, los scratched no tienen imagen PP
-                        status = 'scratched'
-                        debug_info.append("✅ DETECTED via missing_pp_img")
+                    status, debug_info = detect_participant_status(row)
                     
                     # Extraer Post Position (PP) - segunda columna
                     pp_cell = row.query_selector('td:nth-child(2)')
@@ -336,15 +382,7 @@ def process_race_container(race_container, track_name_slug, race_date_obj, main_
                     sire = 'N/A'
                     
                     if horse_sire_cell:
-                        # Extraer nombre del caballo del enlace
-                        horse_link = horse_sire_cell.query_selector('h4 a')
-                        if horse_link:
-                            horse_name = horse_link.inner_text().strip()
-                            # Extraer horse_id del href del enlace
-                            horse_href = horse_link.get_attribute('href')
-                            if horse_href:
-                                # El href es algo como "/horse/Chabelita_1"
-                                horse_id = horse_href.split('/')[-1] if '/' in horse_href else horse_href
+                        horse_name, horse_id = extract_horse_link(horse_sire_cell)
                         
                         # Extraer Sire - buscar en el párrafo después del h4
                         # El sire aparece en un párrafo después del h4 con el nombre del caballo
@@ -415,6 +453,18 @@ def process_race_container(race_container, track_name_slug, race_date_obj, main_
 
     return race_data
 
+# Claves internas que repiten a otra que ya consume el frontend
+# (race_name_scraped → title, race_type_full → race_type_from_detail,
+# race_conditions → conditions, race_url → specific_race_url)
+LEGACY_DUPLICATE_KEYS = ('race_name_scraped', 'race_type_full', 'race_conditions', 'race_url')
+
+def compact_race_data(race_data):
+    """Versión compacta para la API: sin claves duplicadas ni campos vacíos"""
+    return {
+        key: value for key, value in race_data.items()
+        if key not in LEGACY_DUPLICATE_KEYS and value is not None
+    }
+
 def close_playwright(pw_instance, browser, page):
     """Cierra Playwright de forma segura"""
     if browser:
@@ -440,7 +490,8 @@ def auto_complete_horse_profiles():
             host="localhost",
             database="caballos_db",
             user="macm1",
-            password=""
+            password="",
+            connection_factory=AfterCommitConnection
         )
         cursor = conn.cursor()
         
@@ -510,16 +561,29 @@ def auto_complete_horse_profiles():
             conn.rollback()
             conn.close()
 
-def scrape_races_from_url(url):
-    """Función principal para scrapear carreras desde una URL"""
+# Dos pedidos de la misma tarjeta comparten un solo scraping (ver services/single_flight.py)
+@single_flight(SCRAPE_CARD_LOCK, lambda url, force=False: normalize_scrape_url(url))
+def scrape_races_from_url(url, force=False):
+    """
+    Función principal para scrapear carreras desde una URL. Si la misma URL se
+    scrapeó hace menos de SCRAPE_MIN_INTERVAL_SECONDS se responde con lo
+    guardado (sin abrir el navegador), salvo que force=True.
+    """
     try:
-        # Crear tablas si no existen
-        if not create_database_tables():
+        # El esquema se migra al arrancar; aquí solo se comprueba (en memoria tras la primera vez)
+        if not ensure_schema_ready():
             return {
                 'success': False,
-                'error': 'Failed to create database tables'
+                'error': 'Database schema is not ready (run: python -m database.migrate)'
             }
         
+        # También cubre a quien esperó el lock de otro proceso que acaba de scrapear la URL
+        if not force:
+            recent = load_recent_scrape(url)
+            if recent:
+                logger.info(f"⚡ {url} se scrapeó hace {recent['age_seconds']}s, se responde desde la BD")
+                return recent
+        
         # Inicializar Playwright y cargar la página
         pw_instance, browser, page = initialize_playwright_and_load_page(url)
         
@@ -534,27 +598,7 @@ def scrape_races_from_url(url):
         track_name_slug = url_data.get('track_name_slug', 'unknown')
         race_date_obj = url_data.get('race_date_obj')
         
-        # Buscar contenedores de carreras - probar diferentes selectores
-        race_containers = page.query_selector_all('div.race-container')
-        
-        # Si no encuentra race-container, probar con otros selectores
-        if not race_containers:
-            logger.info("No se encontraron div.race-container, probando selectores alternativos...")
-            
-            # Probar con div.my-5 que aparece en los logs
-            race_containers = page.query_selector_all('div.my-5')
-            logger.info(f"Encontrados {len(race_containers)} elementos con div.my-5")
-            
-            # Si tampoco encuentra, probar con selectores más generales
-            if not race_containers:
-                # Buscar cualquier div que contenga "Race #" en el texto
-                all_divs = page.query_selector_all('div')
-                race_containers = []
-                for div in all_divs:
-                    text_content = div.inner_text() if div.inner_text() else ""
-                    if "Race #" in text_content or "Race " in text_content:
-                        race_containers.append(div)
-                logger.info(f"Encontrados {len(race_containers)} elementos que contienen 'Race #'")
+        race_containers = find_race_containers(page)
         
         if not race_containers:
             close_playwright(pw_instance, browser, page)
@@ -582,6 +626,10 @@ def scrape_races_from_url(url):
         # Cerrar Playwright DESPUÉS de procesar todo
         close_playwright(pw_instance, browser, page)
         
+        if all_races_data:
+            schedule_stats_refresh()
+            record_scrape(url, page_title, all_races_data)
+        
         # 🐎 REMOVIDO: Ya NO completamos perfiles automáticamente
         # El completado de perfiles solo ocurre cuando el usuario da clic en los botones
         
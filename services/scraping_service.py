@@ -9,14 +9,32 @@
 import logging
 from datetime import datetime
 from utils.ipa_generator import generate_english_ipa, generate_french_ipa, generate_japanese_ipa
+from database.bulk_writers import PedigreeBulkWriter
+from services.pedigree_service import invalidate_pedigree_trees_after_commit
+from database.after_commit import after_commit
+from utils.response_cache import invalidate_response_cache, horse_tags
+from database.notifications import notify_horses_changed, HORSE_CHANGED
+from database.prepared import register_statement, execute_prepared
+from services.single_flight import single_flight, lock_waited_since, SCRAPE_HORSE_LOCK
+from database.scrape_log import record_horse_scrape, load_horse_scrape_since
 import psycopg2
 from playwright.sync_api import sync_playwright
 import re
 
 logger = logging.getLogger(__name__)
 
+# Un mismo caballo pedido por varios scrapings a la vez se descarga una sola vez
+@single_flight(SCRAPE_HORSE_LOCK, lambda horse_id, horse_name: horse_id)
 def scrape_horse_profile(horse_id, horse_name):
     """Función para scrapear el perfil de un caballo desde HorseRacingNation"""
+    # Si se esperó a otro proceso que scrapeaba este caballo, se usa su resultado
+    waited_since = lock_waited_since()
+    if waited_since is not None:
+        horse_data = load_horse_scrape_since(horse_id, waited_since)
+        if horse_data:
+            logger.info(f"⚡ {horse_name} lo acaba de scrapear otro proceso, se reutiliza su perfil")
+            return horse_data
+    
     try:
         # Construir URL del perfil del caballo
         profile_url = f"https://www.horseracingnation.com/horse/{horse_id}"
@@ -318,6 +336,7 @@ def scrape_horse_profile(horse_id, horse_name):
                 
                 if horse_data:
                     logger.info(f"Datos extraídos para {horse_name}: {horse_data}")
+                    record_horse_scrape(horse_id, horse_data)
                     return horse_data
                 else:
                     logger.warning(f"No se pudieron extraer datos para {horse_name}")
@@ -332,6 +351,15 @@ def scrape_horse_profile(horse_id, horse_name):
         logger.error(f"Error en scrape_horse_profile para {horse_name}: {e}")
         return None
 
+# Perfil actual para comparar; se ejecuta una vez por caballo scrapeado
+SELECT_HORSE_PROFILE = register_statement('scraping_select_horse_profile', """
+    SELECT age, sex, color, owner, breeder, country_of_birth, status,
+           horse_name_ipa, owner_ipa, trainer_ipa, breeder_ipa, trainer,
+           profile_url
+    FROM horses
+    WHERE horse_id = %s
+""")
+
 def update_horse_data(cursor, horse_id, horse_data):
     """Actualizar datos del caballo en la base de datos"""
     try:
@@ -339,13 +367,7 @@ def update_horse_data(cursor, horse_id, horse_data):
         pedigree_data = horse_data.get('pedigree', None)
         
         # Primero, obtener los datos actuales del caballo para comparar
-        cursor.execute("""
-            SELECT age, sex, color, owner, breeder, country_of_birth, status, 
-                   horse_name_ipa, owner_ipa, trainer_ipa, breeder_ipa, trainer,
-                   profile_url
-            FROM horses 
-            WHERE horse_id = %s
-        """, (horse_id,))
+        execute_prepared(cursor, SELECT_HORSE_PROFILE, (horse_id,))
         
         current_data = cursor.fetchone()
         
@@ -388,6 +410,10 @@ def update_horse_data(cursor, horse_id, horse_data):
                 
                 cursor.execute(query, values)
                 logger.info(f"✅ Datos actualizados en BD para {horse_id} (cambios detectados)")
+                # Las cachés se vacían cuando quien llama hace commit
+                invalidate_pedigree_trees_after_commit(cursor, [horse_id])
+                after_commit(cursor, invalidate_response_cache, horse_tags([horse_id]))
+                notify_horses_changed(cursor, HORSE_CHANGED, [horse_id])
             else:
                 logger.info(f"ℹ️ No hay cambios para {horse_id} - updated_at no modificado")
         else:
@@ -408,86 +434,11 @@ def save_pedigree_data(cursor, horse_id, pedigree_data):
     try:
         logger.info(f"Guardando pedigree para {horse_id}: {pedigree_data}")
         
-        # Verificar si ya existe un registro de pedigree para este caballo usando horse_id
-        cursor.execute("""
-            SELECT sire_id, dam_id, maternal_grandsire_id, paternal_grandsire_id, 
-                   paternal_granddam_id, maternal_granddam_id, paternal_gg_sire_id,
-                   paternal_gg_dam_id, paternal_gd_sire_id, paternal_gd_dam_id,
-                   maternal_gg_sire_id, maternal_gg_dam_id, maternal_gd_sire_id,
-                   maternal_gd_dam_id
-            FROM pedigree 
-            WHERE horse_id = %s
-        """, (horse_id,))
-        
-        current_pedigree = cursor.fetchone()
-        
-        if current_pedigree:
-            # Actualizar registro existente - solo si hay cambios
-            update_fields = []
-            values = []
-            has_changes = False
-            
-            # Mapeo de campos para comparación
-            field_mapping = {
-                'sire_id': 0, 'dam_id': 1, 'maternal_grandsire_id': 2, 'paternal_grandsire_id': 3,
-                'paternal_granddam_id': 4, 'maternal_granddam_id': 5, 'paternal_gg_sire_id': 6,
-                'paternal_gg_dam_id': 7, 'paternal_gd_sire_id': 8, 'paternal_gd_dam_id': 9,
-                'maternal_gg_sire_id': 10, 'maternal_gg_dam_id': 11, 'maternal_gd_sire_id': 12,
-                'maternal_gd_dam_id': 13
-            }
-            
-            for field, value in pedigree_data.items():
-                if field in field_mapping:
-                    current_value = current_pedigree[field_mapping[field]]
-                    
-                    # Comparar valores (considerando NULL vs None)
-                    if current_value != value:
-                        update_fields.append(f"{field} = %s")
-                        values.append(value)
-                        has_changes = True
-                        logger.info(f"Cambio en pedigree {field}: '{current_value}' → '{value}'")
-            
-            if has_changes:
-                # Solo actualizar updated_at si hay cambios reales
-                update_fields.append("updated_at = %s")
-                values.append(datetime.now())
-                values.append(horse_id)
-                
-                query = f"""
-                    UPDATE pedigree 
-                    SET {', '.join(update_fields)}
-                    WHERE horse_id = %s
-                """
-                cursor.execute(query, values)
-                logger.info(f"✅ Pedigree actualizado en BD para {horse_id} (cambios detectados)")
-            else:
-                logger.info(f"ℹ️ No hay cambios en pedigree para {horse_id} - updated_at no modificado")
-        else:
-            # Crear nuevo registro - establecer created_at y updated_at
-            fields = ['horse_id']
-            values = [horse_id]
-            
-            for field, value in pedigree_data.items():
-                if field in ['sire_id', 'dam_id', 'maternal_grandsire_id', 'paternal_grandsire_id', 
-                           'paternal_granddam_id', 'maternal_granddam_id', 'paternal_gg_sire_id',
-                           'paternal_gg_dam_id', 'paternal_gd_sire_id', 'paternal_gd_dam_id',
-                           'maternal_gg_sire_id', 'maternal_gg_dam_id', 'maternal_gd_sire_id',
-                           'maternal_gd_dam_id']:
-                    fields.append(field)
-                    values.append(value)
-            
-            # Agregar timestamps para nuevo registro
-            fields.extend(['created_at'])
-            current_time = datetime.now()
-            values.extend([current_time])
-            
-            placeholders = ', '.join(['%s'] * len(values))
-            query = f"""
-                INSERT INTO pedigree ({', '.join(fields)})
-                VALUES ({placeholders})
-            """
-            cursor.execute(query, values)
-            logger.info(f"✅ Pedigree insertado en BD para {horse_id}")
+        # Un único INSERT ... ON CONFLICT: la comparación con los datos actuales
+        # la hace la BD y updated_at solo cambia si hay cambios reales
+        writer = PedigreeBulkWriter(cursor, batch_size=None)
+        writer.add(horse_id, pedigree_data)
+        writer.flush()
             
     except Exception as e:
         logger.error(f"Error guardando pedigree para {horse_id}: {e}")
@@ -0,0 +1,142 @@
+# services/scratch_scheduler.py - Sondeo de retiros según la hora de largada
+#
+# Los retiros se anuncian durante el día de carreras, cada vez más seguido a
+# medida que se acerca la largada. Un hilo en segundo plano revisa cada
+# SCHEDULER_TICK_SECONDS qué tarjetas de hoy tienen carreras por correr y las
+# revisa (services/scratch_service.py, solo las tablas de participantes) con
+# una frecuencia que depende de los minutos que faltan para la próxima
+# largada. Cuando ya largó la última carrera la tarjeta deja de revisarse.
+#
+# La hora de largada de races.post_time es la hora local del hipódromo, sin
+# zona: se interpreta en la zona del hipódromo (TRACK_TIME_ZONES en
+# utils/race_parser.py) o, si no figura, en SCRATCH_POST_TIME_TZ.
+#
+# Con varios procesos web solo uno sondea: el que tiene el advisory lock
+# SCRATCH_SCHEDULER_LOCK en su conexión dedicada.
+
+import os
+import time
+import logging
+import threading
+from psycopg2.extras import Json
+from database.models import get_db_connection
+from utils.race_parser import TRACK_TIME_ZONES
+from services.scratch_service import card_url_for_race, check_card_scratches
+
+logger = logging.getLogger(__name__)
+
+# Apagado por defecto: cada revisión abre el navegador contra el sitio
+SCRATCH_POLLING_ENABLED = os.getenv("SCRATCH_POLLING_ENABLED", "0") == "1"
+# Zona de los hipódromos que no están en TRACK_TIME_ZONES
+SCRATCH_POST_TIME_TZ = os.getenv("SCRATCH_POST_TIME_TZ", "America/New_York")
+# Cada cuánto se revisa qué tarjetas toca sondear
+SCHEDULER_TICK_SECONDS = 30
+# (minutos hasta la próxima largada, segundos entre revisiones), de menor a mayor
+POLL_INTERVALS = ((10, 60), (30, 180), (120, 600))
+# Más de 2 horas para la próxima largada
+IDLE_POLL_SECONDS = 1800
+
+SCRATCH_SCHEDULER_LOCK = 4804
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def poll_interval(minutes_to_post):
+    """Segundos entre revisiones de una tarjeta según los minutos hasta su próxima largada"""
+    for max_minutes, seconds in POLL_INTERVALS:
+        if minutes_to_post < max_minutes:
+            return seconds
+    return IDLE_POLL_SECONDS
+
+
+def cards_with_races_ahead(cur):
+    """[(track_code, race_date, specific_race_url, minutos a la próxima largada)] de las tarjetas de hoy"""
+    cur.execute("""
+        -- El rango de fechas (hoy en cualquier zona cae en él) limita la lectura a una o dos particiones
+        WITH races_tz AS (
+            SELECT track_code, race_date, post_time, specific_race_url,
+                   COALESCE(%(zones)s::jsonb ->> track_code, %(tz)s) AS tz
+            FROM races
+            WHERE race_date BETWEEN CURRENT_DATE - 1 AND CURRENT_DATE + 1
+              AND post_time IS NOT NULL
+        )
+        SELECT track_code, race_date, MIN(specific_race_url),
+               EXTRACT(EPOCH FROM MIN((race_date + post_time) AT TIME ZONE tz) - NOW()) / 60
+        FROM races_tz
+        WHERE race_date = (NOW() AT TIME ZONE tz)::date
+          AND (race_date + post_time) AT TIME ZONE tz > NOW()
+        GROUP BY track_code, race_date
+        ORDER BY 4
+    """, {'zones': Json(TRACK_TIME_ZONES), 'tz': SCRATCH_POST_TIME_TZ})
+    return [(track_code, race_date, url, float(minutes)) for track_code, race_date, url, minutes in cur.fetchall()]
+
+
+class ScratchScheduler(threading.Thread):
+    """Hilo que sondea los retiros de las tarjetas del día mientras tenga el lock de líder"""
+
+    def __init__(self):
+        super().__init__(name='scratch-scheduler', daemon=True)
+        self._stop_event = threading.Event()
+        # (track_code, race_date) → time.monotonic() de la última revisión
+        self._last_checked = {}
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            conn = get_db_connection()
+            if not conn:
+                self._stop_event.wait(SCHEDULER_TICK_SECONDS)
+                continue
+            try:
+                conn.autocommit = True
+                cur = conn.cursor()
+                cur.execute("SELECT pg_try_advisory_lock(%s)", (SCRATCH_SCHEDULER_LOCK,))
+                if cur.fetchone()[0]:
+                    logger.info("⏱️ Sondeo de retiros activo en este proceso")
+                    self._poll(cur)
+                else:
+                    # Otro proceso sondea; se vuelve a intentar por si termina
+                    self._stop_event.wait(SCHEDULER_TICK_SECONDS)
+            except Exception as e:
+                logger.error(f"Sondeo de retiros interrumpido: {e}")
+                self._stop_event.wait(SCHEDULER_TICK_SECONDS)
+            finally:
+                # Cerrar la conexión libera el lock de líder
+                conn.close()
+
+    def _poll(self, cur):
+        while not self._stop_event.is_set():
+            cards = cards_with_races_ahead(cur)
+            now = time.monotonic()
+            for track_code, race_date, url, minutes_to_post in cards:
+                key = (track_code, race_date)
+                last_checked = self._last_checked.get(key)
+                if last_checked is not None and now - last_checked < poll_interval(minutes_to_post):
+                    continue
+                logger.info(f"🔍 Revisando retiros de {track_code} {race_date} "
+                            f"(próxima largada en {minutes_to_post:.0f} min)")
+                result = check_card_scratches(card_url_for_race(track_code, race_date, url))
+                if not result.get('success'):
+                    logger.warning(f"No se pudieron revisar los retiros de {track_code} {race_date}: {result.get('error')}")
+                self._last_checked[key] = time.monotonic()
+                if self._stop_event.is_set():
+                    return
+            # Olvidar tarjetas que ya no tienen carreras por correr
+            active = {(track_code, race_date) for track_code, race_date, _, _ in cards}
+            self._last_checked = {key: value for key, value in self._last_checked.items() if key in active}
+            self._stop_event.wait(SCHEDULER_TICK_SECONDS)
+
+
+def start_scratch_scheduler():
+    """Arranca el sondeo de retiros del proceso (una sola vez) si está habilitado"""
+    global _scheduler
+    if not SCRATCH_POLLING_ENABLED:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = ScratchScheduler()
+            _scheduler.start()
+    return _scheduler
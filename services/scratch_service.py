@@ -0,0 +1,257 @@
+# services/scratch_service.py - Revisión liviana de retiros de una tarjeta
+#
+# Para saber si hubo retiros no hace falta reprocesar la tarjeta completa
+# (detalles, perfiles, IPA): basta con leer las tablas de participantes, sacar
+# el status de cada fila y compararlo con race_entries. Solo se escriben los
+# participantes cuyo status cambió, con su evento en entry_status_events y el
+# aviso NOTIFY de la carrera, igual que al guardar un scraping completo.
+#
+# Los participantes que aparecen en la página y no están guardados se ignoran:
+# una tarjeta nueva se carga con el scraping completo (/api/scrape).
+
+import logging
+from datetime import datetime
+from database.models import get_db_connection
+from database.migrate import ensure_schema_ready
+from database.notifications import notify_race_changed
+from database.partitions import race_date_filter
+from database.scrape_log import normalize_scrape_url
+from database.status_events import record_status_events
+from services.race_scraping_service import (
+    initialize_playwright_and_load_page, close_playwright, find_race_containers,
+    find_race_title, find_participant_rows, detect_participant_status, extract_horse_link
+)
+from services.single_flight import single_flight, SCRAPE_SCRATCH_LOCK
+from utils.race_parser import TRACK_CODES, TRACK_SLUGS_BY_CODE, parse_race_url_data, parse_race_title_data
+from utils.response_cache import invalidate_response_cache, race_tags
+
+logger = logging.getLogger(__name__)
+
+CARD_URL_TEMPLATE = "https://www.horseracingnation.com/entries-results/{slug}/{race_date}"
+
+
+def card_url_for_race(track_code, race_date, specific_race_url=None):
+    """URL de la tarjeta (página de entries del día) a la que pertenece la carrera"""
+    if specific_race_url and '/entries-results/' in specific_race_url:
+        return specific_race_url.split('#')[0]
+    slug = TRACK_SLUGS_BY_CODE.get(track_code, (track_code or '').lower())
+    return CARD_URL_TEMPLATE.format(slug=slug, race_date=race_date)
+
+
+def scrape_card_statuses(card_url):
+    """
+    Lee solo las tablas de participantes de la tarjeta.
+    Devuelve {race_number: {horse_id: (horse_name, status)}}; None si la página no cargó.
+    """
+    pw_instance, browser, page = initialize_playwright_and_load_page(card_url)
+    if not page:
+        return None
+    try:
+        statuses_by_race = {}
+        for race_container in find_race_containers(page):
+            title, _ = find_race_title(race_container)
+            if not title:
+                continue
+            race_number = parse_race_title_data(title).get('number')
+            if not race_number or race_number == 'N/A':
+                continue
+            statuses = statuses_by_race.setdefault(int(race_number), {})
+            for row in find_participant_rows(race_container, title):
+                horse_sire_cell = row.query_selector('td:nth-child(4)')
+                if not horse_sire_cell:
+                    continue
+                horse_name, horse_id = extract_horse_link(horse_sire_cell)
+                if horse_id == 'N/A':
+                    continue
+                status, _ = detect_participant_status(row)
+                statuses[horse_id] = (horse_name, status)
+        return statuses_by_race
+    finally:
+        close_playwright(pw_instance, browser, page)
+
+
+def apply_card_statuses(track_code, race_date, statuses_by_race):
+    """
+    Compara los status leídos con race_entries y guarda los que cambiaron.
+    Devuelve una lista por carrera con sus participantes activos, retirados y
+    los cambios registrados.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError('Error de conexión a la base de datos')
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT r.race_id, r.race_number, re.horse_id, re.horse_name, re.status
+            FROM races r
+            LEFT JOIN race_entries re ON re.race_id = r.race_id AND re.race_date = r.race_date
+            WHERE r.race_date = %s AND r.track_code = %s
+            ORDER BY r.race_number, re.post_position
+        """, (race_date, track_code))
+        races = {}
+        for race_id, race_number, horse_id, horse_name, status in cur.fetchall():
+            race = races.setdefault(race_id, {'race_id': race_id, 'race_number': race_number, 'entries': []})
+            if horse_id:
+                race['entries'].append((horse_id, horse_name, status))
+
+        observed_at = datetime.now()
+        status_events = []
+        changed_races = []
+        results = []
+        for race in races.values():
+            scraped = statuses_by_race.get(race['race_number'])
+            active_horses, scratched_horses, changes = [], [], []
+            for horse_id, horse_name, stored_status in race['entries']:
+                status = stored_status
+                if scraped and horse_id in scraped:
+                    status = scraped[horse_id][1]
+                if status != stored_status:
+                    cur.execute("""
+                        UPDATE race_entries
+                        SET status = %s, status_changed_at = %s, updated_at = CURRENT_TIMESTAMP
+                        WHERE race_id = %s AND horse_id = %s AND race_date = %s
+                    """, (status, observed_at, race['race_id'], horse_id, race_date))
+                    status_events.append((race['race_id'], horse_id, track_code, stored_status, status, observed_at))
+                    changes.append({'horse_id': horse_id, 'horse_name': horse_name,
+                                    'from_status': stored_status, 'to_status': status})
+                    logger.info(f"🔄 Status cambió para {horse_name}: {stored_status} → {status}")
+                horse = {'horse_id': horse_id, 'horse_name': horse_name}
+                (scratched_horses if status == 'scratched' else active_horses).append(horse)
+            if scraped:
+                missing = set(scraped) - {entry[0] for entry in race['entries']}
+                if missing:
+                    logger.warning(f"{len(missing)} participantes de {race['race_id']} no están guardados, "
+                                   f"hace falta un scraping completo de la tarjeta")
+            if changes:
+                changed_races.append(race['race_id'])
+            results.append({
+                'race_id': race['race_id'],
+                'race_number': race['race_number'],
+                'checked': bool(scraped),
+                'active_horses': active_horses,
+                'scratched_horses': scratched_horses,
+                'total_scratched': len(scratched_horses),
+                'changes': changes,
+            })
+
+        record_status_events(cur, status_events)
+        # Aviso a los demás procesos; PostgreSQL lo entrega solo si hay commit
+        for race_id in changed_races:
+            notify_race_changed(cur, race_id, race_date)
+        conn.commit()
+        for race_id in changed_races:
+            invalidate_response_cache(race_tags(race_id, race_date))
+        cur.close()
+        return results
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+@single_flight(SCRAPE_SCRATCH_LOCK, lambda card_url: normalize_scrape_url(card_url))
+def check_card_scratches(card_url):
+    """
+    Revisa los retiros de una tarjeta ya guardada. Devuelve {'success', 'url',
+    'races': [...], 'total_changes'} o {'success': False, 'error'}.
+    """
+    if not ensure_schema_ready():
+        return {'success': False, 'error': 'Database schema is not ready (run: python -m database.migrate)'}
+
+    url_data = parse_race_url_data(card_url)
+    track_name_slug = url_data.get('track_name_slug')
+    race_date_obj = url_data.get('race_date_obj')
+    if not track_name_slug or not race_date_obj:
+        return {'success': False, 'error': f'URL de tarjeta no reconocida: {card_url}'}
+    # Mismo código que generate_race_id pone al inicio del race_id
+    track_code = TRACK_CODES.get(track_name_slug, track_name_slug.upper()[:10])
+
+    try:
+        statuses_by_race = scrape_card_statuses(card_url)
+        if statuses_by_race is None:
+            return {'success': False, 'error': 'Failed to load page'}
+        races = apply_card_statuses(track_code, race_date_obj.date(), statuses_by_race)
+    except Exception as e:
+        logger.error(f"Error revisando retiros de {card_url}: {e}")
+        return {'success': False, 'error': str(e)}
+
+    total_changes = sum(len(race['changes']) for race in races)
+    logger.info(f"🔍 Retiros revisados en {card_url}: {len(races)} carreras, {total_changes} cambios")
+    return {'success': True, 'url': card_url, 'races': races, 'total_changes': total_changes}
+
+
+def _summary(races):
+    """Formato que espera el frontend: activos, retirados y total de retirados"""
+    active_horses = [horse for race in races for horse in race['active_horses']]
+    scratched_horses = [horse for race in races for horse in race['scratched_horses']]
+    return {
+        'success': True,
+        'active_horses': active_horses,
+        'scratched_horses': scratched_horses,
+        'total_scratched': len(scratched_horses),
+        'changes': [change for race in races for change in race['changes']],
+        'races': races,
+    }
+
+
+def check_race_scratches(race_id):
+    """
+    Revisa la tarjeta de la carrera y devuelve el resultado de esa carrera.
+    Si la carrera no existe el resultado trae 'not_found': True.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return {'success': False, 'error': 'Error de conexión a la base de datos'}
+    try:
+        cur = conn.cursor()
+        date_sql, date_params = race_date_filter(race_id)
+        cur.execute(f"""
+            SELECT track_code, race_date, specific_race_url FROM races
+            WHERE race_id = %s AND {date_sql}
+        """, [race_id] + date_params)
+        row = cur.fetchone()
+        cur.close()
+    finally:
+        conn.close()
+    if not row:
+        return {'success': False, 'not_found': True, 'error': f'Carrera {race_id} no encontrada'}
+
+    result = check_card_scratches(card_url_for_race(*row))
+    if not result.get('success'):
+        return result
+    races = [race for race in result['races'] if race['race_id'] == race_id]
+    return {**_summary(races), 'race_id': race_id, 'url': result['url']}
+
+
+def check_all_scratches():
+    """Revisa todas las tarjetas de la última fecha cargada (la que muestra /api/races)"""
+    conn = get_db_connection()
+    if not conn:
+        return {'success': False, 'error': 'Error de conexión a la base de datos'}
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT track_code, race_date, MIN(specific_race_url)
+            FROM races
+            WHERE race_date = (SELECT MAX(race_date) FROM races)
+            GROUP BY track_code, race_date
+            ORDER BY track_code
+        """)
+        cards = cur.fetchall()
+        cur.close()
+    finally:
+        conn.close()
+    if not cards:
+        return {'success': False, 'error': 'No hay carreras guardadas'}
+
+    races, errors = [], []
+    for card in cards:
+        result = check_card_scratches(card_url_for_race(*card))
+        if result.get('success'):
+            races.extend(result['races'])
+        else:
+            errors.append({'track_code': card[0], 'error': result.get('error')})
+    if errors and not races:
+        return {'success': False, 'error': '; '.join(f"{e['track_code']}: {e['error']}" for e in errors)}
+    return {**_summary(races), 'cards_checked': len(cards) - len(errors), 'errors': errors}
@@ -0,0 +1,145 @@
+# services/single_flight.py - Un solo scraping a la vez por tarjeta o caballo
+#
+# Si dos usuarios piden la misma tarjeta, o un scraping masivo y uno por
+# carrera coinciden en un caballo, el mismo trabajo se hacía dos veces en
+# paralelo: el doble de carga al sitio y upserts compitiendo entre sí.
+#
+# Dentro de un proceso, las llamadas con la misma clave se agrupan: la primera
+# hace el trabajo y las demás esperan y reciben una copia de su resultado.
+# Entre procesos, quien hace el trabajo toma un advisory lock de PostgreSQL con
+# esa clave; si otro proceso ya lo tiene se espera a que termine antes de
+# empezar (así los scrapings de la misma clave nunca corren a la vez). Como el
+# que esperaba volvería a hacer el mismo trabajo, la función puede consultar
+# lock_waited_since() y reutilizar lo que el otro proceso guardó después de
+# esa hora (p. ej. scrape_horse_profile con database/scrape_log.py).
+
+import os
+import copy
+import logging
+import threading
+import functools
+import psycopg2
+from database.models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Primer entero de pg_advisory_lock(int, int): separa los tipos de clave
+SCRAPE_CARD_LOCK = 4801
+SCRAPE_HORSE_LOCK = 4802
+SCRAPE_SCRATCH_LOCK = 4803
+
+# Espera máxima por el lock de otro proceso; después se sigue sin él
+SINGLE_FLIGHT_WAIT_SECONDS = int(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "300"))
+
+_flights = {}
+_flights_lock = threading.Lock()
+_stats = {'executed': 0, 'coalesced': 0, 'waited_on_lock': 0, 'lock_timeouts': 0}
+# Hora (reloj de la BD) en que la llamada en curso de este hilo empezó a esperar el lock
+_local = threading.local()
+
+
+class _Flight:
+    """Llamada en curso: las que llegan con la misma clave esperan su resultado"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _acquire_advisory_lock(lock_class, key):
+    """
+    Toma el advisory lock de sesión (lock_class, key) en una conexión propia.
+    Devuelve (conexión, hora en que empezó a esperar o None si estaba libre);
+    cerrar la conexión libera el lock. (None, None) si no hay base de datos o
+    si la espera superó SINGLE_FLIGHT_WAIT_SECONDS.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.warning(f"Sin conexión para el lock de {key}: se sigue sin coordinar con otros procesos")
+        return None, None
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s)), clock_timestamp()", (lock_class, key))
+        acquired, waited_since = cur.fetchone()
+        if acquired:
+            return conn, None
+        _stats['waited_on_lock'] += 1
+        logger.info(f"⏳ Otro proceso está scrapeando {key}, esperando a que termine")
+        cur.execute("SET lock_timeout = %s", (f"{SINGLE_FLIGHT_WAIT_SECONDS}s",))
+        cur.execute("SELECT pg_advisory_lock(%s, hashtext(%s))", (lock_class, key))
+        return conn, waited_since
+    except psycopg2.errors.LockNotAvailable:
+        _stats['lock_timeouts'] += 1
+        logger.warning(f"El lock de {key} sigue tomado tras {SINGLE_FLIGHT_WAIT_SECONDS}s, se sigue sin él")
+        conn.close()
+        return None, None
+    except Exception:
+        conn.close()
+        raise
+    finally:
+        if not conn.closed:
+            cur.close()
+
+
+def run_single_flight(lock_class, key, fn, *args, **kwargs):
+    """Ejecuta fn(*args, **kwargs) una sola vez a la vez por (lock_class, key)"""
+    flight_key = (lock_class, key)
+    with _flights_lock:
+        flight = _flights.get(flight_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[flight_key] = _Flight()
+
+    if not leader:
+        _stats['coalesced'] += 1
+        logger.info(f"🔗 {key} ya se está scrapeando en este proceso, esperando su resultado")
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        # Copia: quien llama puede modificar el resultado (p. ej. compactarlo)
+        return copy.deepcopy(flight.result)
+
+    try:
+        lock_conn, _local.waited_since = _acquire_advisory_lock(lock_class, key)
+        try:
+            _stats['executed'] += 1
+            flight.result = fn(*args, **kwargs)
+        finally:
+            _local.waited_since = None
+            if lock_conn:
+                lock_conn.close()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(flight_key, None)
+        flight.done.set()
+
+
+def lock_waited_since():
+    """
+    Desde la función protegida: hora de la BD en que empezó a esperar el lock
+    de otro proceso, o None si no tuvo que esperar. Lo que ese proceso guardó
+    después de esta hora es un resultado que se puede reutilizar.
+    """
+    return getattr(_local, 'waited_since', None)
+
+
+def single_flight(lock_class, key_func):
+    """Decorador: la clave de cada llamada sale de key_func(*args, **kwargs)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return run_single_flight(lock_class, key_func(*args, **kwargs), fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def single_flight_stats():
+    with _flights_lock:
+        in_flight = len(_flights)
+    return {**_stats, 'in_flight': in_flight}
@@ -0,0 +1,95 @@
+# services/stats_service.py - Estadísticas globales para el dashboard
+#
+# Los conteos se mantienen con triggers (migración 0014): cada sentencia que
+# cambia horses, pedigree, races o race_entries agrega una fila de diferencias
+# a system_stats_deltas y la vista system_stats las suma. Leerla no depende del
+# tamaño de las tablas; en segundo plano se compactan las filas acumuladas,
+# agrupando las peticiones que llegan seguidas (un scraping de 12 carreras
+# compacta una vez). Las estadísticas de padres (migración 0016) se mantienen
+# igual y se compactan en la misma pasada.
+
+import os
+import logging
+import threading
+from database.models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Segundos de espera para agrupar varias peticiones de compactación en una sola
+STATS_REFRESH_DELAY = float(os.getenv("STATS_REFRESH_DELAY", "5"))
+
+STATS_FIELDS = [
+    'total_horses', 'horses_with_profile', 'horses_stale', 'horses_with_pedigree',
+    'total_races', 'last_race_date', 'total_entries', 'active_entries',
+    'scratched_entries', 'total_tracks', 'refreshed_at',
+]
+
+_refresh_lock = threading.Lock()
+_refresh_timer = None
+
+
+def get_system_stats():
+    """Lee la fila de la vista system_stats. Devuelve None si no hay conexión."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {', '.join(STATS_FIELDS)} FROM system_stats WHERE id = 1")
+        row = cur.fetchone()
+        cur.close()
+    finally:
+        conn.close()
+
+    if not row:
+        return {}
+    stats = dict(zip(STATS_FIELDS, row))
+    for field in ('last_race_date', 'refreshed_at'):
+        stats[field] = stats[field].isoformat() if stats[field] else None
+    return stats
+
+
+def refresh_system_stats():
+    """
+    Junta las filas de system_stats_deltas en una y las de las estadísticas de
+    padres en una por clave (los conteos no cambian)
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.error("No se pudo conectar a la base de datos para refrescar estadísticas")
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT compact_system_stats()")
+        cur.execute("SELECT compact_sire_stats()")
+        conn.commit()
+        cur.close()
+        logger.info("📊 Estadísticas del sistema compactadas")
+        return True
+    except Exception as e:
+        logger.error(f"Error refrescando estadísticas del sistema: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+
+def _run_scheduled_refresh():
+    global _refresh_timer
+    with _refresh_lock:
+        _refresh_timer = None
+    refresh_system_stats()
+
+
+def schedule_stats_refresh(delay=None):
+    """
+    Programa una compactación en segundo plano. Si ya hay una pendiente no se
+    programa otra: todas las escrituras de la ventana quedan cubiertas por ella.
+    """
+    global _refresh_timer
+    with _refresh_lock:
+        if _refresh_timer is not None:
+            return
+        _refresh_timer = threading.Timer(STATS_REFRESH_DELAY if delay is None else delay, _run_scheduled_refresh)
+        _refresh_timer.daemon = True
+        _refresh_timer.start()
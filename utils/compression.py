@@ -0,0 +1,68 @@
+# utils/compression.py - Compresión gzip/brotli de las respuestas grandes
+#
+# Se negocia con Accept-Encoding: brotli si el cliente lo acepta y el paquete
+# está instalado, si no gzip. No se comprimen respuestas chicas, los 304, los
+# archivos estáticos ni las respuestas por streaming (exports, feed de cambios),
+# que deben salir a medida que se generan.
+
+import os
+import gzip
+import logging
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+    logging.warning("brotli no está disponible. Se comprimirá solo con gzip.")
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este tamaño la compresión no compensa
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/css', 'text/plain', 'application/javascript'}
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request: comprime el cuerpo si conviene"""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
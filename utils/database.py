@@ -2,6 +2,7 @@
 import os
 import logging
 import psycopg2
+from database.after_commit import AfterCommitConnection
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,7 @@ def get_db_connection():
             database=os.getenv("DB_NAME", "caballos_db"),
             user=os.getenv("DB_USER", "macm1"),
             password=os.getenv("DB_PASSWORD", ""),
+            connection_factory=AfterCommitConnection,
         )
         return conn
     except Exception as e:
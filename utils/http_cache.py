@@ -0,0 +1,63 @@
+# utils/http_cache.py - GET condicional (ETag / Last-Modified) para la API
+#
+# Cada endpoint define una consulta de validación barata que devuelve una fila
+# cuya última columna es la fecha de la última modificación (timestamptz). Si
+# el cliente ya tiene esa versión se responde 304 sin ejecutar la consulta
+# principal ni serializar nada.
+#
+# Las versiones salen de data_versions (migración 0013): un contador por tabla
+# que se incrementa al hacer commit, en orden. MAX(updated_at) no sirve como
+# validador porque updated_at es la hora de inicio de la transacción.
+
+import hashlib
+from flask import Response, request
+
+def data_versions_query(*tables):
+    """
+    Consulta de validación sobre las versiones de `tables`. Last-Modified solo
+    se informa si el último cambio es de un segundo anterior al actual: con
+    resolución de segundos, otro commit en el mismo segundo no se distinguiría.
+    """
+    names = ', '.join(f"'{table}'" for table in tables)
+    return f"""
+        SELECT string_agg(name || ':' || version, ',' ORDER BY name),
+               CASE WHEN date_trunc('second', MAX(changed_at)) < date_trunc('second', clock_timestamp())
+                    THEN MAX(changed_at) END
+        FROM data_versions
+        WHERE name IN ({names})
+    """
+
+
+def compute_validators(cursor, query, params=None):
+    """
+    Ejecuta la consulta de validación. Devuelve (etag, last_modified).
+    El ETag incluye la ruta y los parámetros: cada página/filtro tiene el suyo.
+    """
+    cursor.execute(query, params)
+    row = cursor.fetchone() or (None,)
+    fingerprint = '|'.join(str(value) for value in row)
+    raw = f"{request.full_path}|{fingerprint}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest(), row[-1]
+
+
+def is_not_modified(etag, last_modified):
+    """True si la versión del cliente coincide (If-None-Match tiene prioridad)"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        # Last-Modified tiene resolución de segundos
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified):
+    """Agrega ETag/Last-Modified y obliga a revalidar en cada pedido"""
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified_response(etag, last_modified):
+    return set_validators(Response(status=304), etag, last_modified)
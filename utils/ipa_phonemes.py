@@ -0,0 +1,114 @@
+# utils/ipa_phonemes.py - Normalización de transcripciones IPA a fonemas comparables
+#
+# Las transcripciones guardadas vienen de fuentes distintas (diccionario manual,
+# eng-to-ipa, reglas básicas) y no siempre usan los mismos símbolos para el mismo
+# sonido. Aquí se reducen a una secuencia de fonemas canónicos para comparar
+# nombres "por cómo suenan": sin acentos ni marcas de duración y con las
+# variantes equivalentes unificadas (ɹ → r, ʌ → ə, ʧ → tʃ...).
+
+import unicodedata
+
+# Marcas que no cambian el fonema: acento, duración, sílaba, enlace
+IGNORED_MARKS = set('/[]ˈˌ\'ːˑ.‿͡ ‑-_,')
+
+# Variantes que se tratan como el mismo sonido
+EQUIVALENTS = {
+    'ʧ': 'tʃ', 'ʤ': 'dʒ', 'ʦ': 'ts', 'ch': 'tʃ',
+    'ɹ': 'r', 'ɾ': 't', 'ʁ': 'r', 'ɚ': 'ər', 'ɝ': 'ər',
+    'ʌ': 'ə', 'ɐ': 'ə', 'ɜ': 'ə', 'ɒ': 'ɑ', 'ɛ': 'e',
+    'ɡ': 'g', 'c': 'k', 'q': 'k', 'x': 'k', 'y': 'i', 'ɫ': 'l',
+}
+
+# 'a' suelta es ɑ, pero dentro de aɪ/aʊ forma parte del diptongo
+STANDALONE_EQUIVALENTS = {'a': 'ɑ'}
+
+# Fonemas de dos símbolos (africadas y diptongos)
+MULTI_SYMBOL_PHONEMES = ('tʃ', 'dʒ', 'ts', 'aɪ', 'aʊ', 'ɔɪ', 'eɪ', 'oʊ', 'əʊ', 'ɪə', 'eə', 'ʊə')
+
+VOWELS = set('iɪeæɑɔoʊuəɨɵøœɶɤɯ') | {'aɪ', 'aʊ', 'ɔɪ', 'eɪ', 'oʊ', 'əʊ', 'ɪə', 'eə', 'ʊə'}
+
+# Grupos de consonantes que se confunden con facilidad al oído
+CONSONANT_GROUPS = (
+    {'p', 'b'}, {'t', 'd'}, {'k', 'g'}, {'f', 'v'}, {'θ', 'ð', 'f'}, {'s', 'z'},
+    {'ʃ', 'ʒ', 's'}, {'tʃ', 'dʒ', 'ʃ'}, {'m', 'n', 'ŋ'}, {'l', 'r'}, {'w', 'v'}, {'j', 'i'},
+)
+
+
+def _canonical_symbols(ipa):
+    """Texto IPA → símbolos sin diacríticos ni marcas, con equivalencias aplicadas"""
+    decomposed = unicodedata.normalize('NFD', ipa.lower())
+    text = ''.join(c for c in decomposed if not unicodedata.combining(c) and c not in IGNORED_MARKS)
+    text = text.replace('ch', EQUIVALENTS['ch'])
+    return ''.join(EQUIVALENTS.get(c, c) for c in text)
+
+
+def ipa_to_phonemes(ipa):
+    """
+    Convierte una transcripción IPA ('/ˈsiːbɪskɪt/') en una tupla de fonemas
+    canónicos (('s', 'i', 'b', 'ɪ', 's', 'k', 'ɪ', 't')). Los espacios entre
+    palabras se ignoran: 'Sea Biscuit' y 'Seabiscuit' suenan igual.
+    """
+    if not ipa:
+        return ()
+    text = _canonical_symbols(ipa)
+    phonemes = []
+    i = 0
+    while i < len(text):
+        for phoneme in MULTI_SYMBOL_PHONEMES:
+            if text.startswith(phoneme, i):
+                phonemes.append(phoneme)
+                i += len(phoneme)
+                break
+        else:
+            if text[i].isalpha():
+                phonemes.append(STANDALONE_EQUIVALENTS.get(text[i], text[i]))
+            i += 1
+    return tuple(phonemes)
+
+
+def phoneme_grams(phonemes):
+    """Bigramas de fonemas con marcas de inicio y fin (para el índice invertido)"""
+    padded = ('^',) + tuple(phonemes) + ('$',)
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+_substitution_costs = {}
+
+
+def substitution_cost(a, b):
+    """0 si son el mismo fonema, 0.5 si suenan parecido, 1 si no"""
+    if a == b:
+        return 0.0
+    if a in VOWELS and b in VOWELS:
+        return 0.5
+    for group in CONSONANT_GROUPS:
+        if a in group and b in group:
+            return 0.5
+    return 1.0
+
+
+def phonetic_distance(a, b):
+    """Distancia de edición entre dos secuencias de fonemas con sustituciones ponderadas"""
+    costs = _substitution_costs
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, phoneme_a in enumerate(a, 1):
+        current = [float(i)]
+        for j, phoneme_b in enumerate(b, 1):
+            cost = costs.get((phoneme_a, phoneme_b))
+            if cost is None:
+                cost = costs[phoneme_a, phoneme_b] = substitution_cost(phoneme_a, phoneme_b)
+            substitution = previous[j - 1] + cost
+            insertion = previous[j] + 1
+            deletion = current[j - 1] + 1
+            current.append(substitution if substitution < insertion and substitution < deletion
+                           else insertion if insertion < deletion else deletion)
+        previous = current
+    return previous[-1]
+
+
+def phonetic_similarity(a, b):
+    """Similitud entre 0 y 1 (1 = mismos fonemas)"""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 0.0
+    return 1.0 - phonetic_distance(a, b) / longest
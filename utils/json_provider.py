@@ -0,0 +1,52 @@
+# utils/json_provider.py - Serialización JSON rápida para jsonify()
+#
+# Si orjson está instalado se usa para todas las respuestas JSON de la app
+# (varias veces más rápido que json de la librería estándar y sin pasar por str).
+# Sin orjson, la app usa el proveedor estándar de Flask.
+
+import logging
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logging.warning("orjson no está disponible. Se usará el serializador JSON estándar.")
+
+logger = logging.getLogger(__name__)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON basado en orjson. Las fechas pasan por el mismo default que
+    el proveedor estándar, así que la salida de jsonify() no cambia de formato.
+    Las claves se emiten en orden de inserción (sin sort_keys).
+    """
+
+    def _orjson_options(self, pretty=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Opciones propias de json.dumps (indent, cls, ...): serializador estándar
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        options = self._orjson_options(pretty) | orjson.OPT_APPEND_NEWLINE
+        body = orjson.dumps(obj, default=self.default, option=options)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Instala FastJSONProvider en la app si orjson está disponible"""
+    if orjson is None:
+        return False
+    app.json = FastJSONProvider(app)
+    logger.info("⚡ Respuestas JSON serializadas con orjson")
+    return True
@@ -0,0 +1,41 @@
+# utils/pagination.py - Paginación por cursor (keyset) para los listados de la API
+#
+# El cursor es opaco para el cliente: codifica los valores de la clave de orden
+# de la última fila devuelta. La página siguiente se pide con
+# WHERE (clave) > (valores del cursor), que usa el índice sin recorrer OFFSET filas.
+
+import base64
+import json
+
+
+def encode_cursor(values):
+    """Codifica los valores de la clave de orden en un token URL-safe"""
+    raw = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size, value_type=None):
+    """
+    Decodifica un cursor con `size` valores, todos de tipo value_type si se indica
+    (un cursor armado a mano no debe llegar a la comparación en SQL).
+    Lanza ValueError si es inválido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Cursor inválido')
+    if value_type is not None and not all(isinstance(value, value_type) for value in values):
+        raise ValueError('Cursor inválido')
+    return values
+
+
+def parse_limit(value, default, maximum):
+    """Lee ?limit= como entero entre 1 y maximum. Lanza ValueError si no es válido."""
+    if value is None:
+        return default
+    if not value.isdigit() or not 1 <= int(value) <= maximum:
+        raise ValueError(f'limit debe ser un entero entre 1 y {maximum}')
+    return int(value)
@@ -1,6 +1,6 @@
 import re
 import logging
-from datetime import datetime
+from datetime import datetime, time
 from utils.text_processing import clean_text
 
 logger = logging.getLogger(__name__)
@@ -26,6 +26,19 @@ TRACK_CODES = {
     # Añadir más mapeos según sea necesario
 }
 
+# Zona horaria de la hora de largada por código, para los hipódromos que no están
+# en la de SCRATCH_POST_TIME_TZ (America/New_York por defecto)
+TRACK_TIME_ZONES = {
+    "SA": "America/Los_Angeles",
+    "DMR": "America/Los_Angeles",
+    "OP": "America/Chicago",
+}
+
+# Índice inverso código → slug (si hay variantes, gana el primer slug declarado)
+TRACK_SLUGS_BY_CODE = {}
+for _slug, _code in TRACK_CODES.items():
+    TRACK_SLUGS_BY_CODE.setdefault(_code, _slug)
+
 RACE_TYPE_ABBREVIATIONS = {
     "maiden special weight": "MSW",
     "allowance optional claiming": "AOC",
@@ -73,7 +86,7 @@ def parse_race_url_data(url):
         race_date_str = match_specific_race.group(1)
         track_code = match_specific_race.group(2)
         # Intentar encontrar el track_name_slug desde el track_code (inverso de TRACK_CODES)
-        track_name_slug = next((slug for slug, code in TRACK_CODES.items() if code == track_code), None)
+        track_name_slug = TRACK_SLUGS_BY_CODE.get(track_code)
         if not track_name_slug: # Fallback si no se encuentra
             track_name_slug = track_code # Usar el código como slug si no hay mapeo
             logger.info(f"    Track slug no encontrado en TRACK_CODES para '{track_code}', usando el código como slug.")
@@ -89,10 +102,29 @@ def parse_race_url_data(url):
     logger.warning(f"No se pudo parsear track/date de la URL: '{url}' con ninguno de los patrones.")
     return {'track_name_slug': None, 'race_date_obj': None}
 
+POST_TIME_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*([AP])\.?M\.?', re.IGNORECASE)
+
+def parse_post_time(race_title_full):
+    """Hora de largada del título ("... Race # 1, 6:50 PM") como datetime.time, o None"""
+    match = POST_TIME_PATTERN.search(race_title_full or '')
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if not (1 <= hour <= 12 and minute < 60):
+        return None
+    if match.group(3).upper() == 'P':
+        hour = hour % 12 + 12
+    else:
+        hour = hour % 12
+    return time(hour, minute)
+
 def parse_race_title_data(race_title_full):
-    """Parsea el título de la carrera para extraer número y tipo"""
+    """Parsea el título de la carrera para extraer número, tipo y hora de largada"""
     logger.info(f"Iniciando parse_race_title_data con título: '{race_title_full}'")
     
+    # Hora de largada, p. ej. "Race # 1, 6:50 PM" → time(18, 50); None si no aparece
+    post_time = parse_post_time(race_title_full)
+    
     # Nuevo patrón para el formato "Gulfstream Park Race # 1, 6:50 PM"
     # Busca "Race #" seguido de un número, posiblemente seguido de coma y tiempo
     match_new_format = re.search(r'Race\s*#\s*(\d+)', race_title_full, re.IGNORECASE)
@@ -100,7 +132,7 @@ def parse_race_title_data(race_title_full):
         race_number_str = match_new_format.group(1)
         # Para este formato, no hay descripción específica del tipo de carrera en el título
         logger.info(f"  Título parseado (formato nuevo): Num='{race_number_str}', Tipo='N/A'")
-        return {'number': race_number_str, 'type_name': 'N/A'}
+        return {'post_time': post_time, 'number': race_number_str, 'type_name': 'N/A'}
     
     # Intenta hacer match con "RACE #X - DESCRIPCIÓN" o "RACE X - DESCRIPCIÓN"
     # El (?:RACE|CARRERA) permite flexibilidad en el idioma. #? hace el # opcional.
@@ -109,7 +141,7 @@ def parse_race_title_data(race_title_full):
         race_number_str = match_with_desc.group(1)
         race_type_description = clean_text(match_with_desc.group(2))
         logger.info(f"  Título parseado (con descripción): Num='{race_number_str}', Tipo='{race_type_description}'")
-        return {'number': race_number_str, 'type_name': race_type_description}
+        return {'post_time': post_time, 'number': race_number_str, 'type_name': race_type_description}
 
     # Si no, intenta hacer match solo con "RACE #X" o "RACE X" para obtener el número
     # Esto captura la parte como "Race #1" o "CARRERA 5"
@@ -129,16 +161,16 @@ def parse_race_title_data(race_title_full):
                  description = clean_text(race_title_full) #Fallback a título completo si la eliminación no dejó nada útil y había más texto
 
             logger.info(f"  Título parseado (solo número): Num='{race_number_str}', Tipo construido='{description}' (original: '{race_title_full}', parte removida: '{race_number_section_str}')")
-            return {'number': race_number_str, 'type_name': description}
+            return {'post_time': post_time, 'number': race_number_str, 'type_name': description}
         else:
             # Esto no debería ocurrir si match_num_part tuvo éxito y contenía dígitos.
             logger.warning(f"  No se pudo extraer el número de '{race_number_section_str}' en el título '{race_title_full}'")
             # Devuelve None para el número, y el título completo como descripción.
-            return {'number': None, 'type_name': clean_text(race_title_full)}
+            return {'post_time': post_time, 'number': None, 'type_name': clean_text(race_title_full)}
 
     # Si no se encuentra el patrón "RACE X" (ej. para nombres de Stakes como "THE PEGASUS STAKES")
     logger.info(f"  No se encontró patrón de número de carrera en el título: '{race_title_full}'. Se devuelve el título completo como descripción.")
-    return {'number': None, 'type_name': clean_text(race_title_full)}
+    return {'post_time': post_time, 'number': None, 'type_name': clean_text(race_title_full)}
 
 def generate_race_id(track_name_slug, race_date_obj, race_number, race_type):
     """Genera un ID único para la carrera"""
@@ -161,4 +193,15 @@ def generate_race_id(track_name_slug, race_date_obj, race_number, race_type):
         return race_id
     except Exception as e:
         logger.error(f"Error generando race_id: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+
+def race_date_from_race_id(race_id):
+    """Fecha de la carrera codificada en el race_id (TRACK_YYYYMMDD_R1_TYPE) o None"""
+    parts = (race_id or '').split('_')
+    if len(parts) < 2 or len(parts[1]) != 8:
+        return None
+    try:
+        return datetime.strptime(parts[1], '%Y%m%d').date()
+    except ValueError:
+        return None
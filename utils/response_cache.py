@@ -0,0 +1,77 @@
+# utils/response_cache.py - Caché de respuestas de los endpoints de lectura
+#
+# Las respuestas 200 se guardan ya serializadas, por ruta y parámetros, junto con
+# sus encabezados (ETag/Last-Modified). Un acierto no abre conexión ni consulta
+# la BD. Cada respuesta lleva tags (carrera, fecha, caballo) que los guardados
+# invalidan cuando cambian filas de verdad; el TTL acota lo que pueda escaparse
+# (p. ej. escrituras hechas por otro proceso).
+
+import os
+import logging
+from functools import wraps
+from flask import Response, g, request
+from utils.cache import TaggedTTLCache
+from utils.http_cache import is_not_modified, not_modified_response
+
+logger = logging.getLogger(__name__)
+
+response_cache = TaggedTTLCache(
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "30")),
+)
+
+# Encabezados que se guardan con el cuerpo
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+def cache_tags(*tags):
+    """Desde la vista: agrega tags de invalidación a la respuesta en curso"""
+    g.setdefault('response_cache_tags', set()).update(tags)
+
+
+def cached_response(view):
+    """Sirve la vista desde la caché; solo se guardan respuestas 200 con tags"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.full_path
+        cached = response_cache.get(key)
+        if cached is not None:
+            body, headers = cached
+            etag = headers.get('ETag', '')
+            etag = (etag[2:] if etag.startswith('W/') else etag).strip('"')
+            if etag and is_not_modified(etag, None):
+                return not_modified_response(etag, None)
+            return Response(body, status=200, mimetype='application/json', headers=headers)
+
+        response = view(*args, **kwargs)
+        tags = g.pop('response_cache_tags', None)
+        if isinstance(response, Response) and response.status_code == 200 and tags:
+            body = response.get_data()
+            headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+            response_cache.set(key, (body, headers), size=len(body), tags=tags)
+        return response
+    return wrapper
+
+
+def invalidate_response_cache(tags):
+    """Invalida las respuestas con alguno de los tags (llamar tras un cambio real)"""
+    removed = response_cache.invalidate_tags(tags)
+    if removed:
+        logger.info(f"🧹 {removed} respuestas invalidadas en caché")
+    return removed
+
+
+def race_tags(race_id, race_date=None):
+    """Tags afectados por un cambio en una carrera o sus participantes"""
+    tags = {'races:latest', f'race:{race_id}'}
+    if race_date:
+        tags.add(f'date:{race_date}')
+    return tags
+
+
+def horse_tags(horse_ids):
+    return {f'horse:{horse_id}' for horse_id in horse_ids}
+
+
+def response_cache_stats():
+    return response_cache.stats()
@@ -0,0 +1,157 @@
+# utils/track_registry.py - Registro en memoria de hipódromos (código, slug, nombre, IPA y país)
+#
+# Se carga una vez por proceso desde la tabla tracks y los mapeos de race_parser.
+# La resolución de un track por carrera pasa a ser una búsqueda en diccionario;
+# solo se vuelve a consultar la BD cuando aparece un código desconocido.
+
+import logging
+import threading
+
+from utils.race_parser import TRACK_CODES, TRACK_SLUGS_BY_CODE
+from utils.track_ipa_generator import generate_track_ipa_and_country
+
+logger = logging.getLogger(__name__)
+
+# Nombres conocidos para códigos que no tienen slug en TRACK_CODES
+TRACK_NAME_FALLBACKS = {
+    'THISTLEDOW': 'Thistledown',
+    'TDN': 'Thistledown',
+    'BEL': 'Belmont Park',
+    'SAR': 'Saratoga',
+    'DMR': 'Del Mar',
+    'OP': 'Oaklawn Park',
+    'TAM': 'Tampa Bay Downs',
+    'LRL': 'Laurel Park',
+    'MTH': 'Monmouth Park',
+    'PIM': 'Pimlico',
+    'AQU': 'Aqueduct',
+    'WO': 'Woodbine',
+}
+
+
+def generate_track_name_from_code(track_code):
+    """Genera un nombre legible para un hipódromo que no está en ningún mapeo"""
+    logger.warning(
+        f"🆕 HIPÓDROMO NUEVO DETECTADO: '{track_code}' - Generando nombre automáticamente"
+    )
+    logger.info(
+        f"🆕 HIPÓDROMO NUEVO: {track_code} - Revisa que el nombre sea correcto"
+    )
+
+    # Reglas inteligentes para generar nombre desde código
+    if len(track_code) <= 3:
+        # Códigos cortos como "WO", "TAM", "FG" → usar como está pero capitalizado
+        track_name = track_code.upper()
+    else:
+        # Códigos largos como "BELMONT-PK" → convertir a nombre
+        track_name = track_code.replace('-', ' ').replace('_', ' ').title()
+        # Reemplazos comunes
+        track_name = track_name.replace('Pk', 'Park').replace('Rc', 'Racecourse')
+
+    logger.info(f"✅ Nombre generado: '{track_code}' → '{track_name}'")
+    return track_name
+
+
+class TrackRegistry:
+    """
+    Mapas bidireccionales de hipódromos con la metadata de la tabla tracks en memoria.
+    Una instancia por proceso (ver track_registry al final del módulo).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.slug_to_code = dict(TRACK_CODES)
+        self.code_to_slug = dict(TRACK_SLUGS_BY_CODE)
+        # track_code → (track_name, track_name_ipa, country), solo tracks activos
+        self.tracks = {}
+        self.name_to_code = {}
+
+    def code_for_slug(self, slug):
+        return self.slug_to_code.get(slug)
+
+    def slug_for_code(self, track_code):
+        return self.code_to_slug.get(track_code)
+
+    def code_for_name(self, track_name):
+        return self.name_to_code.get(track_name.lower()) if track_name else None
+
+    def refresh(self, cur):
+        """Recarga los tracks activos desde la BD"""
+        cur.execute("""
+            SELECT track_code, track_name, track_name_ipa, country
+            FROM tracks
+            WHERE active = true
+        """)
+        tracks = {row[0]: (row[1], row[2], row[3]) for row in cur.fetchall()}
+        with self._lock:
+            self.tracks = tracks
+            self.name_to_code = {
+                track_name.lower(): track_code
+                for track_code, (track_name, _, _) in tracks.items() if track_name
+            }
+            self._loaded = True
+        logger.info(f"Registro de hipódromos cargado: {len(tracks)} tracks activos")
+
+    def invalidate(self, track_code=None):
+        """Olvida un track (o todos) para que se relea de la BD en el próximo uso"""
+        with self._lock:
+            if track_code is None:
+                self._loaded = False
+                self.tracks = {}
+                self.name_to_code = {}
+            else:
+                track = self.tracks.pop(track_code, None)
+                if track and track[0]:
+                    self.name_to_code.pop(track[0].lower(), None)
+
+    def name_for_code(self, track_code):
+        """Nombre base del hipódromo a partir del código, sin consultar la BD"""
+        slug = self.slug_for_code(track_code)
+        if slug:
+            # Convertir slug a nombre: "santa-anita-park" → "Santa Anita Park"
+            return slug.replace('-', ' ').title()
+        return TRACK_NAME_FALLBACKS.get(track_code) or generate_track_name_from_code(track_code)
+
+    def resolve(self, cur, track_code):
+        """
+        Devuelve (track_name, track_name_ipa, country) para un código.
+        Si el código no está registrado, se relee la tabla tracks por si otro
+        proceso lo agregó y, si sigue sin existir, se genera y se inserta.
+        """
+        if not self._loaded:
+            self.refresh(cur)
+
+        track = self.tracks.get(track_code)
+        if track:
+            return track
+
+        # Código desconocido en este proceso: releer la BD una vez
+        self.refresh(cur)
+        track = self.tracks.get(track_code)
+        if track:
+            return track
+
+        track_name = self.name_for_code(track_code)
+        track_ipa, country = generate_track_ipa_and_country(track_name)
+
+        # Auto-insertar en tabla tracks para futuros usos
+        cur.execute("""
+            INSERT INTO tracks (track_code, track_name, track_name_ipa, country, active, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT (track_code) DO UPDATE SET
+                track_name = EXCLUDED.track_name,
+                track_name_ipa = EXCLUDED.track_name_ipa,
+                country = EXCLUDED.country,
+                updated_at = CURRENT_TIMESTAMP
+        """, (track_code, track_name, track_ipa, country or 'USA'))
+        logger.info(f"✅ Auto-agregado track: {track_code} -> {track_name} ({track_ipa})")
+
+        track = (track_name, track_ipa, country)
+        with self._lock:
+            self.tracks[track_code] = track
+            self.name_to_code[track_name.lower()] = track_code
+        return track
+
+
+track_registry = TrackRegistry()